@@ -1,16 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, AsyncIterator, Optional
 import json
+import time
 import logging
 from datetime import datetime
 
 class BaseAgent(ABC):
+    # Agents that implement `stream_task` set this, so workflows can pipe their output
+    supports_streaming = False
+
     def __init__(self, agent_id: str, config: Dict[str, Any]):
         self.agent_id = agent_id
         self.config = config
         self.status = "initialized"
         self.last_heartbeat = datetime.now()
         self.task_queue = []
+        self.capabilities = frozenset(config.get("capabilities", []))
+        # An agent counts as unhealthy for this long after it last reported a warning or error
+        self.health_window_seconds = config.get("health_window_seconds", 60.0)
+        self.last_unhealthy_at: Optional[float] = None
         self.logger = self._setup_logger()
 
     def _setup_logger(self) -> logging.Logger:
@@ -27,6 +35,15 @@ class BaseAgent(ABC):
         """Process a task and return the result"""
         pass
 
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[str]:
+        """Process a task, yielding its output text incrementally
+
+        When piped behind another streaming workflow stage, `task["upstream_stream"]` is an
+        async iterator over that stage's chunks as they are produced.
+        """
+        raise NotImplementedError(f"Agent {self.agent_id} does not support streaming")
+        yield
+
     @abstractmethod
     async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
         """Handle any errors that occur during task processing"""
@@ -40,8 +57,21 @@ class BaseAgent(ABC):
     async def update_status(self, new_status: str) -> None:
         """Update agent's status"""
         self.status = new_status
+        if new_status in ("warning", "error"):
+            self.last_unhealthy_at = time.monotonic()
         self.logger.info(f"Status updated to: {new_status}")
 
     def get_capabilities(self) -> List[str]:
         """Return list of agent capabilities"""
         return self.config.get("capabilities", [])
+
+    def is_healthy(self) -> bool:
+        """Whether the agent should be preferred for new work
+
+        Nothing resets the status after a failure, so health expires instead: an agent is
+        healthy again once `health_window_seconds` pass without a new warning or error.
+        """
+        return (
+            self.last_unhealthy_at is None or
+            time.monotonic() - self.last_unhealthy_at >= self.health_window_seconds
+        )
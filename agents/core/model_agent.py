@@ -1,18 +1,34 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional
 from .base_agent import BaseAgent
 from services.model_manager import ModelManager
+from utils.circuit_breaker import classify_error, RATE_LIMIT
 
 class ModelAgent(BaseAgent):
     def __init__(self, agent_id: str, config: Dict[str, Any]):
         super().__init__(agent_id, config)
-        self.model_manager = ModelManager()
+        # Shared so all agents draw on one quota ledger and health view per model
+        self.model_manager = ModelManager.shared()
         self.required_capabilities = config.get("required_capabilities", [])
+        # Latency-sensitive agents hedge slow calls onto a second model
+        self.hedge_requests = config.get("hedge_requests", False)
 
-    async def execute_with_model(self, operation: callable) -> Any:
-        """Execute an operation using the model manager"""
+    async def execute_with_model(self, operation: callable, request: Optional[Dict[str, Any]] = None,
+                                 hedge: Optional[bool] = None) -> Any:
+        """Execute an operation using the model manager, cached by `request` when given"""
         return await self.model_manager.execute_with_model(
             operation,
-            required_capabilities=self.required_capabilities
+            required_capabilities=self.required_capabilities,
+            request=request,
+            hedge=self.hedge_requests if hedge is None else hedge
+        )
+
+    def stream_with_model(self, stream_operation: Callable[[str], AsyncIterator[str]],
+                          request: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream an operation's text chunks using the model manager, cached by `request` when given"""
+        return self.model_manager.stream_with_model(
+            stream_operation,
+            required_capabilities=self.required_capabilities,
+            request=request
         )
 
     async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
@@ -48,8 +64,8 @@ class ModelAgent(BaseAgent):
         await self.update_status("error")
         
         # If it's a rate limit error, log additional information
-        if "rate limit" in str(error).lower():
-            self.logger.warning("Rate limit error encountered, model rotation will be handled automatically")
+        if classify_error(error) == RATE_LIMIT:
+            self.logger.warning("Rate limit error encountered, the model's circuit breaker will route around it")
             
         # Implement specific error recovery logic here if needed
         
@@ -1,73 +1,246 @@
-from typing import Dict, Any
-import openai
+from typing import Dict, Any, AsyncIterator, List, Optional
+import json
+import asyncio
 from ..core.model_agent import ModelAgent
+from utils.static_analyzer import StaticAnalyzer, findings_by_category, focus_code
 
 class CodeAnalyzerAgent(ModelAgent):
     def __init__(self, agent_id: str, config: Dict[str, Any]):
         config["required_capabilities"] = ["code_review", "debugging"]
         super().__init__(agent_id, config)
+        # Local static analysis runs first; empty or trivial code never reaches the model, and
+        # small clean code only skips it when `skip_model_when_clean` opts in
+        pre_analysis = config.get("pre_analysis", {})
+        self.pre_analysis_enabled = pre_analysis.get("enabled", True)
+        self.max_trivial_lines = pre_analysis.get("max_trivial_lines", 2)
+        self.skip_model_when_clean = pre_analysis.get("skip_model_when_clean", False)
+        self.max_clean_lines = pre_analysis.get("max_clean_lines", 40)
+        self.max_clean_complexity = pre_analysis.get("max_clean_complexity", 5)
+        self.focus_min_lines = pre_analysis.get("focus_min_lines", 80)
+        self.static_analyzer = StaticAnalyzer.shared()
+
+    CATEGORIES = ["bugs", "quality", "performance", "security", "recommendations"]
+    supports_streaming = True
 
     async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if "batch" in task:
+            return await self._process_batch(task)
         try:
             self.logger.info(f"Processing code analysis task: {task.get('id')}")
-            
-            # Extract code from task
-            code = task.get("code", "")
-            context = task.get("context", {})
+            code, context = task.get("code", ""), task.get("context", {})
+            report = await self._pre_analyze(code, context)
+            if self._can_skip_model(report):
+                self.logger.info(f"Static analysis found nothing to review for task {task.get('id')}, skipping the model")
+                return self._task_result(task, findings_by_category(report, self.CATEGORIES), report, model_skipped=True)
+            messages = self._analysis_messages(code, context, report)
             
             async def model_operation(model: str) -> Dict[str, Any]:
-                # Prepare analysis prompt
-                prompt = self._prepare_analysis_prompt(code, context)
-                
                 # Get analysis from the model
-                response = await openai.ChatCompletion.acreate(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are a code analysis expert. Analyze the following code for bugs, potential improvements, and optimization opportunities."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
+                response = await self.model_manager.chat(model, messages)
                 
                 # Process and structure the analysis
-                return self._process_analysis(response.choices[0].message.content)
+                return self._process_analysis(response.content)
             
-            # Execute with automatic model management
-            analysis = await self.execute_with_model(model_operation)
+            # Execute with automatic model management; identical snippets are served from the cache
+            analysis = await self.execute_with_model(
+                model_operation,
+                request={"messages": messages},
+                hedge=task.get("latency_sensitive")
+            )
             
             self.logger.info(f"Code analysis completed for task: {task.get('id')}")
+            return self._task_result(task, self._merge_static_findings(analysis, report), report)
+            
+        except Exception as e:
+            self.logger.error(f"Error in code analysis: {str(e)}")
+            await self.handle_error(e, task)
+            return {
+                "task_id": task.get("id"),
+                "status": "failed",
+                "error": str(e)
+            }
+
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream the raw analysis text as the model writes it
+
+        Only the output streams. Code arriving from an upstream streaming stage is read to
+        the end before any work starts, because a prompt can't be sent in parts, so piping
+        into this agent brings no overlap with the stage before it.
+        """
+        code = task.get("code", "")
+        if "upstream_stream" in task:
+            code = "".join([chunk async for chunk in task["upstream_stream"]])
+        self.logger.info(f"Streaming code analysis task: {task.get('id')}")
+        context = task.get("context", {})
+        report = await self._pre_analyze(code, context)
+        if self._can_skip_model(report):
+            yield self._summarize_static_analysis(report)
+            return
+        messages = self._analysis_messages(code, context, report)
+
+        async for chunk in self.stream_with_model(
+            lambda model: self.model_manager.stream_chat(model, messages),
+            request={"messages": messages}
+        ):
+            yield chunk
+
+    async def _process_batch(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze several small snippets with one request and split the answer per task"""
+        tasks = task["batch"]
+        try:
+            self.logger.info(f"Processing batch {task.get('id')} of {len(tasks)} code analysis tasks")
+            reports = await asyncio.gather(*[
+                self._pre_analyze(item.get("code", ""), item.get("context", {})) for item in tasks
+            ])
+            skipped = [self._can_skip_model(report) for report in reports]
+            analyses = [
+                findings_by_category(report, self.CATEGORIES) if skip else None
+                for report, skip in zip(reports, skipped)
+            ]
+            # Only snippets static analysis couldn't clear go to the model
+            pending = [index for index, analysis in enumerate(analyses) if analysis is None]
+            if pending:
+                pending_tasks = [tasks[index] for index in pending]
+                messages = [
+                    {"role": "system", "content": "You are a code analysis expert. Analyze each numbered code snippet independently for bugs, potential improvements, and optimization opportunities."},
+                    {"role": "user", "content": self._prepare_batch_prompt(pending_tasks)}
+                ]
+
+                async def model_operation(model: str) -> Optional[List[Dict[str, Any]]]:
+                    response = await self.model_manager.chat(model, messages)
+                    return self._split_batch_analysis(response.content, len(pending_tasks))
+
+                model_analyses = await self.execute_with_model(model_operation, request={"messages": messages})
+                if model_analyses is None:
+                    raise ValueError("Model response did not contain one analysis per snippet")
+                for index, analysis in zip(pending, model_analyses):
+                    analyses[index] = self._merge_static_findings(analysis, reports[index])
+
             return {
                 "task_id": task.get("id"),
                 "status": "completed",
-                "analysis": analysis
+                # Shaped like single-task results, so batching stays invisible to callers
+                "results": [
+                    self._task_result(item, analysis, report, model_skipped=skip)
+                    for item, analysis, report, skip in zip(tasks, analyses, reports, skipped)
+                ]
             }
-            
+
         except Exception as e:
-            self.logger.error(f"Error in code analysis: {str(e)}")
-            await self.handle_error(e, task)
+            # The batcher re-runs the tasks one by one, so this isn't an agent error
+            self.logger.warning(f"Batch analysis failed for {task.get('id')}: {str(e)}")
             return {
                 "task_id": task.get("id"),
                 "status": "failed",
                 "error": str(e)
             }
 
+    def _task_result(self, task: Dict[str, Any], analysis: Dict[str, Any], report: Optional[Dict[str, Any]],
+                     model_skipped: bool = False) -> Dict[str, Any]:
+        result = {
+            "task_id": task.get("id"),
+            "status": "completed",
+            "analysis": analysis,
+            "static_analysis": report
+        }
+        if model_skipped:
+            result["model_skipped"] = True
+        return result
+
     async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
         self.logger.error(f"Error processing task {task.get('id')}: {str(error)}")
         await self.update_status("error")
         # Implement error recovery logic here
 
-    def _prepare_analysis_prompt(self, code: str, context: Dict[str, Any]) -> str:
-        return f"""
-        Please analyze the following code:
+    async def _pre_analyze(self, code: str, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Statically analyze code locally, or None if pre-analysis is off or failed"""
+        if not self.pre_analysis_enabled:
+            return None
+        try:
+            return await self.static_analyzer.analyze(code, context.get("language", "unknown"))
+        except Exception as e:
+            self.logger.warning(f"Static analysis failed, sending code to the model as is: {str(e)}")
+            return None
+
+    def _can_skip_model(self, report: Optional[Dict[str, Any]]) -> bool:
+        """Whether static analysis alone settles the review
+
+        True for empty code and for a few lines without findings. Small, simple, parsed
+        code with no findings also qualifies if `skip_model_when_clean` is on; otherwise a
+        clean report only shortens the prompt.
+        """
+        if report is None:
+            return False
+        metrics = report["metrics"]
+        if metrics["code_lines"] == 0:
+            return True
+        if report["findings"]:
+            return False
+        if metrics["code_lines"] <= self.max_trivial_lines:
+            return True
+        return (
+            self.skip_model_when_clean and report["parsed"] and
+            metrics["code_lines"] <= self.max_clean_lines and
+            metrics["max_complexity"] <= self.max_clean_complexity
+        )
+
+    def _merge_static_findings(self, analysis: Dict[str, Any], report: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if report is None:
+            return analysis
+        static = findings_by_category(report, self.CATEGORIES)
+        # A new dict: the model's analysis may be a shared cached object
+        return {category: static[category] + list(analysis.get(category, [])) for category in self.CATEGORIES}
+
+    def _summarize_static_analysis(self, report: Dict[str, Any]) -> str:
+        metrics = report["metrics"]
+        return (
+            f"Static analysis found no issues ({metrics['code_lines']} lines of code, "
+            f"max complexity {metrics.get('max_complexity', 1)}); model review skipped."
+        )
+
+    def _analysis_messages(self, code: str, context: Dict[str, Any],
+                           report: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        if report is not None and report["metrics"]["lines"] >= self.focus_min_lines:
+            code = focus_code(code, report)
+        return [
+            {"role": "system", "content": "You are a code analysis expert. Analyze the following code for bugs, potential improvements, and optimization opportunities."},
+            {"role": "user", "content": self._prepare_analysis_prompt(code, context, report)}
+        ]
+
+    def _prepare_analysis_prompt(self, code: str, context: Dict[str, Any],
+                                 report: Optional[Dict[str, Any]] = None) -> str:
+        if report is not None:
+            findings = "\n".join(
+                f"- {'line ' + str(finding['line']) + ': ' if finding['line'] else ''}{finding['message']}"
+                for finding in report["findings"]
+            ) or "- nothing"
+            return f"""
+        Please review the following code:
         
         ```
         {code}
         ```
         
+        Language: {context.get('language', 'Unknown')}. Purpose: {context.get('purpose', 'Unknown')}.
+        
+        Static analysis already reported:
+        {findings}
+        
+        Don't repeat these. Point out only issues static analysis can't see: logic errors,
+        edge cases, concurrency and design problems, and better approaches.
+        """
+        return f"""
+        Please analyze the following code:
+
+        ```
+        {code}
+        ```
+
         Context:
         - Language: {context.get('language', 'Unknown')}
         - Framework: {context.get('framework', 'Unknown')}
         - Purpose: {context.get('purpose', 'Unknown')}
-        
+
         Please provide:
         1. Potential bugs or issues
         2. Code quality assessment
@@ -76,6 +249,34 @@ class CodeAnalyzerAgent(ModelAgent):
         5. Best practices recommendations
         """
 
+    def _prepare_batch_prompt(self, tasks: List[Dict[str, Any]]) -> str:
+        snippets = []
+        for index, item in enumerate(tasks, 1):
+            context = item.get("context", {})
+            snippets.append(
+                f"Snippet {index} (language: {context.get('language', 'Unknown')}, "
+                f"purpose: {context.get('purpose', 'Unknown')}):\n```\n{item.get('code', '')}\n```"
+            )
+        return (
+            "Please analyze each of the following code snippets:\n\n" + "\n\n".join(snippets) +
+            "\n\nRespond with only a JSON array containing one object per snippet, in order, shaped like "
+            '{"snippet": 1, "bugs": [], "quality": [], "performance": [], "security": [], "recommendations": []}.'
+        )
+
+    def _split_batch_analysis(self, raw_analysis: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """Parse a batched response into one analysis per snippet, or None if it is malformed"""
+        start, end = raw_analysis.find("["), raw_analysis.rfind("]")
+        try:
+            items = json.loads(raw_analysis[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(items, list) or len(items) != count or not all(isinstance(item, dict) for item in items):
+            return None
+        return [
+            {category: item.get(category, []) for category in self.CATEGORIES}
+            for item in items
+        ]
+
     def _process_analysis(self, raw_analysis: str) -> Dict[str, Any]:
         # Structure the raw analysis into categories
         return {
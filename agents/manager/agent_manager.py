@@ -1,20 +1,70 @@
 import json
+import time
 import asyncio
-from typing import Dict, List, Any, Optional
+import itertools
+from typing import Dict, List, Any, Optional, Union
 from datetime import datetime, timedelta
 import logging
 from ..core.base_agent import BaseAgent
 from ..implementations.code_analyzer_agent import CodeAnalyzerAgent
+from services.model_manager import ModelManager
+from utils.static_analyzer import StaticAnalyzer
+from .agent_pool import AgentPool
+from .task_journal import TaskJournal
+from .task_scheduler import TaskScheduler, QueueFullError
+from .task_store import TaskHandle, TaskResultStore
+from .task_batcher import TaskBatcher
+from .stream_pipe import StreamPipe, replay
+from .workflow import Workflow, WorkflowStageError
 # Import other agent implementations as needed
 
 class AgentManager:
-    def __init__(self, config_path: str = "agents/config/agent_registry.json"):
+    def __init__(self, config_path: str = "agents/config/agent_registry.json", num_workers: Optional[int] = None):
         self.agents: Dict[str, BaseAgent] = {}
-        self.workflows: Dict[str, List[str]] = {}
+        self.agent_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.batchers: Dict[str, TaskBatcher] = {}
+        self.agent_priorities: Dict[str, int] = {}
+        self.agent_load: Dict[str, int] = {}
+        self.capability_index: Dict[str, List[str]] = {}
+        self.workflows: Dict[str, Workflow] = {}
+        self.num_workers = 4
+        self.result_ttl_seconds = 3600
+        self.max_stored_results = 1000
+        self.default_priority = 3
+        self.aging_seconds = 30.0
+        self.queue_capacity: Optional[int] = None
+        self.admission_policy = "reject"
+        self.admission_timeout = 5.0
+        self.autoscale_interval = 5.0
+        self.journal_path: Optional[str] = None
+        self.journal_max_bytes = 64 * 1024 * 1024
+        self.max_task_retries = 0
+        self.max_checkpoints = 5000
+        self.task_timeout: Optional[float] = None
+        self.stage_timeout: Optional[float] = None
+        self.stream_buffer_size = 16
         self.logger = self._setup_logger()
         self.load_configuration(config_path)
-        self.task_queue = asyncio.Queue()
+        if num_workers is not None:
+            self.num_workers = num_workers
+        self.task_queue = TaskScheduler(
+            self.aging_seconds,
+            self.queue_capacity,
+            self.admission_policy,
+            self.admission_timeout
+        )
+        self.journal = TaskJournal(self.journal_path, self.journal_max_bytes) if self.journal_path else None
+        self._task_seq = itertools.count(self.journal.next_sequence if self.journal else 1)
+        self.recovered_handles: Dict[str, TaskHandle] = {}
+        self.results = TaskResultStore(self.max_stored_results, self.result_ttl_seconds)
+        # Stage outputs keyed by Workflow.checkpoint_key, so retries skip finished stages
+        self.checkpoints = TaskResultStore(self.max_checkpoints, self.result_ttl_seconds)
         self.running = False
+        self.accepting = True
+        self._workers: List[asyncio.Task] = []
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._background_tasks: List[asyncio.Task] = []
+        self._pending: Dict[str, asyncio.Future] = {}
 
     def _setup_logger(self) -> logging.Logger:
         logger = logging.getLogger("agent_manager")
@@ -37,7 +87,29 @@ class AgentManager:
                     self.create_agent(agent_id, agent_config)
                     
             # Load workflows
-            self.workflows = config.get("workflows", {})
+            self.workflows = {
+                name: Workflow.from_config(name, definition)
+                for name, definition in config.get("workflows", {}).items()
+            }
+
+            # Manager settings
+            manager_config = config.get("manager", {})
+            self.num_workers = manager_config.get("num_workers", self.num_workers)
+            self.result_ttl_seconds = manager_config.get("result_ttl_seconds", self.result_ttl_seconds)
+            self.max_stored_results = manager_config.get("max_stored_results", self.max_stored_results)
+            self.default_priority = manager_config.get("default_priority", self.default_priority)
+            self.aging_seconds = manager_config.get("aging_seconds", self.aging_seconds)
+            self.queue_capacity = manager_config.get("queue_capacity", self.queue_capacity)
+            self.admission_policy = manager_config.get("admission_policy", self.admission_policy)
+            self.admission_timeout = manager_config.get("admission_timeout", self.admission_timeout)
+            self.autoscale_interval = manager_config.get("autoscale_interval", self.autoscale_interval)
+            self.journal_path = manager_config.get("journal_path", self.journal_path)
+            self.journal_max_bytes = manager_config.get("journal_max_bytes", self.journal_max_bytes)
+            self.max_task_retries = manager_config.get("max_task_retries", self.max_task_retries)
+            self.max_checkpoints = manager_config.get("max_checkpoints", self.max_checkpoints)
+            self.task_timeout = manager_config.get("task_timeout", self.task_timeout)
+            self.stage_timeout = manager_config.get("stage_timeout", self.stage_timeout)
+            self.stream_buffer_size = manager_config.get("stream_buffer_size", self.stream_buffer_size)
             
             self.logger.info("Configuration loaded successfully")
         except Exception as e:
@@ -45,84 +117,536 @@ class AgentManager:
             raise
 
     def create_agent(self, agent_id: str, config: Dict[str, Any]) -> None:
-        """Create and register a new agent"""
+        """Create and register a new agent, or a pool of agents if configured"""
         try:
-            agent_type = config["type"]
-            if agent_type == "analysis":
-                agent = CodeAnalyzerAgent(agent_id, config)
-            # Add other agent types here
+            if "pool" in config:
+                agent = AgentPool(agent_id, config, lambda instance_id: self._build_agent(instance_id, dict(config)))
+                # The pool caps concurrency per instance itself
+                max_concurrent_tasks = None
             else:
-                raise ValueError(f"Unknown agent type: {agent_type}")
-                
-            self.agents[agent_id] = agent
+                agent = self._build_agent(agent_id, config)
+                max_concurrent_tasks = config.get("max_concurrent_tasks", 2)
+
+            self.register_agent(agent_id, agent, max_concurrent_tasks, config.get("priority"))
+            batching = config.get("batching", {})
+            if batching.get("enabled", False):
+                self.batchers[agent_id] = TaskBatcher(
+                    agent_id, batching, lambda batch_task: self._dispatch(agent_id, batch_task)
+                )
             self.logger.info(f"Agent created: {agent_id}")
         except Exception as e:
             self.logger.error(f"Error creating agent {agent_id}: {str(e)}")
             raise
 
+    def _build_agent(self, agent_id: str, config: Dict[str, Any]) -> BaseAgent:
+        """Instantiate an agent implementation for its configured type"""
+        agent_type = config["type"]
+        if agent_type == "analysis":
+            return CodeAnalyzerAgent(agent_id, config)
+        # Add other agent types here
+        raise ValueError(f"Unknown agent type: {agent_type}")
+
+    def register_agent(self, agent_id: str, agent: BaseAgent, max_concurrent_tasks: Optional[int] = 2,
+                       priority: Optional[int] = None) -> None:
+        """Register an agent and cap how many tasks it may run at once (None for no cap)"""
+        self.agents[agent_id] = agent
+        if max_concurrent_tasks is not None:
+            self.agent_semaphores[agent_id] = asyncio.Semaphore(max_concurrent_tasks)
+        self.agent_load[agent_id] = 0
+        if priority is not None:
+            self.agent_priorities[agent_id] = priority
+        for capability in agent.capabilities:
+            providers = self.capability_index.setdefault(capability, [])
+            if agent_id not in providers:
+                providers.append(agent_id)
+
+    def route_task(self, capability: str) -> str:
+        """Pick the least-loaded agent providing a capability, preferring healthy agents"""
+        candidates = self.capability_index.get(capability)
+        if not candidates:
+            raise ValueError(f"No agent provides capability: {capability}")
+        healthy = [agent_id for agent_id in candidates if self.agents[agent_id].is_healthy()]
+        return min(healthy or candidates, key=lambda agent_id: self.agent_load[agent_id])
+
     async def start(self) -> None:
         """Start the agent manager"""
         self.running = True
-        self.logger.info("Agent manager started")
+        self.accepting = True
+        await self._recover_tasks()
+        self._workers = [
+            asyncio.create_task(self.process_task_queue(worker_id))
+            for worker_id in range(self.num_workers)
+        ]
+        self._background_tasks = [
+            asyncio.create_task(self.monitor_agents()),
+            asyncio.create_task(self.autoscale_pools())
+        ]
+        self.logger.info(f"Agent manager started with {self.num_workers} workers")
         await asyncio.gather(
-            self.process_task_queue(),
-            self.monitor_agents()
+            *self._workers,
+            *self._background_tasks,
+            return_exceptions=True
         )
 
-    async def stop(self) -> None:
-        """Stop the agent manager"""
+    async def stop(self, drain: bool = False, timeout: Optional[float] = None) -> None:
+        """Stop the agent manager
+
+        With `drain`, new submissions are refused and queued and in-flight tasks are given
+        up to `timeout` seconds to finish first. Whatever is still running is cancelled, and
+        handles of tasks still queued fail with RuntimeError; both are replayed from the
+        journal on the next start.
+        """
+        self.accepting = False
+        if drain:
+            self.logger.info("Draining task queue before stopping")
+            try:
+                await asyncio.wait_for(self.task_queue.join(), timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Drain timed out with {self.task_queue.qsize()} task(s) queued")
+
         self.running = False
+        for task_id, execution in list(self._in_flight.items()):
+            execution.cancel()
+            # Not journaled as cancelled, so the task is replayed on the next start
+            future = self._pending.pop(task_id, None)
+            if future and not future.done():
+                future.cancel()
+        # Queued tasks stay queued and journaled for the next start; only their handles are released
+        for task, _ in self.task_queue.queued():
+            future = self._pending.pop(task.get("id"), None)
+            if future and not future.done():
+                future.set_exception(RuntimeError("Agent manager stopped before the task ran"))
+        # Workers block on the queue, so they have to be cancelled explicitly
+        for task in self._workers + self._background_tasks:
+            task.cancel()
+        self._workers = []
+        self._background_tasks = []
+        if self.journal:
+            await self.journal.close()
+        # Agents share these process-wide, so release their HTTP clients and worker processes here
+        await ModelManager.close_shared()
+        StaticAnalyzer.close_shared()
         self.logger.info("Agent manager stopped")
 
-    async def submit_task(self, task: Dict[str, Any], workflow: str = None) -> str:
-        """Submit a task for processing"""
-        task_id = f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(self.task_queue._queue)}"
-        task["id"] = task_id
-        task["submitted_at"] = datetime.now().isoformat()
-        task["workflow"] = workflow
-        
-        await self.task_queue.put(task)
-        self.logger.info(f"Task submitted: {task_id}")
-        return task_id
-
-    async def process_task_queue(self) -> None:
-        """Process tasks in the queue"""
+    async def submit_task(self, task: Union[Dict[str, Any], List[Dict[str, Any]]], workflow: str = None,
+                          priority: Optional[int] = None,
+                          deadline: Optional[float] = None) -> Union[TaskHandle, List[TaskHandle]]:
+        """Submit a task for processing and return an awaitable handle for its result
+
+        `priority` overrides the priority class derived from the agent or workflow, and
+        `deadline` is a number of seconds from now by which the task should start. A list
+        of tasks is admitted all-or-nothing and returns a list of handles. Raises
+        QueueFullError when the queue's admission policy refuses the submission.
+
+        A task that already carries an "id" (for example one resubmitted after its
+        workflow failed) keeps it, so the workflow resumes from its checkpointed stages.
+        Raises ValueError if such an ID belongs to a task that is still queued or running.
+        """
+        if not self.accepting:
+            raise RuntimeError("Agent manager is stopping and no longer accepts tasks")
+        tasks = task if isinstance(task, list) else [task]
+        # A live duplicate would overwrite the first task's future and in-flight entry
+        given_ids = [item["id"] for item in tasks if item.get("id")]
+        duplicates = sorted({task_id for task_id in given_ids if task_id in self._pending or given_ids.count(task_id) > 1})
+        if duplicates:
+            raise ValueError(f"Task ID(s) already queued or running: {', '.join(duplicates)}")
+        handles = []
+        items = []
+        sequences = []
+        for item in tasks:
+            sequence = next(self._task_seq)
+            sequences.append(sequence)
+            # Zero-padded and backed by the journal's sequence, so IDs sort in submission order
+            task_id = item.get("id") or f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{sequence:06d}"
+            item["id"] = task_id
+            item["submitted_at"] = datetime.now().isoformat()
+            item["workflow"] = workflow
+            if priority is not None:
+                item["priority"] = priority
+            if deadline is not None:
+                item["deadline"] = (datetime.now() + timedelta(seconds=deadline)).isoformat()
+
+            handles.append(self._track_task(task_id))
+            items.append((item, self._task_priority(item), time.monotonic() + deadline if deadline is not None else None))
+
+        try:
+            shed = await self.task_queue.put_many(items)
+        except QueueFullError as e:
+            for handle in handles:
+                self._pending.pop(handle.task_id, None)
+            self.logger.warning(f"Rejected {len(handles)} task(s): {str(e)}")
+            raise
+
+        if self.journal:
+            # Write-ahead: the submission is durable before the caller gets a handle
+            await self.journal.append_many([
+                {"type": "submitted", "task_id": item["id"], "seq": sequence, "task": item, "priority": item_priority}
+                for (item, item_priority, _), sequence in zip(items, sequences)
+            ])
+
+        for victim in shed:
+            self.logger.warning(f"Task shed under load: {victim['id']}")
+            self._fail_task(victim["id"], QueueFullError(f"Task {victim['id']} shed to admit more urgent work"))
+
+        for handle in handles:
+            self.logger.info(f"Task submitted: {handle.task_id}")
+        return handles if isinstance(task, list) else handles[0]
+
+    def _track_task(self, task_id: str) -> TaskHandle:
+        """Create the future behind a task's handle"""
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved so unawaited handles don't log "exception never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[task_id] = future
+        return TaskHandle(task_id, future)
+
+    async def _recover_tasks(self) -> None:
+        """Requeue tasks the journal recorded as submitted but never finished"""
+        if not self.journal or not self.journal.unfinished:
+            return
+        items = []
+        for task_id, entry in self.journal.unfinished.items():
+            task = entry["task"]
+            for stage_id, output in entry["stages"].items():
+                self.checkpoints.put(Workflow.checkpoint_key(task_id, stage_id), output)
+            self.recovered_handles[task_id] = self._track_task(task_id)
+            priority = entry["priority"] if entry["priority"] is not None else self._task_priority(task)
+            items.append((task, priority, None))
+        self.journal.unfinished = {}
+
+        # Recovered work was already admitted once, so it bypasses the admission policy
+        for item in items:
+            self.task_queue.restore(*item)
+        self.logger.info(f"Recovered {len(items)} unfinished task(s) from the journal")
+
+    def _task_priority(self, task: Dict[str, Any]) -> int:
+        """Resolve a task's priority class: explicit, then workflow, then agent priority"""
+        if task.get("priority") is not None:
+            return task["priority"]
+
+        workflow = self.workflows.get(task.get("workflow"))
+        if workflow:
+            if workflow.priority is not None:
+                return workflow.priority
+            # A workflow is only as urgent as its least urgent stage
+            priorities = [
+                self.agent_priorities[stage["agent"]]
+                for stage in workflow.stages.values()
+                if stage["agent"] in self.agent_priorities
+            ]
+            return max(priorities) if priorities else self.default_priority
+
+        if task.get("agent_id") is None and task.get("capability") in self.capability_index:
+            priorities = [
+                self.agent_priorities[agent_id]
+                for agent_id in self.capability_index[task["capability"]]
+                if agent_id in self.agent_priorities
+            ]
+            return min(priorities) if priorities else self.default_priority
+
+        return self.agent_priorities.get(task.get("agent_id"), self.default_priority)
+
+    def get_queue_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Get queue depth and queue-wait time per priority class"""
+        return self.task_queue.get_stats()
+
+    def get_agent_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the number of queued tasks waiting on each agent and the longest wait among them"""
+        stats = {}
+        for task, waited in self.task_queue.queued():
+            for agent_id in self._first_agents(task):
+                agent_stats = stats.setdefault(agent_id, {"queued": 0, "max_wait_seconds": 0.0})
+                agent_stats["queued"] += 1
+                agent_stats["max_wait_seconds"] = max(agent_stats["max_wait_seconds"], waited)
+        return stats
+
+    def _first_agents(self, task: Dict[str, Any]) -> List[str]:
+        """The agents a queued task needs first: its workflow's entry stages, or its own agent"""
+        workflow = self.workflows.get(task.get("workflow"))
+        if workflow:
+            return [stage["agent"] for stage in workflow.stages.values() if not stage["depends_on"]]
+        if task.get("agent_id") is None:
+            # Any of the capable agents may get it, so it counts as demand for each
+            return list(self.capability_index.get(task.get("capability"), []))
+        return [task["agent_id"]]
+
+    def get_task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored result of a completed task, if it has not expired"""
+        return self.results.get(task_id)
+
+    async def process_task_queue(self, worker_id: int = 0) -> None:
+        """Worker loop: take tasks off the queue and process them until stopped"""
         while self.running:
+            task = await self.task_queue.get()
+            # Run in a child task so cancel_task can stop it without killing the worker
+            execution = asyncio.create_task(self._execute_with_timeout(task))
+            self._in_flight[task["id"]] = execution
             try:
-                if not self.task_queue.empty():
-                    task = await self.task_queue.get()
-                    workflow = task.get("workflow")
-                    
-                    if workflow and workflow in self.workflows:
-                        # Process task through workflow
-                        result = await self.execute_workflow(workflow, task)
-                    else:
-                        # Process task with single agent
-                        agent_id = task.get("agent_id")
-                        if agent_id in self.agents:
-                            result = await self.agents[agent_id].process_task(task)
-                        else:
-                            raise ValueError(f"Unknown agent: {agent_id}")
-                            
-                    self.logger.info(f"Task completed: {task['id']}")
-                    
-                await asyncio.sleep(0.1)  # Prevent CPU overload
-                
-            except Exception as e:
-                self.logger.error(f"Error processing task: {str(e)}")
+                await asyncio.wait({execution})
+                if execution.cancelled():
+                    self._cancel_pending(task["id"])
+                    self.logger.info(f"Task cancelled: {task['id']}")
+                elif execution.exception() is not None:
+                    error = execution.exception()
+                    self.logger.error(f"Error processing task {task.get('id')}: {str(error)}")
+                    self._fail_task(task["id"], error)
+                else:
+                    self._complete_task(task["id"], execution.result())
+                    self.logger.info(f"Task completed by worker {worker_id}: {task['id']}")
+            finally:
+                self._in_flight.pop(task["id"], None)
+                self.task_queue.task_done()
+
+    async def _execute_with_timeout(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a task within its time budget (task "timeout" or the manager default)"""
+        timeout = task.get("timeout", self.task_timeout)
+        try:
+            return await asyncio.wait_for(self._execute_with_retries(task), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Task {task['id']} timed out after {timeout}s")
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Cancel a queued or in-flight task; returns False if it is unknown or finished"""
+        if self.task_queue.remove(task_id) is not None:
+            self._cancel_pending(task_id)
+            self.logger.info(f"Task cancelled before it started: {task_id}")
+            return True
+        execution = self._in_flight.get(task_id)
+        if execution is not None and not execution.done():
+            execution.cancel()
+            return True
+        return False
+
+    async def _execute_with_retries(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a task, retrying failed workflows from their last checkpointed stage"""
+        retries = task.get("max_retries", self.max_task_retries)
+        attempt = 0
+        while True:
+            try:
+                return await self._execute_task(task)
+            except WorkflowStageError as e:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                self.logger.warning(f"Retrying task {task['id']} (attempt {attempt + 1}): {str(e)}")
+
+    async def _execute_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task through its workflow or its single agent"""
+        workflow = task.get("workflow")
+
+        if workflow and workflow in self.workflows:
+            # Process task through workflow
+            return await self.execute_workflow(workflow, task)
+
+        # Process task with single agent, routing by capability if no agent was named
+        agent_id = task.get("agent_id")
+        if agent_id is None and task.get("capability"):
+            agent_id = self.route_task(task["capability"])
+        if agent_id in self.agents:
+            return await self.run_agent(agent_id, task)
+        raise ValueError(f"Unknown agent: {agent_id}")
+
+    def _complete_task(self, task_id: str, result: Dict[str, Any]) -> None:
+        """Store a task's result and resolve its handle"""
+        self.results.put(task_id, result)
+        if self.journal:
+            self.journal.append({"type": "completed", "task_id": task_id, "result": result})
+        future = self._pending.pop(task_id, None)
+        if future and not future.done():
+            future.set_result(result)
+
+    def _cancel_pending(self, task_id: str) -> None:
+        """Record a task as cancelled and cancel its handle"""
+        self.results.put(task_id, {"task_id": task_id, "status": "cancelled"})
+        if self.journal:
+            self.journal.append({"type": "cancelled", "task_id": task_id})
+        future = self._pending.pop(task_id, None)
+        if future and not future.done():
+            future.cancel()
+
+    def _fail_task(self, task_id: str, error: Exception) -> None:
+        """Store a task's failure and reject its handle"""
+        self.results.put(task_id, {"task_id": task_id, "status": "failed", "error": str(error)})
+        if self.journal:
+            self.journal.append({"type": "failed", "task_id": task_id, "error": str(error)})
+        future = self._pending.pop(task_id, None)
+        if future and not future.done():
+            future.set_exception(error)
+
+    async def run_agent(self, agent_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task on an agent, batching small tasks if the agent opts in"""
+        self.agent_load[agent_id] += 1
+        try:
+            batcher = self.batchers.get(agent_id)
+            if batcher is not None and batcher.accepts(task):
+                # Batches take concurrency slots, not the individual tasks waiting to join one
+                return await batcher.submit(task)
+            return await self._dispatch(agent_id, task)
+        finally:
+            self.agent_load[agent_id] -= 1
+
+    async def _dispatch(self, agent_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Hand a task to an agent, respecting the agent's concurrency cap"""
+        semaphore = self.agent_semaphores.get(agent_id)
+        if semaphore is None:
+            return await self.agents[agent_id].process_task(task)
+        async with semaphore:
+            return await self.agents[agent_id].process_task(task)
 
     async def execute_workflow(self, workflow_name: str, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a workflow with multiple agents"""
-        workflow_agents = self.workflows[workflow_name]
-        result = task
-        
-        for agent_id in workflow_agents:
-            if agent_id in self.agents:
-                result = await self.agents[agent_id].process_task(result)
-            else:
-                self.logger.warning(f"Agent {agent_id} not found in workflow {workflow_name}")
-                
-        return result
+        """Execute a workflow, running stages concurrently once their dependencies finish
+
+        A streaming stage (see `_is_streaming_stage`) starts its streaming children at the
+        same time as itself, piping its output to them through bounded buffers, as long as
+        their other dependencies are already done. Piped children get the original task
+        with the chunk iterator under "upstream_stream" (and any other parents' outputs
+        under "upstream"). A streaming child that starts after its streaming parent has
+        finished, e.g. when resuming past the parent's checkpoint, gets the same input with
+        the parent's full output replayed as one chunk. Every stage's final output is still
+        collected and checkpointed.
+        """
+        workflow = self.workflows[workflow_name]
+        outputs: Dict[str, Dict[str, Any]] = {}
+        running: Dict[asyncio.Task, str] = {}
+
+        def piped_input(stage_id: str, source: str, upstream_stream) -> Dict[str, Any]:
+            stage_input = {**task, "upstream_stream": upstream_stream}
+            others = [parent for parent in workflow.parents(stage_id) if parent != source]
+            if others:
+                stage_input["upstream"] = {parent: outputs[parent] for parent in others}
+            return stage_input
+
+        def start_stage(stage_id: str, stage_input: Dict[str, Any]) -> None:
+            if not self._is_streaming_stage(workflow, stage_id):
+                running[asyncio.create_task(self._run_stage(workflow, stage_id, stage_input))] = stage_id
+                return
+            pipe = StreamPipe(self.stream_buffer_size)
+            running[asyncio.create_task(self._stream_stage(workflow, stage_id, stage_input, pipe))] = stage_id
+            # Subscribed before the producer task first runs, so no chunk is missed
+            for child in workflow.children[stage_id]:
+                others = [parent for parent in workflow.parents(child) if parent != stage_id]
+                if (child in running.values() or not self._is_streaming_stage(workflow, child) or
+                        not all(parent in outputs for parent in others) or
+                        self.checkpoints.get(Workflow.checkpoint_key(task.get("id"), child)) is not None):
+                    continue
+                start_stage(child, piped_input(child, stage_id, pipe.subscribe()))
+
+        def start_ready_stages() -> None:
+            for stage_id in workflow.order:
+                if stage_id in outputs or stage_id in running.values():
+                    continue
+                parents = workflow.parents(stage_id)
+                if not all(parent in outputs for parent in parents):
+                    continue
+                checkpoint = self.checkpoints.get(Workflow.checkpoint_key(task.get("id"), stage_id))
+                if checkpoint is not None:
+                    # Finished on an earlier attempt; reuse instead of paying for it again.
+                    # Stages are visited in topological order, so children see this output.
+                    outputs[stage_id] = checkpoint
+                    self.logger.info(f"Resuming task {task.get('id')} past checkpointed stage {stage_id}")
+                    continue
+                streaming_parents = [parent for parent in parents if self._is_streaming_stage(workflow, parent)]
+                if streaming_parents and self._is_streaming_stage(workflow, stage_id):
+                    source = streaming_parents[0]
+                    start_stage(stage_id, piped_input(stage_id, source, replay(outputs[source].get("output", ""))))
+                else:
+                    start_stage(stage_id, Workflow.stage_input(task, {parent: outputs[parent] for parent in parents}))
+
+        start_ready_stages()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    stage_id = running.pop(finished)
+                    output = finished.result()
+                    if isinstance(output, dict) and output.get("status") == "failed":
+                        raise WorkflowStageError(workflow_name, stage_id, output.get("error", "unknown error"))
+                    outputs[stage_id] = output
+                    self._checkpoint_stage(task.get("id"), stage_id, output)
+                start_ready_stages()
+        finally:
+            # A failed stage aborts the workflow; don't leave sibling stages running
+            for pending in running:
+                pending.cancel()
+
+        # The workflow finished, so its checkpoints are no longer needed
+        for stage_id in workflow.order:
+            self.checkpoints.pop(Workflow.checkpoint_key(task.get("id"), stage_id))
+        return Workflow.stage_input(task, {sink: outputs[sink] for sink in workflow.sinks()})
+
+    def _checkpoint_stage(self, task_id: str, stage_id: str, output: Dict[str, Any]) -> None:
+        """Record a finished stage's output in memory and in the journal"""
+        self.checkpoints.put(Workflow.checkpoint_key(task_id, stage_id), output)
+        if self.journal:
+            self.journal.append({"type": "stage", "task_id": task_id, "stage": stage_id, "output": output})
+
+    async def _run_stage(self, workflow: Workflow, stage_id: str, stage_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single workflow stage on its agent"""
+        stage = workflow.stages[stage_id]
+        agent_id = stage["agent"]
+        if agent_id not in self.agents:
+            self.logger.warning(f"Agent {agent_id} not found in workflow {workflow.name}")
+            return stage_input
+        timeout = stage.get("timeout", self.stage_timeout)
+        try:
+            return await asyncio.wait_for(self.run_agent(agent_id, stage_input), timeout)
+        except asyncio.TimeoutError:
+            raise WorkflowStageError(workflow.name, stage_id, f"timed out after {timeout}s")
+        except WorkflowStageError:
+            raise
+        except Exception as e:
+            # An agent that raises is retried and resumed like one that reports a failed result
+            raise WorkflowStageError(workflow.name, stage_id, str(e)) from e
+
+    def _is_streaming_stage(self, workflow: Workflow, stage_id: str) -> bool:
+        """Whether a stage is configured to stream and its agent can"""
+        agent = self.agents.get(workflow.stages[stage_id]["agent"])
+        return workflow.stages[stage_id].get("stream", False) and agent is not None and agent.supports_streaming
+
+    async def _stream_stage(self, workflow: Workflow, stage_id: str, stage_input: Dict[str, Any],
+                            pipe: StreamPipe) -> Dict[str, Any]:
+        """Run a streaming workflow stage, publishing its chunks to the stage's pipe"""
+        timeout = workflow.stages[stage_id].get("timeout", self.stage_timeout)
+        try:
+            return await asyncio.wait_for(self._stream_agent(workflow.stages[stage_id]["agent"], stage_input, pipe), timeout)
+        except asyncio.TimeoutError:
+            raise WorkflowStageError(workflow.name, stage_id, f"timed out after {timeout}s")
+        except WorkflowStageError:
+            raise
+        except Exception as e:
+            # Streaming agents raise rather than return a failed result; retry them like other stages
+            raise WorkflowStageError(workflow.name, stage_id, str(e)) from e
+
+    async def _stream_agent(self, agent_id: str, task: Dict[str, Any], pipe: StreamPipe) -> Dict[str, Any]:
+        """Stream a task on an agent into a pipe, returning the full output once it ends"""
+        chunks = []
+        self.agent_load[agent_id] += 1
+        semaphore = self.agent_semaphores.get(agent_id)
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                stream = self.agents[agent_id].stream_task(task)
+                try:
+                    async for chunk in stream:
+                        chunks.append(chunk)
+                        await pipe.publish(chunk)
+                finally:
+                    await stream.aclose()
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        except asyncio.CancelledError:
+            pipe.close(RuntimeError(f"Upstream agent {agent_id} was cancelled"))
+            raise
+        except Exception as e:
+            pipe.close(e)
+            raise
+        finally:
+            self.agent_load[agent_id] -= 1
+
+        pipe.close()
+        return {"task_id": task.get("id"), "status": "completed", "output": "".join(chunks)}
 
     async def monitor_agents(self) -> None:
         """Monitor agent health and status"""
@@ -142,6 +666,21 @@ class AgentManager:
             except Exception as e:
                 self.logger.error(f"Error monitoring agents: {str(e)}")
 
+    async def autoscale_pools(self) -> None:
+        """Periodically resize agent pools to match demand"""
+        while self.running:
+            try:
+                queue_stats = self.get_agent_queue_stats()
+                for agent_id, agent in self.agents.items():
+                    if isinstance(agent, AgentPool):
+                        stats = queue_stats.get(agent_id, {"queued": 0, "max_wait_seconds": 0.0})
+                        await agent.autoscale(stats["queued"], stats["max_wait_seconds"])
+
+                await asyncio.sleep(self.autoscale_interval)
+
+            except Exception as e:
+                self.logger.error(f"Error autoscaling agent pools: {str(e)}")
+
     def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Get status of a specific agent"""
         if agent_id in self.agents:
@@ -150,7 +689,10 @@ class AgentManager:
                 "id": agent_id,
                 "status": agent.status,
                 "last_heartbeat": agent.last_heartbeat.isoformat(),
-                "capabilities": agent.get_capabilities()
+                "capabilities": agent.get_capabilities(),
+                "load": self.agent_load.get(agent_id, 0),
+                "pool_size": agent.size if isinstance(agent, AgentPool) else 1,
+                "batching": self.batchers[agent_id].stats if agent_id in self.batchers else None
             }
         return None
 
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import time
+from typing import Dict, Any, AsyncIterator, Callable, List
+from ..core.base_agent import BaseAgent
+
+
+class AgentPool(BaseAgent):
+    """A pool of identical agent instances that scales with demand
+
+    Configured through a "pool" entry on the agent in the registry:
+
+        "pool": {
+            "min_size": 1,
+            "max_size": 4,
+            "scale_up_queue_depth": 4,
+            "scale_up_wait_seconds": 2,
+            "scale_down_idle_seconds": 60
+        }
+
+    Each instance runs at most `max_concurrent_tasks` tasks; tasks beyond that wait for a
+    free slot. `autoscale` adds an instance when too many tasks are waiting or the average
+    slot wait gets too long, and removes instances that have been idle for a while. Tasks
+    still in the manager's queue count as waiting too: the manager's workers are usually
+    fewer than the pool could run, so most of the backlog never reaches the pool itself.
+    """
+
+    def __init__(self, agent_id: str, config: Dict[str, Any], factory: Callable[[str], BaseAgent]):
+        super().__init__(agent_id, config)
+        pool_config = config.get("pool", {})
+        self.min_size = pool_config.get("min_size", 1)
+        self.max_size = pool_config.get("max_size", max(self.min_size, 4))
+        self.scale_up_queue_depth = pool_config.get("scale_up_queue_depth", 4)
+        self.scale_up_wait_seconds = pool_config.get("scale_up_wait_seconds", 2.0)
+        self.scale_down_idle_seconds = pool_config.get("scale_down_idle_seconds", 60.0)
+        self.tasks_per_instance = config.get("max_concurrent_tasks", 2)
+        self.factory = factory
+        self.instances: Dict[str, BaseAgent] = {}
+        self.instance_load: Dict[str, int] = {}
+        self.last_active: Dict[str, float] = {}
+        self.waiting = 0
+        self.avg_wait_seconds = 0.0
+        self._instance_ids = itertools.count(1)
+        self._slots = asyncio.Condition()
+        for _ in range(self.min_size):
+            self._add_instance()
+        # Instances are identical, so the pool streams if its instance type does
+        self.supports_streaming = any(instance.supports_streaming for instance in self.instances.values())
+
+    @property
+    def size(self) -> int:
+        return len(self.instances)
+
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task on the least-loaded instance, waiting for a free slot if needed"""
+        instance_id = await self._acquire_slot()
+        try:
+            return await self.instances[instance_id].process_task(task)
+        finally:
+            await self._release_slot(instance_id)
+
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[str]:
+        """Stream a task from the least-loaded instance, holding its slot until the stream ends"""
+        instance_id = await self._acquire_slot()
+        try:
+            async for chunk in self.instances[instance_id].stream_task(task):
+                yield chunk
+        finally:
+            await self._release_slot(instance_id)
+
+    async def _acquire_slot(self) -> str:
+        started = time.monotonic()
+        async with self._slots:
+            self.waiting += 1
+            try:
+                await self._slots.wait_for(self._has_free_slot)
+            finally:
+                self.waiting -= 1
+            instance_id = min(self.instances, key=lambda iid: self.instance_load[iid])
+            self.instance_load[instance_id] += 1
+        self._record_wait(time.monotonic() - started)
+        return instance_id
+
+    async def _release_slot(self, instance_id: str) -> None:
+        async with self._slots:
+            self.instance_load[instance_id] -= 1
+            self.last_active[instance_id] = time.monotonic()
+            self._slots.notify()
+
+    async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
+        self.logger.error(f"Error processing task {task.get('id')}: {str(error)}")
+
+    async def autoscale(self, queued: int = 0, queue_wait: float = 0.0) -> None:
+        """Grow or shrink the pool based on waiting tasks and wait latency
+
+        `queued` and `queue_wait` are the number of this pool's tasks still in the manager's
+        queue and the longest any of them has waited there.
+        """
+        async with self._slots:
+            waiting = self.waiting + queued
+            if self.size < self.max_size and (
+                waiting >= self.scale_up_queue_depth or
+                max(self.avg_wait_seconds, queue_wait) >= self.scale_up_wait_seconds
+            ):
+                self._add_instance()
+                self._slots.notify(self.tasks_per_instance)
+                return
+
+            if self.size > self.min_size and waiting == 0:
+                now = time.monotonic()
+                for instance_id in self._idle_instances(now):
+                    self._remove_instance(instance_id)
+                    if self.size <= self.min_size:
+                        break
+
+    def _has_free_slot(self) -> bool:
+        return any(load < self.tasks_per_instance for load in self.instance_load.values())
+
+    def _idle_instances(self, now: float) -> List[str]:
+        return [
+            instance_id for instance_id, load in self.instance_load.items()
+            if load == 0 and now - self.last_active[instance_id] >= self.scale_down_idle_seconds
+        ]
+
+    def _add_instance(self) -> None:
+        instance_id = f"{self.agent_id}_{next(self._instance_ids)}"
+        self.instances[instance_id] = self.factory(instance_id)
+        self.instance_load[instance_id] = 0
+        self.last_active[instance_id] = time.monotonic()
+        # Fresh capacity resets the wait estimate so one slow spell doesn't keep scaling up
+        self.avg_wait_seconds = 0.0
+        self.logger.info(f"Pool scaled up to {self.size} instances")
+
+    def _remove_instance(self, instance_id: str) -> None:
+        del self.instances[instance_id]
+        del self.instance_load[instance_id]
+        del self.last_active[instance_id]
+        self.logger.info(f"Pool scaled down to {self.size} instances")
+
+    def _record_wait(self, wait: float) -> None:
+        # Exponentially weighted so the estimate follows recent load
+        self.avg_wait_seconds = 0.7 * self.avg_wait_seconds + 0.3 * wait
@@ -0,0 +1,85 @@
+import asyncio
+from typing import AsyncIterator, List, Optional
+
+
+class _End:
+    """Marks the end of a stream, optionally with the error that ended it"""
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.error = error
+
+
+class _Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Bounds the chunks in the queue; the end marker doesn't need a slot
+        self.space = asyncio.Semaphore(buffer_size)
+        # Chunks queued beyond the buffer before the subscriber started reading
+        self.overflow = 0
+        self.started = False
+        self.closed = False
+
+
+class StreamPipe:
+    """Fans a workflow stage's output chunks out to downstream stages through bounded buffers
+
+    Each subscriber gets its own buffer of `buffer_size` chunks. `publish` waits while any
+    subscriber's buffer is full, so the slowest consumer paces the producer instead of
+    chunks piling up in memory. A subscriber that stops reading early is dropped.
+
+    Until a subscriber starts reading, its buffer grows instead of blocking: the consumer
+    may itself be waiting for a concurrency slot, possibly one the producer holds, and
+    blocking on it could deadlock.
+    """
+
+    def __init__(self, buffer_size: int = 16):
+        self.buffer_size = buffer_size
+        self._subscribers: List[_Subscriber] = []
+
+    def subscribe(self) -> AsyncIterator[str]:
+        """Get an iterator over every chunk published from now on"""
+        subscriber = _Subscriber(self.buffer_size)
+        self._subscribers.append(subscriber)
+        return self._iterate(subscriber)
+
+    async def publish(self, chunk: str) -> None:
+        for subscriber in self._subscribers:
+            if subscriber.closed:
+                continue
+            if not subscriber.started and subscriber.space.locked():
+                subscriber.overflow += 1
+            else:
+                await subscriber.space.acquire()
+                if subscriber.closed:
+                    continue
+            subscriber.queue.put_nowait(chunk)
+
+    def close(self, error: Optional[Exception] = None) -> None:
+        """End the stream for every subscriber, raising `error` in them if given"""
+        for subscriber in self._subscribers:
+            subscriber.queue.put_nowait(_End(error))
+
+    async def _iterate(self, subscriber: _Subscriber) -> AsyncIterator[str]:
+        subscriber.started = True
+        try:
+            while True:
+                item = await subscriber.queue.get()
+                if isinstance(item, _End):
+                    if item.error is not None:
+                        raise item.error
+                    return
+                if subscriber.overflow:
+                    subscriber.overflow -= 1
+                else:
+                    subscriber.space.release()
+                yield item
+        finally:
+            subscriber.closed = True
+            # Unblock a producer waiting for room in this subscriber's buffer
+            subscriber.space.release()
+
+
+async def replay(text: str) -> AsyncIterator[str]:
+    """A finished stage's output as a one-chunk stream, for children that expect piped input"""
+    if text:
+        yield text
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import logging
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set, Tuple
+from utils.token_estimator import estimate_tokens
+
+
+class TaskBatcher:
+    """Packs small tasks bound for one agent into combined batch tasks
+
+    Configured through a "batching" entry on the agent in the registry:
+
+        "batching": {
+            "enabled": true,
+            "linger_ms": 50,
+            "max_batch_size": 8,
+            "max_batch_tokens": 2000,
+            "max_task_tokens": 400
+        }
+
+    Tasks whose "code" fits in `max_task_tokens` wait up to `linger_ms` for company; the
+    batch is dispatched as one {"batch": [...]} task once the window closes, `max_batch_size`
+    is reached or the next task would overflow `max_batch_tokens`. The agent answers with
+    one result per task under "results". If a batch fails as a whole its tasks are
+    dispatched one by one, so batching never turns a good task into a failed one.
+    """
+
+    def __init__(self, agent_id: str, config: Dict[str, Any],
+                 dispatch: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        self.agent_id = agent_id
+        self.linger_seconds = config.get("linger_ms", 50) / 1000
+        self.max_batch_size = config.get("max_batch_size", 8)
+        self.max_batch_tokens = config.get("max_batch_tokens", 2000)
+        self.max_task_tokens = config.get("max_task_tokens", 400)
+        self.dispatch = dispatch
+        self.logger = logging.getLogger("agent_manager.batcher")
+        self.stats = {"batches": 0, "batched_tasks": 0, "fallbacks": 0}
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batch_ids = itertools.count(1)
+        self._running: Set[asyncio.Task] = set()
+
+    def accepts(self, task: Dict[str, Any]) -> bool:
+        """Whether a task is small enough to be batched"""
+        code = task.get("code")
+        return isinstance(code, str) and "batch" not in task and estimate_tokens(code) <= self.max_task_tokens
+
+    async def submit(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a task for the next batch and wait for its own result"""
+        tokens = estimate_tokens(task["code"])
+        if self._pending and self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((task, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.linger_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        # Waiters cancelled during the linger window (e.g. by a timeout) drop out
+        batch = [(task, future) for task, future in batch if not future.done()]
+        if batch:
+            runner = asyncio.create_task(self._run_batch(batch))
+            self._running.add(runner)
+            runner.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        tasks = [task for task, _ in batch]
+        batch_id = f"{self.agent_id}_batch_{next(self._batch_ids)}"
+        try:
+            result = await self.dispatch({"id": batch_id, "batch": tasks})
+        except Exception as e:
+            result = {"status": "failed", "error": str(e)}
+
+        results = result.get("results")
+        if result.get("status") != "completed" or not isinstance(results, list) or len(results) != len(batch):
+            self.logger.warning(f"Batch {batch_id} failed ({result.get('error')}), running its {len(batch)} tasks individually")
+            self.stats["fallbacks"] += 1
+            await asyncio.gather(*[self._run_single(task, future) for task, future in batch])
+            return
+
+        self.stats["batches"] += 1
+        self.stats["batched_tasks"] += len(batch)
+        for (_, future), task_result in zip(batch, results):
+            if not future.done():
+                future.set_result(task_result)
+
+    async def _run_single(self, task: Dict[str, Any], future: asyncio.Future) -> None:
+        try:
+            result = await self.dispatch(task)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
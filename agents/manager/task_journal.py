@@ -0,0 +1,149 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+
+class TaskJournal:
+    """Append-only on-disk journal of task submissions, stage completions and results
+
+    Records are JSON lines. Appends are buffered and written by a single flusher task, so
+    every record that arrives while a write + fsync is in progress is committed together
+    in the next batch (group commit) and the fsync cost is shared.
+
+    On open, the journal is replayed to find tasks that were submitted but never finished,
+    then compacted down to just those tasks. A long-running manager compacts the same way
+    whenever the file grows past `max_bytes`, so it never grows without bound.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger("agent_manager.journal")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.next_sequence = 1
+        self.unfinished = self._load()
+        self._compact_at = max(self.max_bytes, 2 * self._compact(self.unfinished))
+        self._file = open(path, "a", encoding="utf-8")
+        self._buffer: List[Tuple[str, asyncio.Future]] = []
+        self._unflushed: Set[asyncio.Future] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def append(self, record: Dict[str, Any]) -> asyncio.Future:
+        """Queue a record for writing; the returned future resolves once it is fsynced"""
+        future = asyncio.get_running_loop().create_future()
+        # Callers may fire and forget; failures are logged by the flusher instead
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        future.add_done_callback(self._unflushed.discard)
+        self._unflushed.add(future)
+        self._buffer.append((json.dumps(record, default=str), future))
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        self._wakeup.set()
+        return future
+
+    async def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """Write a batch of records and wait until they are durable"""
+        if records:
+            await asyncio.gather(*[self.append(record) for record in records])
+
+    async def close(self) -> None:
+        """Flush buffered records and close the journal file"""
+        if self._flusher is not None:
+            # Includes the batch currently being written, not just the buffer
+            if self._unflushed:
+                await asyncio.gather(*self._unflushed, return_exceptions=True)
+            self._flusher.cancel()
+            self._flusher = None
+        if not self._file.closed:
+            self._file.close()
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                continue
+            try:
+                await loop.run_in_executor(None, self._write, [line for line, _ in batch])
+            except Exception as e:
+                self.logger.error(f"Error writing task journal: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _write(self, lines: List[str]) -> None:
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._file.tell() >= self._compact_at:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        """Compact the journal in place; runs in the flusher, so no write can interleave"""
+        self._file.close()
+        size = self._compact(self._load())
+        # Leave room to grow, so tasks that stay unfinished don't force a compaction per write
+        self._compact_at = max(self.max_bytes, 2 * size)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.logger.info(f"Compacted task journal to {size} bytes")
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Replay the journal into the set of unfinished tasks"""
+        unfinished: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return unfinished
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a torn final record
+                    self.logger.warning(f"Skipping unreadable journal record at line {line_number}")
+                    continue
+                self._apply(record, unfinished)
+        return unfinished
+
+    def _apply(self, record: Dict[str, Any], unfinished: Dict[str, Dict[str, Any]]) -> None:
+        record_type = record.get("type")
+        task_id = record.get("task_id")
+        if record_type == "sequence":
+            self.next_sequence = max(self.next_sequence, record["next"])
+        elif record_type == "submitted":
+            self.next_sequence = max(self.next_sequence, record.get("seq", 0) + 1)
+            unfinished[task_id] = {"task": record["task"], "priority": record.get("priority"), "stages": {}}
+        elif record_type == "stage" and task_id in unfinished:
+            unfinished[task_id]["stages"][record["stage"]] = record["output"]
+        elif record_type in ("completed", "failed", "cancelled"):
+            unfinished.pop(task_id, None)
+
+    def _compact(self, unfinished: Dict[str, Dict[str, Any]]) -> int:
+        """Rewrite the journal with only the records still needed for recovery; returns its size"""
+        records: List[Dict[str, Any]] = [{"type": "sequence", "next": self.next_sequence}]
+        for task_id, entry in unfinished.items():
+            records.append({"type": "submitted", "task_id": task_id, "task": entry["task"], "priority": entry["priority"]})
+            for stage, output in entry["stages"].items():
+                records.append({"type": "stage", "task_id": task_id, "stage": stage, "output": output})
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        os.replace(temp_path, self.path)
+        return size
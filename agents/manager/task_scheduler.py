@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Deque, Set, Tuple
+
+ADMISSION_POLICIES = ("reject", "block", "shed")
+
+
+class QueueFullError(Exception):
+    """Raised when a task is refused or shed because the queue is at capacity"""
+    pass
+
+
+class _Entry:
+    """A queued task together with its scheduling keys"""
+
+    __slots__ = ("priority", "deadline", "seq", "enqueued_at", "task", "removed")
+
+    def __init__(self, priority: int, deadline: Optional[float], seq: int, task: Dict[str, Any]):
+        self.priority = priority
+        self.deadline = deadline
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.task = task
+        self.removed = False
+
+    def __lt__(self, other: "_Entry") -> bool:
+        # Earliest deadline first; tasks without a deadline go last, in arrival order
+        mine = self.deadline if self.deadline is not None else math.inf
+        theirs = other.deadline if other.deadline is not None else math.inf
+        return (mine, self.seq) < (theirs, other.seq)
+
+
+class TaskScheduler:
+    """Priority-class task queue with earliest-deadline-first ordering inside each class
+
+    Lower class numbers are served first. To stop low-priority work from starving, a class
+    whose oldest task has waited `aging_seconds` is treated as one class more urgent for
+    every `aging_seconds` waited, and when it wins that way its oldest task is served.
+    Inside a class, a task without a deadline that has waited `aging_seconds` goes ahead
+    of the deadline tasks, which would otherwise always sort before it.
+
+    With a `capacity`, the admission policy decides what happens when the queue is full:
+    "reject" raises QueueFullError, "block" waits up to `admission_timeout` seconds for
+    room, and "shed" evicts queued tasks strictly less urgent than the incoming ones.
+
+    Exposes the same put/get/task_done/join interface the manager used with asyncio.Queue.
+    """
+
+    def __init__(self, aging_seconds: float = 30.0, capacity: Optional[int] = None,
+                 admission_policy: str = "reject", admission_timeout: float = 5.0):
+        if admission_policy not in ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy: {admission_policy}")
+        self.aging_seconds = aging_seconds
+        self.capacity = capacity
+        self.admission_policy = admission_policy
+        self.admission_timeout = admission_timeout
+        self._heaps: Dict[int, List[_Entry]] = {}
+        self._arrivals: Dict[int, Deque[_Entry]] = {}
+        # Arrival order of the tasks without a deadline, for aging inside a class
+        self._undated: Dict[int, Deque[_Entry]] = {}
+        self._sizes: Dict[int, int] = {}
+        # Removed entries still held by the indexes above, per class
+        self._stale: Dict[int, int] = {}
+        self._by_id: Dict[str, _Entry] = {}
+        self._seq = itertools.count()
+        self._lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(self._lock)
+        self._not_full = asyncio.Condition(self._lock)
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._wait_stats: Dict[int, Dict[str, float]] = {}
+        self._wakeups: Set[asyncio.Task] = set()
+
+    def qsize(self) -> int:
+        return sum(self._sizes.values())
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        return self.capacity is not None and self.qsize() >= self.capacity
+
+    async def put(self, task: Dict[str, Any], priority: int, deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Queue a task in a priority class, with an optional time.monotonic() deadline
+
+        Returns the tasks shed to make room (only under the "shed" policy).
+        """
+        return await self.put_many([(task, priority, deadline)])
+
+    async def put_many(self, items: List[Tuple[Dict[str, Any], int, Optional[float]]]) -> List[Dict[str, Any]]:
+        """Queue a batch of (task, priority, deadline) items all-or-nothing
+
+        Returns the tasks shed to make room (only under the "shed" policy).
+        """
+        if not items:
+            return []
+        async with self._lock:
+            shed = await self._make_room(len(items), max(priority for _, priority, _ in items))
+            for task, priority, deadline in items:
+                self._push(_Entry(priority, deadline, next(self._seq), task))
+            self._not_empty.notify(len(items))
+        return shed
+
+    def restore(self, task: Dict[str, Any], priority: int, deadline: Optional[float] = None) -> None:
+        """Queue a recovered task before workers start, bypassing admission control"""
+        self._push(_Entry(priority, deadline, next(self._seq), task))
+
+    def remove(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a queued task by ID, returning it if it was still waiting"""
+        entry = self._by_id.get(task_id)
+        if entry is None or entry.removed:
+            return None
+        self._remove(entry)
+        self.task_done()
+        self._wake_blocked_submitters()
+        return entry.task
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for and remove the next task to run"""
+        async with self._lock:
+            while self.empty():
+                await self._not_empty.wait()
+            entry = self._pop_next()
+            self._not_full.notify_all()
+        self._record_wait(entry)
+        return entry.task
+
+    def task_done(self) -> None:
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        """Wait until every queued task has been processed"""
+        await self._finished.wait()
+
+    def get_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Queue depth and queue-wait time per priority class"""
+        stats = {}
+        for priority in sorted(set(self._sizes) | set(self._wait_stats)):
+            waits = self._wait_stats.get(priority, {"count": 0, "total": 0.0, "max": 0.0})
+            stats[priority] = {
+                "queued": self._sizes.get(priority, 0),
+                "dequeued": int(waits["count"]),
+                "avg_wait_seconds": waits["total"] / waits["count"] if waits["count"] else 0.0,
+                "max_wait_seconds": waits["max"]
+            }
+        return stats
+
+    def queued(self) -> List[Tuple[Dict[str, Any], float]]:
+        """Every task still queued, with how many seconds it has waited so far"""
+        now = time.monotonic()
+        return [
+            (entry.task, now - entry.enqueued_at)
+            for arrivals in self._arrivals.values()
+            for entry in arrivals
+            if not entry.removed
+        ]
+
+    async def _make_room(self, count: int, least_urgent: int) -> List[Dict[str, Any]]:
+        """Apply the admission policy so `count` more tasks fit; called with the lock held"""
+        if self.capacity is None or self.qsize() + count <= self.capacity:
+            return []
+        if count > self.capacity:
+            raise QueueFullError(f"Batch of {count} tasks exceeds queue capacity {self.capacity}")
+
+        if self.admission_policy == "block":
+            try:
+                await asyncio.wait_for(
+                    self._not_full.wait_for(lambda: self.qsize() + count <= self.capacity),
+                    self.admission_timeout
+                )
+            except asyncio.TimeoutError:
+                raise QueueFullError(f"Queue still full after waiting {self.admission_timeout}s")
+            return []
+
+        if self.admission_policy == "shed":
+            needed = self.qsize() + count - self.capacity
+            victims = self._shed_candidates(needed)
+            # Only shed work that is strictly less urgent than everything being admitted
+            if len(victims) == needed and all(victim.priority > least_urgent for victim in victims):
+                for victim in victims:
+                    self._remove(victim)
+                    self.task_done()
+                return [victim.task for victim in victims]
+
+        raise QueueFullError(f"Queue is at capacity ({self.capacity} tasks)")
+
+    def _wake_blocked_submitters(self) -> None:
+        """Let submitters blocked on a full queue recheck for room; `remove` can't take the lock itself"""
+        if self.capacity is None:
+            return
+        wakeup = asyncio.get_running_loop().create_task(self._notify_not_full())
+        # Hold a reference until it runs so the task isn't garbage collected
+        self._wakeups.add(wakeup)
+        wakeup.add_done_callback(self._wakeups.discard)
+
+    async def _notify_not_full(self) -> None:
+        async with self._lock:
+            self._not_full.notify_all()
+
+    def _shed_candidates(self, count: int) -> List[_Entry]:
+        """The `count` least urgent queued entries: lowest class first, newest arrival first"""
+        victims = []
+        for priority in sorted(self._sizes, reverse=True):
+            for entry in reversed(self._arrivals.get(priority, ())):
+                if len(victims) == count:
+                    return victims
+                if not entry.removed:
+                    victims.append(entry)
+        return victims
+
+    def _push(self, entry: _Entry) -> None:
+        heapq.heappush(self._heaps.setdefault(entry.priority, []), entry)
+        self._arrivals.setdefault(entry.priority, deque()).append(entry)
+        if entry.deadline is None:
+            self._undated.setdefault(entry.priority, deque()).append(entry)
+        self._sizes[entry.priority] = self._sizes.get(entry.priority, 0) + 1
+        if entry.task.get("id") is not None:
+            self._by_id[entry.task["id"]] = entry
+        self._unfinished += 1
+        self._finished.clear()
+
+    def _pop_next(self) -> _Entry:
+        now = time.monotonic()
+        best_key = None
+        best_priority = None
+        most_urgent = None
+        for priority, size in self._sizes.items():
+            if not size:
+                continue
+            if most_urgent is None or priority < most_urgent:
+                most_urgent = priority
+            oldest = self._oldest(priority)
+            boost = int((now - oldest.enqueued_at) / self.aging_seconds) if self.aging_seconds > 0 else 0
+            key = (priority - boost, priority)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_priority = priority
+
+        undated = self._oldest_undated(best_priority)
+        if best_priority != most_urgent:
+            # Aging let this class overtake a more urgent one: serve its longest-waiting task
+            entry = self._arrivals[best_priority].popleft()
+        elif undated is not None and self.aging_seconds > 0 and now - undated.enqueued_at >= self.aging_seconds:
+            # Deadline tasks arriving all the time would otherwise keep this one waiting forever
+            entry = self._undated[best_priority].popleft()
+        else:
+            heap = self._heaps[best_priority]
+            entry = heapq.heappop(heap)
+            while entry.removed:
+                entry = heapq.heappop(heap)
+        self._remove(entry)
+        return entry
+
+    def _oldest(self, priority: int) -> _Entry:
+        arrivals = self._arrivals[priority]
+        while arrivals[0].removed:
+            arrivals.popleft()
+        return arrivals[0]
+
+    def _oldest_undated(self, priority: int) -> Optional[_Entry]:
+        undated = self._undated.get(priority)
+        while undated and undated[0].removed:
+            undated.popleft()
+        return undated[0] if undated else None
+
+    def _remove(self, entry: _Entry) -> None:
+        # Entries stay in the other indexes and are skipped lazily once marked removed
+        entry.removed = True
+        self._sizes[entry.priority] -= 1
+        if self._by_id.get(entry.task.get("id")) is entry:
+            del self._by_id[entry.task["id"]]
+        self._stale[entry.priority] = self._stale.get(entry.priority, 0) + 1
+        if self._stale[entry.priority] > max(self._sizes[entry.priority], 32):
+            self._compact(entry.priority)
+
+    def _compact(self, priority: int) -> None:
+        """Drop removed entries from a class's indexes once they outnumber the live ones"""
+        heap = [entry for entry in self._heaps[priority] if not entry.removed]
+        heapq.heapify(heap)
+        self._heaps[priority] = heap
+        self._arrivals[priority] = deque(entry for entry in self._arrivals[priority] if not entry.removed)
+        if priority in self._undated:
+            self._undated[priority] = deque(entry for entry in self._undated[priority] if not entry.removed)
+        self._stale[priority] = 0
+
+    def _record_wait(self, entry: _Entry) -> None:
+        wait = time.monotonic() - entry.enqueued_at
+        stats = self._wait_stats.setdefault(entry.priority, {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += wait
+        stats["max"] = max(stats["max"], wait)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class TaskHandle:
+    """Awaitable handle for a submitted task
+
+    Awaiting the handle returns the task result, or raises the error the task failed with.
+    """
+
+    def __init__(self, task_id: str, future: asyncio.Future):
+        self.task_id = task_id
+        self._future = future
+
+    def __await__(self):
+        return asyncio.shield(self._future).__await__()
+
+    def __str__(self) -> str:
+        return self.task_id
+
+    def __repr__(self) -> str:
+        return f"TaskHandle({self.task_id!r}, done={self.done()})"
+
+    def done(self) -> bool:
+        """Whether the task has finished (successfully or not)"""
+        return self._future.done()
+
+    async def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for the task result, optionally giving up after `timeout` seconds"""
+        return await asyncio.wait_for(asyncio.shield(self._future), timeout)
+
+
+class TaskResultStore:
+    """Bounded in-memory store of completed task results with TTL eviction"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._results: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        self._evict_expired()
+        return len(self._results)
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def put(self, task_id: str, result: Dict[str, Any]) -> None:
+        """Store a result, evicting expired and then oldest entries to stay bounded"""
+        self._results.pop(task_id, None)
+        self._results[task_id] = (time.monotonic(), result)
+        self._evict_expired()
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get a stored result, or None if unknown or expired"""
+        entry = self._results.get(task_id)
+        if entry is None:
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._results[task_id]
+            return None
+        return result
+
+    def pop(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Remove and return a stored result"""
+        result = self.get(task_id)
+        self._results.pop(task_id, None)
+        return result
+
+    def _evict_expired(self) -> None:
+        # Entries are kept in insertion order, so expired ones are always at the front
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._results:
+            task_id, (stored_at, _) = next(iter(self._results.items()))
+            if stored_at >= cutoff:
+                break
+            self._results.popitem(last=False)
@@ -0,0 +1,107 @@
+from typing import Dict, List, Any, Optional, Union
+
+
+class WorkflowStageError(Exception):
+    """Raised when a workflow stage reports a failed result"""
+
+    def __init__(self, workflow: str, stage_id: str, error: str):
+        super().__init__(f"Stage {stage_id} of workflow {workflow} failed: {error}")
+        self.workflow = workflow
+        self.stage_id = stage_id
+
+
+class Workflow:
+    """A workflow as a DAG of agent stages
+
+    Workflows are configured either as a flat list of agent IDs, which runs as a linear
+    chain, or as a dict with explicit dependencies:
+
+        {"stages": [
+            {"agent": "code_analyzer"},
+            {"agent": "code_generator", "depends_on": ["code_analyzer"]},
+            {"id": "audit", "agent": "security_auditor", "depends_on": ["code_generator"]}
+        ]}
+
+    A stage's ID defaults to its agent ID, and a stage may set its own "timeout" in
+    seconds. A stage with "stream": true streams its output to streaming children while
+    it runs, if its agent supports streaming. Dict workflows may also set a scheduling
+    "priority"; otherwise tasks take the least urgent priority of the workflow's agents.
+    """
+
+    def __init__(self, name: str, stages: Dict[str, Dict[str, Any]], priority: Optional[int] = None):
+        self.name = name
+        self.stages = stages
+        self.priority = priority
+        self.children: Dict[str, List[str]] = {stage_id: [] for stage_id in stages}
+        for stage_id, stage in stages.items():
+            for parent in stage["depends_on"]:
+                if parent not in stages:
+                    raise ValueError(f"Stage {stage_id} in workflow {name} depends on unknown stage {parent}")
+                self.children[parent].append(stage_id)
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_config(cls, name: str, definition: Union[List[str], Dict[str, Any]]) -> "Workflow":
+        """Build a workflow from its registry definition"""
+        stages: Dict[str, Dict[str, Any]] = {}
+        priority = None
+        if isinstance(definition, list):
+            previous = None
+            for agent_id in definition:
+                stages[agent_id] = {"agent": agent_id, "depends_on": [previous] if previous else []}
+                previous = agent_id
+        else:
+            for stage in definition["stages"]:
+                stage_id = stage.get("id", stage["agent"])
+                if stage_id in stages:
+                    raise ValueError(f"Duplicate stage {stage_id} in workflow {name}")
+                stages[stage_id] = {"agent": stage["agent"], "depends_on": list(stage.get("depends_on", []))}
+                for option in ("timeout", "stream"):
+                    if option in stage:
+                        stages[stage_id][option] = stage[option]
+            priority = definition.get("priority")
+        return cls(name, stages, priority)
+
+    def parents(self, stage_id: str) -> List[str]:
+        return self.stages[stage_id]["depends_on"]
+
+    def roots(self) -> List[str]:
+        return [stage_id for stage_id in self.order if not self.parents(stage_id)]
+
+    def sinks(self) -> List[str]:
+        return [stage_id for stage_id in self.order if not self.children[stage_id]]
+
+    def _topological_order(self) -> List[str]:
+        """Order stages so every stage comes after its dependencies, rejecting cycles"""
+        remaining = {stage_id: len(stage["depends_on"]) for stage_id, stage in self.stages.items()}
+        ready = [stage_id for stage_id, count in remaining.items() if count == 0]
+        order = []
+        while ready:
+            stage_id = ready.pop(0)
+            order.append(stage_id)
+            for child in self.children[stage_id]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+        if len(order) != len(self.stages):
+            raise ValueError(f"Workflow {self.name} has a dependency cycle")
+        return order
+
+    @staticmethod
+    def checkpoint_key(task_id: str, stage_id: str) -> str:
+        """Key under which a stage's output is checkpointed"""
+        return f"{task_id}/{stage_id}"
+
+    @staticmethod
+    def stage_input(task: Dict[str, Any], parent_outputs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Build a stage's input from its parents' outputs
+
+        Root stages get the original task and single-parent stages get their parent's output
+        unchanged, so list workflows behave exactly like a chain. Stages that join several
+        branches get the original task with each parent's output under "upstream".
+        """
+        if not parent_outputs:
+            return task
+        if len(parent_outputs) == 1:
+            return next(iter(parent_outputs.values()))
+        return {**task, "upstream": dict(parent_outputs)}
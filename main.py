@@ -21,8 +21,8 @@ async def main():
         # Initialize agent manager
         manager = AgentManager()
         
-        # Start the manager
-        await manager.start()
+        # Start the manager in the background
+        runner = asyncio.create_task(manager.start())
         
         # Example task: Code analysis
         code_analysis_task = {
@@ -42,8 +42,12 @@ def calculate_sum(numbers):
         }
         
         # Submit task using the code development workflow
-        task_id = await manager.submit_task(code_analysis_task, workflow="code_development")
-        logger.info(f"Submitted task: {task_id}")
+        handle = await manager.submit_task(code_analysis_task, workflow="code_development")
+        logger.info(f"Submitted task: {handle.task_id}")
+        
+        # Wait for the workflow result
+        result = await handle
+        logger.info(f"Task {handle.task_id} finished with status: {result.get('status')}")
         
         # Keep the program running
         while True:
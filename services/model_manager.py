@@ -1,20 +1,88 @@
+import os
 import json
+import time
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import contextvars
+from typing import Dict, Any, AsyncIterator, Callable, Optional, List, Tuple
 from datetime import datetime, timedelta
 from utils.rate_limiter import RateLimiter, ModelRotator
+from utils.circuit_breaker import CircuitBreaker, classify_error, RATE_LIMIT, TRANSIENT, FATAL
+from utils.retry_policy import RetryPolicy, retry_after_seconds
+from utils.response_cache import ResponseCache, cache_key
+from utils.singleflight import SingleFlight
+from utils.hedging import LatencyWindow, HedgeBudget
+from utils.model_stats import ModelStats, DEFAULT_WEIGHTS
+from utils.token_estimator import estimate_request_tokens
+from services.model_providers import ModelProvider, ChatResult, create_provider
+
+# The model call running in the current context, so operations can report token usage
+_current_call: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("model_call", default=None)
 
 class ModelManager:
+    """Model selection, rate limiting and rotation for agents
+
+    Agents should share one manager per config through `ModelManager.shared()`, so the
+    whole process draws on a single quota ledger and health view per model instead of
+    each agent enforcing the provider limits separately.
+    """
+
+    _shared: Dict[str, "ModelManager"] = {}
+
     def __init__(self, config_path: str = "config/model_config.json"):
         self.config_path = config_path
         self.logger = self._setup_logger()
-        self.models = self._load_config()
-        self.rate_limiter = RateLimiter()
+        self.config = self._load_config()
+        self.models = self.config.get('models', {})
+        self.rate_limiter = RateLimiter(self.models)
         self.model_rotator = ModelRotator(self.models)
-        self.current_model = self.model_rotator.get_current_model()
-        self.retry_delay = 5  # seconds between retries
-        self.max_retries = 3
+        breaker_config = self.config.get('circuit_breaker', {})
+        self.breakers = {
+            model: CircuitBreaker(model, **breaker_config)
+            for model in self.models
+        }
+        self.response_cache = ResponseCache(**self.config.get('response_cache', {}))
+        self.in_flight = SingleFlight()
+        hedging = self.config.get('hedging', {})
+        self.hedge_percentile = hedging.get('percentile', 95)
+        self.hedge_min_samples = hedging.get('min_samples', 20)
+        self.hedge_budget = HedgeBudget(hedging.get('budget_ratio', 0.1), hedging.get('max_burst', 5))
+        self.latencies = {
+            model: LatencyWindow(hedging.get('window_size', 100))
+            for model in self.models
+        }
+        scoring = self.config.get('scoring', {})
+        self.score_weights = {**DEFAULT_WEIGHTS, **scoring.get('weights', {})}
+        self.stats = {
+            model: ModelStats(scoring.get('alpha', 0.2), scoring.get('decay_half_life_seconds', 60))
+            for model in self.models
+        }
+        self.provider_configs = self.config.get('providers', {})
+        # Route every model to one provider, e.g. MODEL_PROVIDER_OVERRIDE=stub to run offline
+        self.provider_override = os.getenv("MODEL_PROVIDER_OVERRIDE") or self.config.get('provider_override')
+        self.providers: Dict[str, ModelProvider] = {}
+        self.default_completion_tokens = self.config.get('token_estimation', {}).get('default_completion_tokens', 500)
+        self.retry_policy = RetryPolicy(**self.config.get('retry_policy', {}))
+        self.default_timeout = 120  # seconds a single model call may take
+        # Serializes model selection + quota reservation across concurrent callers. Created in
+        # the running loop, since on Python 3.9 a lock binds to the loop current at creation
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def shared(cls, config_path: str = "config/model_config.json") -> "ModelManager":
+        """Get the process-wide manager for a model config, creating it on first use"""
+        if config_path not in cls._shared:
+            cls._shared[config_path] = cls(config_path)
+        return cls._shared[config_path]
+
+    def _selection_lock(self) -> asyncio.Lock:
+        """The selection lock for the running event loop; a shared manager outlives loops"""
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
 
     def _setup_logger(self) -> logging.Logger:
         logger = logging.getLogger("model_manager")
@@ -28,77 +96,413 @@ class ModelManager:
     def _load_config(self) -> Dict[str, Any]:
         try:
             with open(self.config_path, 'r') as f:
-                config = json.load(f)
-            return config.get('models', {})
+                return json.load(f)
         except Exception as e:
             self.logger.error(f"Error loading model config: {str(e)}")
             return {}
 
+    def _pick_model(self, required_capabilities: List[str] = None, exclude: Optional[str] = None,
+                    tokens: int = 0) -> Tuple[Optional[str], Optional[float]]:
+        """Choose the best capable model that can serve right now
+
+        Returns (model, 0) when one has capacity, ranked by `_score` (static priority
+        weighed against recent latency, errors, rate limits and remaining quota);
+        (None, seconds) with the shortest wait until any capable model frees up; or
+        (None, None) when no enabled model has the required capabilities. `tokens` is the
+        request's estimated size, checked against models' token budgets.
+        """
+        best = None
+        best_key = None
+        soonest = None
+        for model in self.model_rotator.get_candidates(required_capabilities):
+            if model == exclude:
+                continue
+            # A model is usable once both its quota and its circuit breaker allow it
+            wait_time = max(
+                self.rate_limiter.time_until_available(model, tokens),
+                self.breakers[model].time_until_available()
+            )
+            if wait_time > 0:
+                soonest = wait_time if soonest is None else min(soonest, wait_time)
+                continue
+            key = (self._score(model), self.models[model].get("priority", 0))
+            if best_key is None or key < best_key:
+                best, best_key = model, key
+        if best:
+            return best, 0.0
+        return None, soonest
+
+    def _score(self, model: str) -> float:
+        """Cost of routing the next request to a model, from its priority and recent health"""
+        return self.stats[model].score(
+            self.models[model].get("priority", 0),
+            self.rate_limiter.get_remaining_fraction(model),
+            self.score_weights
+        )
+
     async def get_available_model(self, required_capabilities: List[str] = None) -> Optional[str]:
-        """Get an available model that meets the capability requirements"""
+        """Get an available model that meets the capability requirements
+
+        Waits only when every capable model is out of quota; returns None if no enabled
+        model has the required capabilities.
+        """
         while True:
-            model = self.model_rotator.get_current_model()
-            if not model:
+            model, wait_time = self._pick_model(required_capabilities)
+            if model or wait_time is None:
+                if not model:
+                    self.logger.error("No models available")
+                return model
+            await asyncio.sleep(wait_time)
+
+    async def reserve_model(self, required_capabilities: List[str] = None, tokens: int = 0) -> Optional[str]:
+        """Pick a model and charge one request to its quota as a single atomic step
+
+        The check and the charge happen under the manager's lock, so concurrent callers
+        can never overdraw a model's limits; waiting for quota happens outside the lock.
+        """
+        while True:
+            async with self._selection_lock():
+                model, wait_time = self._pick_model(required_capabilities, tokens=tokens)
+                if model:
+                    self.rate_limiter.increment_counter(model, tokens)
+                    self.breakers[model].acquire()
+                    return model
+            if wait_time is None:
                 self.logger.error("No models available")
                 return None
 
-            if required_capabilities:
-                model_capabilities = self.models[model].get('capabilities', [])
-                if not all(cap in model_capabilities for cap in required_capabilities):
-                    self.logger.warning(f"Model {model} doesn't have required capabilities")
-                    if not self.model_rotator.rotate_model():
-                        return None
-                    continue
-
-            # Check if model is rate limited
-            if await self.rate_limiter.wait_if_needed(model):
-                self.logger.info(f"Model {model} is rate limited, rotating to next model")
-                if not self.model_rotator.rotate_model():
-                    return None
-                continue
+            self.logger.info(f"All capable models are rate limited or tripped, waiting {wait_time:.2f}s")
+            await asyncio.sleep(wait_time)
 
+    async def try_reserve_model(self, required_capabilities: List[str] = None,
+                                exclude: Optional[str] = None, tokens: int = 0) -> Optional[str]:
+        """Reserve a capable model only if one has capacity right now, without waiting"""
+        async with self._selection_lock():
+            model, _ = self._pick_model(required_capabilities, exclude, tokens)
+            if model:
+                self.rate_limiter.increment_counter(model, tokens)
+                self.breakers[model].acquire()
             return model
 
-    async def execute_with_model(self, operation: callable, required_capabilities: List[str] = None) -> Any:
-        """Execute an operation with automatic model rotation and rate limit handling"""
-        retries = 0
-        last_error = None
+    async def get_cached_response(self, request: Dict[str, Any], required_capabilities: List[str] = None) -> Optional[Any]:
+        """Look up a cached response for a request from any model that could serve it"""
+        return await self.response_cache.get_any([
+            cache_key(model, request) for model in self.model_rotator.get_candidates(required_capabilities)
+        ])
 
-        while retries < self.max_retries:
-            model = await self.get_available_model(required_capabilities)
+    async def execute_with_model(self, operation: callable, required_capabilities: List[str] = None,
+                                 request: Optional[Dict[str, Any]] = None, hedge: bool = False,
+                                 stream: bool = False) -> Any:
+        """Execute an operation with automatic model rotation and rate limit handling
+
+        `request` describes what the operation sends (messages and parameters). When given,
+        the response cache is checked before any quota is reserved, and the result is cached
+        under the model that produced it. Identical requests already in flight share that
+        one upstream call instead of each reserving quota.
+
+        With `hedge`, a request still unanswered after the model's p95 latency is also sent
+        to a second capable model, within the hedge budget; the first answer wins.
+
+        With `stream`, `operation(model)` must return an async iterator of text chunks, and
+        the result is an async iterator over them (see `stream_with_model`).
+        """
+        if stream:
+            return self.stream_with_model(operation, required_capabilities, request)
+        if request is None:
+            return await self._execute(operation, required_capabilities, request, hedge)
+
+        cached = await self.get_cached_response(request, required_capabilities)
+        if cached is not None:
+            return cached
+        # The model isn't chosen until reservation, so identical requests for the same
+        # capabilities are coalesced (they would be served by the same model)
+        flight_key = cache_key(",".join(sorted(required_capabilities or [])), request)
+        return await self.in_flight.do(
+            flight_key,
+            lambda: self._execute(operation, required_capabilities, request, hedge)
+        )
+
+    async def _execute(self, operation: callable, required_capabilities: Optional[List[str]],
+                       request: Optional[Dict[str, Any]], hedge: bool = False) -> Any:
+        retry_state = self.retry_policy.start()
+        # Token budgets are charged with an estimate up front and reconciled by report_usage
+        tokens = estimate_request_tokens(request, self.default_completion_tokens) if request else 0
+
+        while True:
+            # Quota is reserved as part of selection, before making the request
+            model = await self.reserve_model(required_capabilities, tokens)
             if not model:
                 raise Exception("No available models meet the requirements")
 
             try:
-                # Increment counter before making the request
-                self.rate_limiter.increment_counter(model)
-                
-                # Execute the operation with the selected model
-                result = await operation(model)
+                if hedge:
+                    model, result = await self._call_hedged(model, operation, required_capabilities, tokens)
+                else:
+                    result = await self._call_model(model, operation, tokens)
+                if request is not None:
+                    await self.response_cache.put(cache_key(model, request), result)
                 return result
 
             except Exception as e:
-                last_error = e
-                error_message = str(e).lower()
-                
-                if "rate limit" in error_message:
+                error_class = classify_error(e)
+                delay = self.retry_policy.next_delay(retry_state, e, error_class)
+                if delay is None:
+                    if error_class == FATAL:
+                        self.logger.error(f"Non-retryable error from model {model}: {str(e)}")
+                        raise
+                    raise Exception(f"Giving up after {retry_state.attempts} failed attempts. Last error: {str(e)}") from e
+
+                if error_class == RATE_LIMIT:
                     self.logger.warning(f"Rate limit hit for model {model}")
-                    self.model_rotator.disable_model(model)
-                    # Wait before trying next model
-                    await asyncio.sleep(self.retry_delay)
                 else:
-                    self.logger.error(f"Error executing operation with model {model}: {str(e)}")
-                    retries += 1
-                    await asyncio.sleep(self.retry_delay)
+                    self.logger.error(f"Error executing operation with model {model}: {str(e)}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def stream_with_model(self, stream_operation: Callable[[str], AsyncIterator[str]],
+                                required_capabilities: List[str] = None,
+                                request: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Run a streaming operation on a reserved model, yielding its text chunks as they arrive
+
+        Failures before the first chunk are retried like `execute_with_model`, possibly on
+        another model. Once a chunk has been yielded the caller has acted on it, so a later
+        failure is raised instead of retried. A completed stream is cached as its full text,
+        separately from non-streamed results for the same request; a cache hit yields that
+        text as one chunk. Streams are neither coalesced nor hedged.
+        """
+        stream_request = {**request, "stream": True} if request is not None else None
+        if stream_request is not None:
+            cached = await self.get_cached_response(stream_request, required_capabilities)
+            if cached is not None:
+                yield cached
+                return
+
+        retry_state = self.retry_policy.start()
+        tokens = estimate_request_tokens(request, self.default_completion_tokens) if request else 0
+        while True:
+            model = await self.reserve_model(required_capabilities, tokens)
+            if not model:
+                raise Exception("No available models meet the requirements")
+
+            chunks = []
+            try:
+                async for chunk in self._stream_model(model, stream_operation, tokens):
+                    chunks.append(chunk)
+                    yield chunk
+            except Exception as e:
+                error_class = classify_error(e)
+                delay = None if chunks else self.retry_policy.next_delay(retry_state, e, error_class)
+                if delay is None:
+                    if error_class == FATAL or chunks:
+                        self.logger.error(f"Stream from model {model} failed: {str(e)}")
+                        raise
+                    raise Exception(f"Giving up after {retry_state.attempts} failed attempts. Last error: {str(e)}") from e
+
+                self.logger.error(f"Error starting stream with model {model}: {str(e)}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if stream_request is not None:
+                await self.response_cache.put(cache_key(model, stream_request), "".join(chunks))
+            return
+
+    async def _stream_model(self, model: str, stream_operation: Callable[[str], AsyncIterator[str]],
+                            tokens: int = 0) -> AsyncIterator[str]:
+        """Stream one reserved call, bounding the wait for each chunk by the model's timeout"""
+        timeout = self.models[model].get("timeout_seconds", self.default_timeout)
+        started = time.monotonic()
+        first_chunk_latency = None
+        call = {"model": model, "tokens": tokens}
+        stream = stream_operation(model)
+        recorded = False
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(self._next_chunk(stream, call), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Model {model} sent nothing for {timeout}s")
+                if first_chunk_latency is None:
+                    first_chunk_latency = time.monotonic() - started
+                yield chunk
+
+            recorded = True
+            # Scored by time to first chunk; full stream durations would skew the hedging p95
+            self.stats[model].record_success(first_chunk_latency or time.monotonic() - started)
+            self.breakers[model].record_success()
+
+        except Exception as e:
+            recorded = True
+            error_class = classify_error(e)
+            self.stats[model].record_failure(error_class, time.monotonic() - started)
+            if error_class == RATE_LIMIT:
+                self.breakers[model].record_failure(trip=True, open_seconds=retry_after_seconds(e))
+            elif error_class == TRANSIENT:
+                self.breakers[model].record_failure()
+            else:
+                self.breakers[model].release()
+            raise
+
+        finally:
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+            if not recorded:
+                # Cancelled, or the caller stopped reading early
+                self.breakers[model].release()
 
-        raise Exception(f"Failed after {self.max_retries} retries. Last error: {str(last_error)}")
+    @staticmethod
+    async def _next_chunk(stream: AsyncIterator[str], call: Dict[str, Any]) -> str:
+        # Each chunk may be read from a different task, so the running call is set per read
+        token = _current_call.set(call)
+        try:
+            return await stream.__anext__()
+        finally:
+            _current_call.reset(token)
+
+    async def _call_model(self, model: str, operation: callable, tokens: int = 0) -> Any:
+        """Run one reserved call, bounded by the model's timeout, and report it to its breaker"""
+        timeout = self.models[model].get("timeout_seconds", self.default_timeout)
+        started = time.monotonic()
+        call_token = _current_call.set({"model": model, "tokens": tokens})
+        try:
+            try:
+                result = await asyncio.wait_for(operation(model), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Model {model} did not respond within {timeout}s")
+
+        except asyncio.CancelledError:
+            self.breakers[model].release()
+            raise
+
+        except Exception as e:
+            error_class = classify_error(e)
+            self.stats[model].record_failure(error_class, time.monotonic() - started)
+            if error_class == RATE_LIMIT:
+                # Open the circuit for at least as long as the provider asked; the breaker lets
+                # a probe through once it cools down
+                self.breakers[model].record_failure(trip=True, open_seconds=retry_after_seconds(e))
+            elif error_class == TRANSIENT:
+                self.breakers[model].record_failure()
+            else:
+                self.breakers[model].release()
+            raise
 
-    async def schedule_model_reactivation(self, model: str, delay_minutes: int = 60):
-        """Schedule a model to be reactivated after a delay"""
-        self.logger.info(f"Scheduling reactivation of model {model} in {delay_minutes} minutes")
-        await asyncio.sleep(delay_minutes * 60)
-        self.model_rotator.enable_model(model)
-        self.logger.info(f"Reactivated model {model}")
+        finally:
+            _current_call.reset(call_token)
+
+        latency = time.monotonic() - started
+        self.latencies[model].record(latency)
+        self.stats[model].record_success(latency)
+        self.breakers[model].record_success()
+        return result
+
+    async def _call_hedged(self, primary: str, operation: callable, required_capabilities: Optional[List[str]],
+                           tokens: int = 0) -> Tuple[str, Any]:
+        """Call the primary model, backing it up with a second model if it runs past its p95
+
+        Returns the model that answered first and its result; the other call is cancelled.
+        Fails only if every call that was sent fails.
+        """
+        self.hedge_budget.record_request()
+        calls = {asyncio.create_task(self._call_model(primary, operation, tokens)): primary}
+        try:
+            delay = self._hedge_delay(primary)
+            if delay is not None:
+                done, _ = await asyncio.wait(set(calls), timeout=delay)
+                if not done:
+                    backup = await self._reserve_hedge(primary, required_capabilities, tokens)
+                    if backup:
+                        self.logger.info(f"Model {primary} slower than {delay:.2f}s, hedging with {backup}")
+                        calls[asyncio.create_task(self._call_model(backup, operation, tokens))] = backup
+
+            first_error = None
+            pending = set(calls)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        return calls[call], call.result()
+                    first_error = first_error or call.exception()
+            raise first_error
+        finally:
+            for call in calls:
+                if not call.done():
+                    call.cancel()
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """How long to wait on a model before hedging, or None until it has enough history"""
+        if len(self.latencies[model]) < self.hedge_min_samples:
+            return None
+        return self.latencies[model].percentile(self.hedge_percentile)
+
+    async def _reserve_hedge(self, primary: str, required_capabilities: Optional[List[str]],
+                             tokens: int = 0) -> Optional[str]:
+        # Only hedge onto a model with spare capacity right now, and only within budget
+        if not self.hedge_budget.try_spend():
+            return None
+        backup = await self.try_reserve_model(required_capabilities, exclude=primary, tokens=tokens)
+        if not backup:
+            self.hedge_budget.refund()
+        return backup
+
+    def get_provider(self, model: str) -> ModelProvider:
+        """Get the long-lived provider client that serves a model, creating it on first use"""
+        name = self.provider_override or self.models[model].get("provider", "openai")
+        if name not in self.providers:
+            if name not in self.provider_configs:
+                raise ValueError(f"Unknown model provider: {name}")
+            self.providers[name] = create_provider(name, self.provider_configs[name])
+        return self.providers[name]
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], **params) -> ChatResult:
+        """Send a chat request to a model through its provider and reconcile its token usage
+
+        Meant to be called from an operation passed to `execute_with_model`.
+        """
+        provider_model = self.models[model].get("provider_model", model)
+        result = await self.get_provider(model).chat(provider_model, messages, **params)
+        self.report_usage(result.usage)
+        return result
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, Any]], **params) -> AsyncIterator[str]:
+        """Stream a chat reply's text from a model through its provider, reconciling token usage at the end
+
+        Meant to be returned from a stream operation passed to `stream_with_model`.
+        """
+        provider_model = self.models[model].get("provider_model", model)
+        async for chunk in self.get_provider(model).stream_chat(provider_model, messages, **params):
+            if chunk.usage:
+                self.report_usage(chunk.usage)
+            if chunk.content:
+                yield chunk.content
+
+    async def close(self) -> None:
+        """Close all provider clients"""
+        for provider in self.providers.values():
+            await provider.close()
+        self.providers.clear()
+
+    @classmethod
+    async def close_shared(cls) -> None:
+        """Close the provider clients of every process-wide manager"""
+        for manager in cls._shared.values():
+            await manager.close()
+
+    def report_usage(self, usage: Any) -> None:
+        """Reconcile the running call's token charge with the usage the provider reported
+
+        Call from inside an operation passed to `execute_with_model`, with the response's
+        usage (an object or dict carrying `total_tokens`). Outside an operation it does nothing.
+        """
+        call = _current_call.get()
+        if call is None or usage is None:
+            return
+        total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+        if total is None:
+            return
+        self.rate_limiter.reconcile(call["model"], call["tokens"], total)
+        # Reporting twice must not charge twice
+        call["tokens"] = total
 
     def get_model_status(self) -> Dict[str, Any]:
         """Get current status of all models"""
@@ -108,10 +512,19 @@ class ModelManager:
                 "enabled": model_config.get("enabled", True),
                 "priority": model_config.get("priority"),
                 "capabilities": model_config.get("capabilities", []),
-                "is_current": model_name == self.current_model
+                "is_current": model_name == self.model_rotator.get_current_model(),
+                "circuit": self.breakers[model_name].get_status(),
+                "p95_latency": self.latencies[model_name].percentile(95),
+                "score": round(self._score(model_name), 3),
+                "provider": self.provider_override or model_config.get("provider", "openai"),
+                **self.stats[model_name].get_status()
             }
         return status
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss and request coalescing statistics"""
+        return {**self.response_cache.get_stats(), **self.in_flight.stats}
+
 # Example usage:
 async def example_usage():
     manager = ModelManager()
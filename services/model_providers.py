@@ -0,0 +1,234 @@
+import os
+import json
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Any, AsyncIterator, List, Optional
+from utils.retry_policy import retry_after_from_headers
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - only needed for the "http" provider type
+    aiohttp = None
+
+try:
+    import openai
+except ImportError:  # pragma: no cover - only needed for the "openai" provider type
+    openai = None
+
+
+class ProviderError(Exception):
+    """Error response from a model provider, carrying its HTTP status and headers for classification"""
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.retry_after = retry_after_from_headers(self.headers)
+
+
+class ChatResult:
+    """Text and token usage of one chat completion"""
+
+    def __init__(self, content: str, usage: Optional[Dict[str, int]] = None, model: Optional[str] = None):
+        self.content = content
+        self.usage = usage or {}
+        self.model = model
+
+
+class ModelProvider(ABC):
+    """A model backend with one long-lived client and a cap on concurrent requests
+
+    Subclasses create their client lazily on first use, inside the running event loop,
+    and keep it for the life of the process so connections are pooled and reused.
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.config = config
+        self.max_concurrency = config.get("max_concurrency", 16)
+        self.max_connections = config.get("max_connections", self.max_concurrency)
+        self.timeout_seconds = config.get("timeout_seconds", 120)
+        self.logger = logging.getLogger(f"model_manager.provider.{name}")
+        # Created in the running loop, like the client; see `_slots`
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        """The concurrency semaphore for the running event loop
+
+        On Python 3.9 a semaphore binds to the loop current when it is created, and the
+        shared manager keeps providers across loops (a second asyncio.run, for example).
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def chat(self, model: str, messages: List[Dict[str, Any]], **params) -> ChatResult:
+        """Send a chat completion request, waiting for a free slot if the provider is busy"""
+        async with self._slots():
+            self.in_flight += 1
+            try:
+                return await self._chat(model, messages, **params)
+            finally:
+                self.in_flight -= 1
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, Any]], **params) -> AsyncIterator[ChatResult]:
+        """Stream a chat completion as it is generated
+
+        Yields one ChatResult per text delta; the last one may carry only the usage. The
+        request holds its concurrency slot until the stream is exhausted or closed.
+        """
+        async with self._slots():
+            self.in_flight += 1
+            try:
+                async for chunk in self._stream_chat(model, messages, **params):
+                    yield chunk
+            finally:
+                self.in_flight -= 1
+
+    @abstractmethod
+    async def _chat(self, model: str, messages: List[Dict[str, Any]], **params) -> ChatResult:
+        pass
+
+    @abstractmethod
+    def _stream_chat(self, model: str, messages: List[Dict[str, Any]], **params) -> AsyncIterator[ChatResult]:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the provider's client and its pooled connections"""
+        pass
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "max_concurrency": self.max_concurrency}
+
+    def _api_key(self) -> Optional[str]:
+        return os.getenv(self.config["api_key_env"]) if "api_key_env" in self.config else None
+
+
+class OpenAIProvider(ModelProvider):
+    """OpenAI (or OpenAI-compatible) API through the official async SDK client"""
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        super().__init__(name, config)
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            if openai is None:
+                raise RuntimeError("The openai package is required for provider type 'openai'")
+            # Retries are handled by ModelManager, which knows about other models and quotas
+            self._client = openai.AsyncOpenAI(
+                api_key=self._api_key(),
+                base_url=self.config.get("base_url"),
+                timeout=self.timeout_seconds,
+                max_retries=0
+            )
+        return self._client
+
+    async def _chat(self, model: str, messages: List[Dict[str, Any]], **params) -> ChatResult:
+        response = await self._get_client().chat.completions.create(model=model, messages=messages, **params)
+        usage = response.usage.model_dump() if response.usage is not None else None
+        return ChatResult(response.choices[0].message.content, usage, response.model)
+
+    async def _stream_chat(self, model: str, messages: List[Dict[str, Any]], **params) -> AsyncIterator[ChatResult]:
+        stream = await self._get_client().chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+        )
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content if chunk.choices else None
+            usage = chunk.usage.model_dump() if chunk.usage is not None else None
+            if content or usage:
+                yield ChatResult(content or "", usage, chunk.model)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class HTTPProvider(ModelProvider):
+    """Any server speaking the OpenAI chat completions JSON format, over pooled aiohttp connections
+
+    Used for self-hosted models and for the local stub backend (services/stub_model_server.py).
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        super().__init__(name, config)
+        self.base_url = config["base_url"].rstrip("/")
+        self.keepalive_seconds = config.get("keepalive_seconds", 30)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            if aiohttp is None:
+                raise RuntimeError("The aiohttp package is required for provider type 'http'")
+            headers = {}
+            api_key = self._api_key()
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=self.keepalive_seconds),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers=headers
+            )
+        return self._session
+
+    async def _chat(self, model: str, messages: List[Dict[str, Any]], **params) -> ChatResult:
+        payload = {"model": model, "messages": messages, **params}
+        async with self._get_session().post(f"{self.base_url}/chat/completions", json=payload) as response:
+            if response.status >= 400:
+                raise ProviderError(
+                    f"{self.name} returned {response.status}: {await response.text()}",
+                    response.status,
+                    dict(response.headers)
+                )
+            body = await response.json()
+        return ChatResult(body["choices"][0]["message"]["content"], body.get("usage"), body.get("model"))
+
+    async def _stream_chat(self, model: str, messages: List[Dict[str, Any]], **params) -> AsyncIterator[ChatResult]:
+        payload = {"model": model, "messages": messages, "stream": True, "stream_options": {"include_usage": True},
+                   **params}
+        async with self._get_session().post(f"{self.base_url}/chat/completions", json=payload) as response:
+            if response.status >= 400:
+                raise ProviderError(
+                    f"{self.name} returned {response.status}: {await response.text()}",
+                    response.status,
+                    dict(response.headers)
+                )
+            # Server-sent events: one "data: {json}" line per chunk, ending with "data: [DONE]"
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or []
+                content = choices[0].get("delta", {}).get("content") if choices else None
+                if content or chunk.get("usage"):
+                    yield ChatResult(content or "", chunk.get("usage"), chunk.get("model"))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+PROVIDER_TYPES = {
+    "openai": OpenAIProvider,
+    "http": HTTPProvider
+}
+
+
+def create_provider(name: str, config: Dict[str, Any]) -> ModelProvider:
+    """Build a provider from its "providers" entry in model_config.json"""
+    provider_type = config.get("type", "openai")
+    if provider_type not in PROVIDER_TYPES:
+        raise ValueError(f"Unknown provider type: {provider_type}")
+    return PROVIDER_TYPES[provider_type](name, config)
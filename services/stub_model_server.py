@@ -0,0 +1,149 @@
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+from typing import Dict, Any, Optional
+from aiohttp import web
+from utils.token_estimator import estimate_message_tokens, estimate_tokens
+
+DEFAULT_REPLY = (
+    "1. Potential bugs: none found.\n"
+    "2. Code quality: readable.\n"
+    "3. Performance: consider a built-in.\n"
+    "4. Security: no issues.\n"
+    "5. Best practices: add type hints."
+)
+
+
+class StubModelServer:
+    """Local OpenAI-compatible chat completions server for offline testing and benchmarks
+
+    Answers POST /v1/chat/completions after `latency_seconds` (plus up to `jitter_seconds`
+    of random extra delay). A share of requests can be failed on purpose: `error_rate`
+    with HTTP 500 and `rate_limit_rate` with HTTP 429 and a Retry-After header. Requests
+    with `"stream": true` get the reply word by word as server-sent events, one every
+    `chunk_delay_seconds`.
+
+        python -m services.stub_model_server --port 8089 --latency 0.2 --error-rate 0.05
+    """
+
+    def __init__(self, latency_seconds: float = 0.1, jitter_seconds: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after_seconds: float = 1.0, reply: str = DEFAULT_REPLY,
+                 seed: Optional[int] = None, chunk_delay_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.reply = reply
+        self.chunk_delay_seconds = chunk_delay_seconds
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+        self.logger = logging.getLogger("stub_model_server")
+        self._runner: Optional[web.AppRunner] = None
+        self.port: Optional[int] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle_chat)
+        return app
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency_seconds + self.random.uniform(0, self.jitter_seconds))
+
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                status=429,
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": {"message": "Injected server error", "type": "server_error"}}, status=500)
+
+        prompt_tokens = estimate_message_tokens(body.get("messages", []))
+        completion_tokens = estimate_tokens(self.reply)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        if body.get("stream"):
+            return await self._stream_reply(request, body, usage)
+        return web.json_response({
+            "id": f"stub-{self.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    async def _stream_reply(self, request: web.Request, body: Dict[str, Any], usage: Dict[str, int]) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        base = {"id": f"stub-{self.stats['requests']}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "stub")}
+
+        async def send(chunk: Dict[str, Any]) -> None:
+            await response.write(f"data: {json.dumps({**base, **chunk})}\n\n".encode("utf-8"))
+
+        for word in re.split(r"(?<=\s)(?=\S)", self.reply):
+            await send({"choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]})
+            if self.chunk_delay_seconds:
+                await asyncio.sleep(self.chunk_delay_seconds)
+        await send({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            await send({"choices": [], "usage": usage})
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving in the current event loop; returns the base URL (port 0 picks a free port)"""
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.port = self._runner.addresses[0][1]
+        self.logger.info(f"Stub model server listening on {host}:{self.port}")
+        return f"http://{host}:{self.port}/v1"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub model backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.1, help="base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests failed with HTTP 429")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="delay between streamed chunks in seconds")
+    args = parser.parse_args()
+
+    server = StubModelServer(args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                             chunk_delay_seconds=args.chunk_delay)
+    app = server.create_app()
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 import asyncio
 import json
+from utils.static_analyzer import StaticAnalyzer
+
+SEVERITY_ORDER = ['none', 'low', 'medium', 'high']
 
 class AdvancedMCPTools:
     """Advanced MCP tool integrations for sophisticated operations."""
@@ -12,6 +15,9 @@ class AdvancedMCPTools:
         self.config = config or {}
         self.logger = logging.getLogger('advanced_mcp_tools')
         self._setup_logging()
+        # The process-wide analyzer, so its worker pool is shut down with the agent manager
+        self.analyzer = StaticAnalyzer.shared()
+        self._last_analysis: Optional[tuple] = None
 
     def _setup_logging(self) -> None:
         """Configure logging for advanced tools."""
@@ -49,4 +55,40 @@ class AdvancedMCPTools:
             }
         except Exception as e:
             self.logger.error(f"Error analyzing code: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _static_analysis(self, code: str, language: str) -> Dict:
+        """Analyze a snippet once; the collectors below all read the same report."""
+        key = (code, language)
+        if self._last_analysis is None or self._last_analysis[0] != key:
+            self._last_analysis = (key, await self.analyzer.analyze(code, language))
+        return self._last_analysis[1]
+
+    async def _collect_code_metrics(self, code: str, language: str) -> Dict:
+        """Size, complexity and nesting metrics, per function where the language is parsed."""
+        report = await self._static_analysis(code, language)
+        return {
+            **report['metrics'],
+            'parsed': report['parsed'],
+            'parse_error': report['error'],
+            'per_function': report['functions']
+        }
+
+    async def _analyze_patterns(self, code: str, language: str) -> List[Dict]:
+        """Bug-prone and maintainability patterns."""
+        report = await self._static_analysis(code, language)
+        return [finding for finding in report['findings'] if finding['category'] in ('bugs', 'quality')]
+
+    async def _security_scan(self, code: str, language: str) -> Dict:
+        """Known-dangerous calls and constructs, with the highest severity found."""
+        report = await self._static_analysis(code, language)
+        issues = [finding for finding in report['findings'] if finding['category'] == 'security']
+        return {
+            'issues': issues,
+            'risk': max((issue['severity'] for issue in issues), key=SEVERITY_ORDER.index, default='none')
+        }
+
+    async def _analyze_performance(self, code: str, language: str) -> List[Dict]:
+        """Obvious performance smells such as quadratic string building or blocking calls in async code."""
+        report = await self._static_analysis(code, language)
+        return [finding for finding in report['findings'] if finding['category'] == 'performance']
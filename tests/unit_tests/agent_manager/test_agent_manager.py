@@ -0,0 +1,397 @@
+import pytest
+import asyncio
+import json
+from typing import Dict, Any
+from agents.core.base_agent import BaseAgent
+from agents.manager.agent_manager import AgentManager
+from agents.manager.task_scheduler import QueueFullError
+from agents.manager.task_store import TaskResultStore
+from agents.manager.workflow import Workflow, WorkflowStageError
+from services.model_manager import ModelManager
+from utils.static_analyzer import StaticAnalyzer
+
+
+class SleepyAgent(BaseAgent):
+    """Test agent that sleeps for a fixed time and records peak concurrency"""
+
+    def __init__(self, agent_id: str, delay: float = 0.05):
+        super().__init__(agent_id, {"capabilities": ["testing"]})
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.processed = []
+
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            self.processed.append(task.get("id"))
+            return {**task, "handled_by": self.agent_id}
+        finally:
+            self.active -= 1
+
+    async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
+        pass
+
+
+class RaisingAgent(SleepyAgent):
+    """Test agent that raises for its first `failures` tasks"""
+
+    def __init__(self, agent_id: str, failures: int):
+        super().__init__(agent_id, delay=0)
+        self.failures = failures
+
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("model endpoint reset")
+        return await super().process_task(task)
+
+
+class FlakyAgent(SleepyAgent):
+    """Test agent that reports failure for its first `failures` tasks"""
+
+    def __init__(self, agent_id: str, failures: int):
+        super().__init__(agent_id, delay=0)
+        self.failures = failures
+
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self.failures > 0:
+            self.failures -= 1
+            return {"task_id": task.get("id"), "status": "failed", "error": "model unavailable"}
+        return await super().process_task(task)
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    path = tmp_path / "agent_registry.json"
+    path.write_text(json.dumps({"manager": {"num_workers": 4}, "agents": {}, "workflows": {}}))
+    return str(path)
+
+
+class TestAgentManager:
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue_concurrently(self, registry_path):
+        manager = AgentManager(registry_path)
+        agent = SleepyAgent("sleepy", delay=0.1)
+        manager.register_agent("sleepy", agent, max_concurrent_tasks=4)
+
+        runner = asyncio.create_task(manager.start())
+        for _ in range(8):
+            await manager.submit_task({"agent_id": "sleepy"})
+
+        await asyncio.wait_for(manager.task_queue.join(), timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert len(agent.processed) == 8
+        assert agent.peak == 4
+
+    @pytest.mark.asyncio
+    async def test_agent_concurrency_cap(self, registry_path):
+        manager = AgentManager(registry_path, num_workers=6)
+        agent = SleepyAgent("capped")
+        manager.register_agent("capped", agent, max_concurrent_tasks=2)
+
+        runner = asyncio.create_task(manager.start())
+        for _ in range(6):
+            await manager.submit_task({"agent_id": "capped"})
+
+        await asyncio.wait_for(manager.task_queue.join(), timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert len(agent.processed) == 6
+        assert agent.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_submit_task_returns_awaitable_handle(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.register_agent("sleepy", SleepyAgent("sleepy"))
+
+        runner = asyncio.create_task(manager.start())
+        handle = await manager.submit_task({"agent_id": "sleepy"})
+        missing = await manager.submit_task({"agent_id": "missing"})
+
+        result = await handle.wait(timeout=1)
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(missing, timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert result["handled_by"] == "sleepy"
+        assert manager.get_task_result(handle.task_id) == result
+        assert manager.get_task_result(missing.task_id)["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_dag_workflow_runs_independent_stages_concurrently(self, registry_path):
+        manager = AgentManager(registry_path)
+        for agent_id in ["analyze", "test", "audit", "deploy"]:
+            manager.register_agent(agent_id, SleepyAgent(agent_id, delay=0.1))
+        manager.workflows["pipeline"] = Workflow.from_config("pipeline", {"stages": [
+            {"agent": "analyze"},
+            {"agent": "test", "depends_on": ["analyze"]},
+            {"agent": "audit", "depends_on": ["analyze"]},
+            {"agent": "deploy", "depends_on": ["test", "audit"]}
+        ]})
+
+        start = asyncio.get_running_loop().time()
+        result = await manager.execute_workflow("pipeline", {"id": "task_1"})
+        elapsed = asyncio.get_running_loop().time() - start
+
+        assert elapsed < 0.35
+        assert result["handled_by"] == "deploy"
+        assert set(result["upstream"]) == {"test", "audit"}
+        assert result["upstream"]["audit"]["handled_by"] == "audit"
+
+    @pytest.mark.asyncio
+    async def test_list_workflow_runs_as_chain(self, registry_path):
+        manager = AgentManager(registry_path)
+        for agent_id in ["first", "second"]:
+            manager.register_agent(agent_id, SleepyAgent(agent_id, delay=0))
+        manager.workflows["chain"] = Workflow.from_config("chain", ["first", "second"])
+
+        result = await manager.execute_workflow("chain", {"id": "task_1"})
+
+        assert result["handled_by"] == "second"
+        assert manager.agents["first"].processed == ["task_1"]
+
+    def test_workflow_cycle_is_rejected(self):
+        with pytest.raises(ValueError):
+            Workflow.from_config("cyclic", {"stages": [
+                {"agent": "a", "depends_on": ["b"]},
+                {"agent": "b", "depends_on": ["a"]}
+            ]})
+
+    @pytest.mark.asyncio
+    async def test_bulk_submit_is_all_or_nothing(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.task_queue.capacity = 3
+        manager.register_agent("sleepy", SleepyAgent("sleepy"))
+
+        handles = await manager.submit_task([{"agent_id": "sleepy"} for _ in range(2)])
+        with pytest.raises(QueueFullError):
+            await manager.submit_task([{"agent_id": "sleepy"} for _ in range(2)])
+
+        assert len({handle.task_id for handle in handles}) == 2
+        assert manager.task_queue.qsize() == 2
+        assert len(manager._pending) == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_live_task_id_is_rejected(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.register_agent("sleepy", SleepyAgent("sleepy"))
+
+        handle = await manager.submit_task({"id": "task_1", "agent_id": "sleepy"})
+        with pytest.raises(ValueError):
+            await manager.submit_task({"id": "task_1", "agent_id": "sleepy"})
+        with pytest.raises(ValueError):
+            await manager.submit_task([{"id": "task_2", "agent_id": "sleepy"}, {"id": "task_2", "agent_id": "sleepy"}])
+
+        assert manager._pending["task_1"] is handle._future
+        assert manager.task_queue.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_agent_queue_stats_count_tasks_per_first_agent(self, registry_path):
+        manager = AgentManager(registry_path)
+        for agent_id in ["first", "second"]:
+            manager.register_agent(agent_id, SleepyAgent(agent_id))
+        manager.workflows["chain"] = Workflow.from_config("chain", ["first", "second"])
+
+        await manager.submit_task([{"agent_id": "second"} for _ in range(2)])
+        await manager.submit_task({}, workflow="chain")
+        await manager.submit_task({"capability": "testing"})
+
+        stats = manager.get_agent_queue_stats()
+        assert {agent_id: agent_stats["queued"] for agent_id, agent_stats in stats.items()} == {"first": 2, "second": 3}
+        assert stats["second"]["max_wait_seconds"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_capability_routes_to_least_loaded_healthy_agent(self, registry_path):
+        manager = AgentManager(registry_path)
+        for agent_id in ["busy", "idle", "broken"]:
+            manager.register_agent(agent_id, SleepyAgent(agent_id))
+        manager.agent_load["busy"] = 3
+        manager.agent_load["broken"] = 0
+        await manager.agents["broken"].update_status("error")
+        manager.agent_load["idle"] = 1
+
+        assert manager.capability_index["testing"] == ["busy", "idle", "broken"]
+        assert manager.route_task("testing") == "idle"
+        with pytest.raises(ValueError):
+            manager.route_task("deployment_automation")
+
+        # Health recovers once the error is older than the agent's health window
+        manager.agents["broken"].health_window_seconds = 0
+        assert manager.route_task("testing") == "broken"
+
+    @pytest.mark.asyncio
+    async def test_failed_workflow_resumes_from_checkpoint(self, registry_path):
+        manager = AgentManager(registry_path)
+        first = SleepyAgent("first", delay=0)
+        flaky = FlakyAgent("flaky", failures=1)
+        manager.register_agent("first", first)
+        manager.register_agent("flaky", flaky)
+        manager.workflows["chain"] = Workflow.from_config("chain", ["first", "flaky"])
+
+        with pytest.raises(WorkflowStageError):
+            await manager.execute_workflow("chain", {"id": "task_1"})
+        result = await manager.execute_workflow("chain", {"id": "task_1"})
+
+        assert result["handled_by"] == "flaky"
+        assert first.processed == ["task_1"]
+        assert manager.checkpoints.get(Workflow.checkpoint_key("task_1", "first")) is None
+
+    @pytest.mark.asyncio
+    async def test_worker_retries_failed_workflow(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.max_task_retries = 1
+        first = SleepyAgent("first", delay=0)
+        manager.register_agent("first", first)
+        manager.register_agent("flaky", FlakyAgent("flaky", failures=1))
+        manager.workflows["chain"] = Workflow.from_config("chain", ["first", "flaky"])
+
+        runner = asyncio.create_task(manager.start())
+        handle = await manager.submit_task({"code": "x = 1"}, workflow="chain")
+        result = await handle.wait(timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert result["handled_by"] == "flaky"
+        assert len(first.processed) == 1
+
+    @pytest.mark.asyncio
+    async def test_raising_stage_is_retried_from_checkpoint(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.max_task_retries = 1
+        first = SleepyAgent("first", delay=0)
+        manager.register_agent("first", first)
+        manager.register_agent("raising", RaisingAgent("raising", failures=1))
+        manager.workflows["chain"] = Workflow.from_config("chain", ["first", "raising"])
+
+        with pytest.raises(WorkflowStageError, match="model endpoint reset"):
+            await manager.execute_workflow("chain", {"id": "task_1"})
+
+        runner = asyncio.create_task(manager.start())
+        manager.agents["raising"].failures = 1
+        handle = await manager.submit_task({"code": "x = 1"}, workflow="chain")
+        result = await handle.wait(timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert result["handled_by"] == "raising"
+        assert len(first.processed) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_and_in_flight_tasks(self, registry_path):
+        manager = AgentManager(registry_path, num_workers=1)
+        agent = SleepyAgent("slow", delay=5)
+        manager.register_agent("slow", agent)
+
+        runner = asyncio.create_task(manager.start())
+        running = await manager.submit_task({"agent_id": "slow"})
+        queued = await manager.submit_task({"agent_id": "slow"})
+        await asyncio.sleep(0.01)
+
+        assert manager.cancel_task(queued.task_id)
+        assert manager.cancel_task(running.task_id)
+        with pytest.raises(asyncio.CancelledError):
+            await running.wait(timeout=1)
+        await asyncio.wait_for(manager.task_queue.join(), timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert queued.done()
+        assert agent.processed == []
+        assert manager.get_task_result(running.task_id)["status"] == "cancelled"
+        assert not manager.cancel_task(running.task_id)
+
+    @pytest.mark.asyncio
+    async def test_task_timeout_frees_worker(self, registry_path):
+        manager = AgentManager(registry_path, num_workers=1)
+        manager.register_agent("slow", SleepyAgent("slow", delay=5))
+        manager.register_agent("fast", SleepyAgent("fast", delay=0))
+
+        runner = asyncio.create_task(manager.start())
+        hung = await manager.submit_task({"agent_id": "slow", "timeout": 0.05})
+        quick = await manager.submit_task({"agent_id": "fast"})
+
+        with pytest.raises(TimeoutError):
+            await hung.wait(timeout=1)
+        result = await quick.wait(timeout=1)
+        await manager.stop()
+        runner.cancel()
+
+        assert result["handled_by"] == "fast"
+
+    @pytest.mark.asyncio
+    async def test_drain_stop_finishes_queued_work(self, registry_path):
+        manager = AgentManager(registry_path, num_workers=2)
+        agent = SleepyAgent("sleepy", delay=0.02)
+        manager.register_agent("sleepy", agent)
+
+        runner = asyncio.create_task(manager.start())
+        await asyncio.sleep(0)
+        await manager.submit_task([{"agent_id": "sleepy"} for _ in range(4)])
+        await manager.stop(drain=True, timeout=1)
+        runner.cancel()
+
+        assert len(agent.processed) == 4
+        with pytest.raises(RuntimeError):
+            await manager.submit_task({"agent_id": "sleepy"})
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_queued_handles(self, registry_path):
+        manager = AgentManager(registry_path, num_workers=1)
+        manager.register_agent("slow", SleepyAgent("slow", delay=5))
+
+        runner = asyncio.create_task(manager.start())
+        await asyncio.sleep(0)
+        running, queued = await manager.submit_task([{"agent_id": "slow"}, {"agent_id": "slow"}])
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        runner.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await running.wait(timeout=1)
+        with pytest.raises(RuntimeError, match="stopped"):
+            await queued.wait(timeout=1)
+        assert manager.task_queue.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_closes_shared_model_clients_and_analyzer(self, registry_path, monkeypatch):
+        closed = []
+
+        class FakeModelManager:
+            async def close(self):
+                closed.append("models")
+
+        analyzer = StaticAnalyzer(max_workers=1, inline_max_chars=0)
+        monkeypatch.setattr(ModelManager, "_shared", {"config/model_config.json": FakeModelManager()})
+        monkeypatch.setattr(StaticAnalyzer, "_shared", analyzer)
+        await analyzer.analyze("x = 1", "python")
+        manager = AgentManager(registry_path)
+
+        await manager.stop()
+
+        assert closed == ["models"]
+        assert analyzer._executor is None
+
+
+class TestTaskResultStore:
+    def test_bounded_size_evicts_oldest(self):
+        store = TaskResultStore(max_entries=2, ttl_seconds=60)
+        for i in range(3):
+            store.put(f"task_{i}", {"n": i})
+
+        assert len(store) == 2
+        assert store.get("task_0") is None
+        assert store.get("task_2") == {"n": 2}
+
+    def test_expired_results_are_evicted(self):
+        store = TaskResultStore(max_entries=10, ttl_seconds=0)
+        store.put("task_0", {"n": 0})
+
+        assert store.get("task_0") is None
+        assert len(store) == 0
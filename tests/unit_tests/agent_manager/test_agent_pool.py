@@ -0,0 +1,65 @@
+import pytest
+import asyncio
+from typing import Dict, Any
+from agents.core.base_agent import BaseAgent
+from agents.manager.agent_pool import AgentPool
+
+
+class EchoAgent(BaseAgent):
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(0.05)
+        return {**task, "handled_by": self.agent_id}
+
+    async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
+        pass
+
+
+def make_pool(**pool_config) -> AgentPool:
+    config = {"capabilities": ["code_review"], "max_concurrent_tasks": 1, "pool": pool_config}
+    return AgentPool("analyzer", config, lambda instance_id: EchoAgent(instance_id, {}))
+
+
+class TestAgentPool:
+    @pytest.mark.asyncio
+    async def test_scales_up_when_tasks_wait(self):
+        pool = make_pool(min_size=1, max_size=3, scale_up_queue_depth=2)
+        tasks = [asyncio.create_task(pool.process_task({"id": i})) for i in range(4)]
+        await asyncio.sleep(0.01)
+
+        await pool.autoscale()
+        results = await asyncio.gather(*tasks)
+
+        assert pool.size == 2
+        assert {result["handled_by"] for result in results} == {"analyzer_1", "analyzer_2"}
+
+    @pytest.mark.asyncio
+    async def test_scales_up_on_manager_backlog(self):
+        pool = make_pool(min_size=1, max_size=3, scale_up_queue_depth=4, scale_up_wait_seconds=10)
+
+        # Nothing waits in the pool itself, but the manager's queue holds its tasks
+        await pool.autoscale(queued=4)
+        await pool.autoscale(queued=1, queue_wait=10)
+        await pool.autoscale(queued=1)
+
+        assert pool.size == 3
+
+    @pytest.mark.asyncio
+    async def test_scales_down_idle_instances(self):
+        pool = make_pool(min_size=1, max_size=3, scale_down_idle_seconds=0)
+        pool._add_instance()
+        pool._add_instance()
+
+        await pool.autoscale()
+
+        assert pool.size == 1
+
+    @pytest.mark.asyncio
+    async def test_respects_max_size(self):
+        pool = make_pool(min_size=1, max_size=1, scale_up_queue_depth=1)
+        tasks = [asyncio.create_task(pool.process_task({"id": i})) for i in range(3)]
+        await asyncio.sleep(0.01)
+
+        await pool.autoscale()
+        await asyncio.gather(*tasks)
+
+        assert pool.size == 1
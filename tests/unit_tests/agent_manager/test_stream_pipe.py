@@ -0,0 +1,178 @@
+import pytest
+import asyncio
+import json
+from typing import Dict, Any, AsyncIterator
+from agents.core.base_agent import BaseAgent
+from agents.manager.agent_manager import AgentManager
+from agents.manager.stream_pipe import StreamPipe
+from agents.manager.workflow import Workflow, WorkflowStageError
+
+
+class StreamingAgent(BaseAgent):
+    """Test agent that streams words, upper-casing its upstream stream if it has one"""
+
+    supports_streaming = True
+
+    def __init__(self, agent_id: str, words: int = 5, delay: float = 0.02, fail_after: int = None):
+        super().__init__(agent_id, {"capabilities": ["testing"]})
+        self.words = words
+        self.delay = delay
+        self.fail_after = fail_after
+        self.events = []
+        self.inputs = []
+
+    async def process_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        self.inputs.append(task)
+        return {"task_id": task.get("id"), "status": "completed", "output": "".join([c async for c in self.stream_task(task)])}
+
+    async def stream_task(self, task: Dict[str, Any]) -> AsyncIterator[str]:
+        if "upstream_stream" in task:
+            async for chunk in task["upstream_stream"]:
+                self.events.append(("read", asyncio.get_running_loop().time()))
+                await asyncio.sleep(self.delay)
+                yield chunk.upper()
+            return
+        for index in range(self.words):
+            if self.fail_after is not None and index == self.fail_after:
+                raise RuntimeError("model went away")
+            await asyncio.sleep(self.delay)
+            self.events.append(("wrote", asyncio.get_running_loop().time()))
+            yield f"w{index} "
+
+    async def handle_error(self, error: Exception, task: Dict[str, Any]) -> None:
+        pass
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    path = tmp_path / "agent_registry.json"
+    path.write_text(json.dumps({"manager": {"stream_buffer_size": 2}, "agents": {}, "workflows": {}}))
+    return str(path)
+
+
+class TestStreamPipe:
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_paces_producer(self):
+        pipe = StreamPipe(buffer_size=2)
+        reader = pipe.subscribe()
+        published = 0
+
+        async def produce():
+            nonlocal published
+            for index in range(10):
+                await pipe.publish(str(index))
+                published += 1
+            pipe.close()
+
+        producer = asyncio.create_task(produce())
+        first = await reader.__anext__()
+        await asyncio.sleep(0.02)
+
+        # One chunk handed out, two buffered, the producer blocked on the next
+        assert first == "0" and published == 3
+        rest = [chunk async for chunk in reader]
+        await producer
+        assert rest == [str(index) for index in range(1, 10)]
+
+    @pytest.mark.asyncio
+    async def test_unstarted_subscriber_never_blocks_producer(self):
+        pipe = StreamPipe(buffer_size=2)
+        reader = pipe.subscribe()
+
+        for index in range(6):
+            await asyncio.wait_for(pipe.publish(str(index)), timeout=0.1)
+        pipe.close()
+
+        assert [chunk async for chunk in reader] == [str(index) for index in range(6)]
+
+    @pytest.mark.asyncio
+    async def test_errors_and_early_exit(self):
+        pipe = StreamPipe(buffer_size=1)
+        quitter, listener = pipe.subscribe(), pipe.subscribe()
+
+        await pipe.publish("a")
+        assert await quitter.__anext__() == "a"
+        await quitter.aclose()
+        # A dropped subscriber no longer holds the producer back
+        await asyncio.wait_for(pipe.publish("b"), timeout=0.1)
+        pipe.close(RuntimeError("upstream failed"))
+
+        assert await listener.__anext__() == "a"
+        assert await listener.__anext__() == "b"
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            await listener.__anext__()
+
+
+class TestStreamingWorkflows:
+    @pytest.mark.asyncio
+    async def test_streaming_stages_overlap(self, registry_path):
+        manager = AgentManager(registry_path)
+        writer, shouter = StreamingAgent("writer"), StreamingAgent("shouter")
+        manager.register_agent("writer", writer)
+        manager.register_agent("shouter", shouter)
+        manager.workflows["pipeline"] = Workflow.from_config("pipeline", {"stages": [
+            {"agent": "writer", "stream": True},
+            {"agent": "shouter", "depends_on": ["writer"], "stream": True}
+        ]})
+
+        start = asyncio.get_running_loop().time()
+        result = await manager.execute_workflow("pipeline", {"id": "task_1"})
+        elapsed = asyncio.get_running_loop().time() - start
+
+        assert result["output"] == "W0 W1 W2 W3 W4 "
+        # The shouter started on the first word long before the writer finished
+        assert shouter.events[0][1] < writer.events[-1][1]
+        assert elapsed < 0.18
+        assert manager.checkpoints.get(Workflow.checkpoint_key("task_1", "writer")) is None
+
+    @pytest.mark.asyncio
+    async def test_non_streaming_children_get_full_output(self, registry_path):
+        manager = AgentManager(registry_path)
+        reader = StreamingAgent("reader", delay=0)
+        manager.register_agent("writer", StreamingAgent("writer", words=3, delay=0))
+        manager.register_agent("reader", reader)
+        manager.workflows["pipeline"] = Workflow.from_config("pipeline", {"stages": [
+            {"agent": "writer", "stream": True},
+            {"agent": "reader", "depends_on": ["writer"]}
+        ]})
+
+        result = await manager.execute_workflow("pipeline", {"id": "task_1"})
+
+        # "reader" isn't a streaming stage, so it ran once "writer" finished, on its output
+        assert reader.inputs == [{"task_id": "task_1", "status": "completed", "output": "w0 w1 w2 "}]
+        assert result["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_producer_failure_fails_workflow(self, registry_path):
+        manager = AgentManager(registry_path)
+        manager.register_agent("writer", StreamingAgent("writer", fail_after=2, delay=0))
+        manager.register_agent("shouter", StreamingAgent("shouter", delay=0))
+        manager.workflows["pipeline"] = Workflow.from_config("pipeline", {"stages": [
+            {"agent": "writer", "stream": True},
+            {"agent": "shouter", "depends_on": ["writer"], "stream": True}
+        ]})
+
+        with pytest.raises(WorkflowStageError, match="model went away"):
+            await asyncio.wait_for(manager.execute_workflow("pipeline", {"id": "task_1"}), timeout=1)
+        assert manager.agent_load == {"writer": 0, "shouter": 0}
+
+    @pytest.mark.asyncio
+    async def test_resuming_past_streaming_producer_replays_its_output(self, registry_path):
+        manager = AgentManager(registry_path)
+        writer = StreamingAgent("writer", delay=0)
+        manager.register_agent("writer", writer)
+        manager.register_agent("shouter", StreamingAgent("shouter", delay=0))
+        manager.workflows["pipeline"] = Workflow.from_config("pipeline", {"stages": [
+            {"agent": "writer", "stream": True},
+            {"agent": "shouter", "depends_on": ["writer"], "stream": True}
+        ]})
+        manager.checkpoints.put(
+            Workflow.checkpoint_key("task_1", "writer"),
+            {"task_id": "task_1", "status": "completed", "output": "w0 w1 w2 w3 w4 "}
+        )
+
+        result = await manager.execute_workflow("pipeline", {"id": "task_1"})
+
+        # Same result as a fresh run, without running the writer again
+        assert result["output"] == "W0 W1 W2 W3 W4 "
+        assert writer.events == []
@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+from typing import Dict, Any
+from agents.manager.task_batcher import TaskBatcher
+
+
+class BatchRecorder:
+    """Fake agent dispatch that answers batches with one result per task"""
+
+    def __init__(self, fail_batches: bool = False):
+        self.fail_batches = fail_batches
+        self.dispatched = []
+
+    async def __call__(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        self.dispatched.append(task)
+        await asyncio.sleep(0.01)
+        if "batch" not in task:
+            return {"task_id": task["id"], "status": "completed"}
+        if self.fail_batches:
+            return {"task_id": task["id"], "status": "failed", "error": "malformed"}
+        return {"status": "completed", "results": [{"task_id": item["id"], "status": "completed"} for item in task["batch"]]}
+
+
+def make_batcher(dispatch, **config) -> TaskBatcher:
+    return TaskBatcher("analyzer", {"linger_ms": 20, **config}, dispatch)
+
+
+class TestTaskBatcher:
+    @pytest.mark.asyncio
+    async def test_tasks_in_linger_window_share_one_dispatch(self):
+        dispatch = BatchRecorder()
+        batcher = make_batcher(dispatch)
+
+        results = await asyncio.gather(*[batcher.submit({"id": i, "code": "x = 1"}) for i in range(5)])
+
+        assert [result["task_id"] for result in results] == [0, 1, 2, 3, 4]
+        assert len(dispatch.dispatched) == 1
+        assert batcher.stats["batched_tasks"] == 5
+
+    @pytest.mark.asyncio
+    async def test_batches_respect_size_and_token_budget(self):
+        dispatch = BatchRecorder()
+        batcher = make_batcher(dispatch, max_batch_size=3, max_batch_tokens=20)
+
+        await asyncio.gather(*[batcher.submit({"id": i, "code": "y" * 4}) for i in range(6)])
+
+        assert [len(task["batch"]) for task in dispatch.dispatched] == [3, 3]
+
+        dispatch.dispatched.clear()
+        await asyncio.gather(*[batcher.submit({"id": i, "code": "y" * 28}) for i in range(4)])
+
+        assert [len(task["batch"]) for task in dispatch.dispatched] == [2, 2]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_tasks(self):
+        dispatch = BatchRecorder(fail_batches=True)
+        batcher = make_batcher(dispatch)
+
+        results = await asyncio.gather(*[batcher.submit({"id": i, "code": "x = 1"}) for i in range(3)])
+
+        assert all(result["status"] == "completed" for result in results)
+        assert len(dispatch.dispatched) == 4
+        assert batcher.stats["fallbacks"] == 1
+
+    def test_only_small_code_tasks_are_batched(self):
+        batcher = make_batcher(BatchRecorder(), max_task_tokens=10)
+
+        assert batcher.accepts({"code": "x = 1"})
+        assert not batcher.accepts({"code": "x" * 100})
+        assert not batcher.accepts({"agent_id": "analyzer"})
@@ -0,0 +1,81 @@
+import pytest
+import asyncio
+import json
+from unittest.mock import patch
+from agents.manager.agent_manager import AgentManager
+from agents.manager.task_journal import TaskJournal
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    path = tmp_path / "agent_registry.json"
+    path.write_text(json.dumps({
+        "manager": {"journal_path": str(tmp_path / "data" / "task_journal.jsonl")},
+        "agents": {},
+        "workflows": {}
+    }))
+    return str(path)
+
+
+class TestTaskJournal:
+    @pytest.mark.asyncio
+    async def test_concurrent_appends_share_fsyncs(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.jsonl"))
+
+        with patch("agents.manager.task_journal.os.fsync") as fsync:
+            await asyncio.gather(*[
+                journal.append({"type": "submitted", "task_id": f"task_{i}", "seq": i, "task": {}})
+                for i in range(50)
+            ])
+        await journal.close()
+
+        assert fsync.call_count < 50
+        assert TaskJournal(str(tmp_path / "journal.jsonl")).next_sequence == 50
+
+    @pytest.mark.asyncio
+    async def test_unfinished_tasks_are_replayed_on_start(self, registry_path):
+        manager = AgentManager(registry_path)
+        done = await manager.submit_task({"agent_id": "missing"})
+        pending = await manager.submit_task({"agent_id": "missing", "code": "x = 1"})
+        manager._fail_task(done.task_id, ValueError("boom"))
+        await manager.journal.close()
+
+        restarted = AgentManager(registry_path)
+        await restarted._recover_tasks()
+        recovered = await restarted.task_queue.get()
+        next_handle = await restarted.submit_task({"agent_id": "missing"})
+        await restarted.journal.close()
+
+        assert list(restarted.recovered_handles) == [pending.task_id]
+        assert recovered["code"] == "x = 1"
+        assert next_handle.task_id > pending.task_id
+
+    def test_torn_final_record_is_skipped(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        path.write_text(
+            json.dumps({"type": "submitted", "task_id": "task_1", "seq": 1, "task": {"id": "task_1"}}) + "\n" +
+            '{"type": "completed", "task_'
+        )
+
+        journal = TaskJournal(str(path))
+
+        assert list(journal.unfinished) == ["task_1"]
+        assert journal.next_sequence == 2
+
+    @pytest.mark.asyncio
+    async def test_journal_compacts_once_past_max_bytes(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = TaskJournal(str(path), max_bytes=2000)
+
+        for i in range(1, 40):
+            await journal.append_many([
+                {"type": "submitted", "task_id": f"task_{i}", "seq": i, "task": {"code": "x" * 50}},
+                {"type": "completed", "task_id": f"task_{i}", "result": {}}
+            ])
+        await journal.append({"type": "submitted", "task_id": "task_40", "seq": 40, "task": {}})
+        await journal.close()
+
+        assert path.stat().st_size < 2000
+        reopened = TaskJournal(str(path))
+        assert list(reopened.unfinished) == ["task_40"]
+        assert reopened.next_sequence == 41
@@ -0,0 +1,142 @@
+import pytest
+import asyncio
+import time
+from agents.manager.task_scheduler import TaskScheduler, QueueFullError
+
+
+class TestTaskScheduler:
+    @pytest.mark.asyncio
+    async def test_lower_priority_class_served_first(self):
+        scheduler = TaskScheduler()
+        await scheduler.put({"id": "batch"}, priority=5)
+        await scheduler.put({"id": "interactive"}, priority=1)
+
+        assert (await scheduler.get())["id"] == "interactive"
+        assert (await scheduler.get())["id"] == "batch"
+
+    @pytest.mark.asyncio
+    async def test_earliest_deadline_first_within_class(self):
+        scheduler = TaskScheduler()
+        now = time.monotonic()
+        await scheduler.put({"id": "no_deadline"}, priority=1)
+        await scheduler.put({"id": "late"}, priority=1, deadline=now + 60)
+        await scheduler.put({"id": "soon"}, priority=1, deadline=now + 1)
+
+        order = [(await scheduler.get())["id"] for _ in range(3)]
+
+        assert order == ["soon", "late", "no_deadline"]
+
+    @pytest.mark.asyncio
+    async def test_aged_task_is_not_starved(self):
+        scheduler = TaskScheduler(aging_seconds=0.01)
+        await scheduler.put({"id": "old_batch"}, priority=3)
+        time.sleep(0.05)
+        await scheduler.put({"id": "fresh"}, priority=1)
+
+        assert (await scheduler.get())["id"] == "old_batch"
+
+    @pytest.mark.asyncio
+    async def test_aging_keeps_deadline_order_without_competition(self):
+        scheduler = TaskScheduler(aging_seconds=0.01)
+        now = time.monotonic()
+        await scheduler.put({"id": "late"}, priority=1, deadline=now + 10)
+        await scheduler.put({"id": "soon"}, priority=1, deadline=now + 1)
+        time.sleep(0.05)
+
+        # Every task has aged, but with no other class to overtake it stays EDF
+        assert (await scheduler.get())["id"] == "soon"
+        assert (await scheduler.get())["id"] == "late"
+
+    @pytest.mark.asyncio
+    async def test_task_without_deadline_is_not_starved_within_class(self):
+        scheduler = TaskScheduler(aging_seconds=0.01)
+        await scheduler.put({"id": "whenever"}, priority=1)
+        time.sleep(0.02)
+
+        served = []
+        for index in range(5):
+            await scheduler.put({"id": f"due_{index}"}, priority=1, deadline=time.monotonic() + 1)
+            served.append((await scheduler.get())["id"])
+
+        assert served[0] == "whenever"
+
+    @pytest.mark.asyncio
+    async def test_removed_entries_are_compacted(self):
+        scheduler = TaskScheduler()
+        await scheduler.put_many([({"id": f"task_{i}"}, 1, time.monotonic() + 1) for i in range(1000)])
+
+        for i in range(999):
+            scheduler.remove(f"task_{i}")
+
+        assert scheduler.qsize() == 1
+        assert len(scheduler._arrivals[1]) + len(scheduler._heaps[1]) < 100
+        assert (await scheduler.get())["id"] == "task_999"
+
+    @pytest.mark.asyncio
+    async def test_wait_stats_per_class(self):
+        scheduler = TaskScheduler()
+        await scheduler.put({"id": "a"}, priority=1)
+        await scheduler.put({"id": "b"}, priority=2)
+        await scheduler.get()
+        scheduler.task_done()
+
+        stats = scheduler.get_stats()
+
+        assert stats[1]["dequeued"] == 1
+        assert stats[2]["queued"] == 1
+        assert stats[1]["avg_wait_seconds"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_reject_policy_fails_fast_when_full(self):
+        scheduler = TaskScheduler(capacity=2, admission_policy="reject")
+        await scheduler.put_many([({"id": "a"}, 1, None), ({"id": "b"}, 1, None)])
+
+        with pytest.raises(QueueFullError):
+            await scheduler.put({"id": "c"}, priority=1)
+        assert scheduler.qsize() == 2
+
+    @pytest.mark.asyncio
+    async def test_block_policy_waits_for_room(self):
+        scheduler = TaskScheduler(capacity=1, admission_policy="block", admission_timeout=1)
+        await scheduler.put({"id": "a"}, priority=1)
+
+        blocked = asyncio.create_task(scheduler.put({"id": "b"}, priority=1))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        await scheduler.get()
+        await asyncio.wait_for(blocked, timeout=1)
+
+        assert scheduler.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_block_policy_wakes_on_remove(self):
+        scheduler = TaskScheduler(capacity=1, admission_policy="block", admission_timeout=1)
+        await scheduler.put({"id": "a"}, priority=1)
+
+        blocked = asyncio.create_task(scheduler.put({"id": "b"}, priority=1))
+        await asyncio.sleep(0.01)
+        scheduler.remove("a")
+        await asyncio.wait_for(blocked, timeout=0.1)
+
+        assert (await scheduler.get())["id"] == "b"
+
+    @pytest.mark.asyncio
+    async def test_block_policy_times_out(self):
+        scheduler = TaskScheduler(capacity=1, admission_policy="block", admission_timeout=0.01)
+        await scheduler.put({"id": "a"}, priority=1)
+
+        with pytest.raises(QueueFullError):
+            await scheduler.put({"id": "b"}, priority=1)
+
+    @pytest.mark.asyncio
+    async def test_shed_policy_evicts_less_urgent_tasks(self):
+        scheduler = TaskScheduler(capacity=2, admission_policy="shed")
+        await scheduler.put({"id": "batch"}, priority=5)
+        await scheduler.put({"id": "normal"}, priority=2)
+
+        shed = await scheduler.put({"id": "interactive"}, priority=1)
+        with pytest.raises(QueueFullError):
+            await scheduler.put({"id": "also_normal"}, priority=2)
+
+        assert [task["id"] for task in shed] == ["batch"]
+        assert (await scheduler.get())["id"] == "interactive"
@@ -0,0 +1,95 @@
+import pytest
+import asyncio
+import json
+from unittest.mock import patch
+from utils.circuit_breaker import CircuitBreaker, classify_error, RATE_LIMIT, TRANSIENT, FATAL
+from services.model_manager import ModelManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("utils.circuit_breaker.time.monotonic", fake):
+        yield fake
+
+
+class TestClassifyError:
+    def test_uses_status_and_type_not_message(self):
+        assert classify_error(StatusError(429)) == RATE_LIMIT
+        assert classify_error(StatusError(503)) == TRANSIENT
+        assert classify_error(StatusError(400)) == FATAL
+        assert classify_error(TimeoutError("slow")) == TRANSIENT
+        assert classify_error(ValueError("rate limit exceeded")) == FATAL
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_backs_off(self, clock):
+        breaker = CircuitBreaker("gpt-4", failure_threshold=2, base_open_seconds=5)
+
+        breaker.record_failure()
+        assert breaker.is_available()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.time_until_available() == 5
+
+        clock.now += 5
+        breaker.acquire()
+        assert breaker.state == "half_open"
+        assert not breaker.is_available()
+
+        breaker.record_failure()
+        assert breaker.time_until_available() == 10
+
+    def test_successful_probe_closes_circuit(self, clock):
+        breaker = CircuitBreaker("gpt-4", base_open_seconds=5)
+        breaker.record_failure(trip=True)
+
+        clock.now += 5
+        breaker.acquire()
+        breaker.record_success()
+
+        assert breaker.state == "closed"
+        assert breaker.consecutive_opens == 0
+        assert breaker.is_available()
+
+
+class TestModelManagerCircuits:
+    @pytest.mark.asyncio
+    async def test_rate_limited_model_recovers_through_probe(self, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({
+            "models": {"gpt-4": {"priority": 1, "capabilities": ["code_review"]}},
+            "circuit_breaker": {"base_open_seconds": 0.1}
+        }))
+        manager = ModelManager(str(path))
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            if len(calls) == 1:
+                raise StatusError(429)
+            return "ok"
+
+        runner = asyncio.create_task(manager.execute_with_model(operation, ["code_review"]))
+        await asyncio.sleep(0.01)
+        assert manager.get_model_status()["gpt-4"]["circuit"]["state"] == "open"
+
+        result = await asyncio.wait_for(runner, timeout=1)
+
+        assert result == "ok"
+        assert calls == ["gpt-4", "gpt-4"]
+        assert manager.breakers["gpt-4"].state == "closed"
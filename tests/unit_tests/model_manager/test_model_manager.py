@@ -0,0 +1,184 @@
+import pytest
+import asyncio
+import json
+from services.model_manager import ModelManager
+from utils.hedging import HedgeBudget
+from utils.retry_policy import RetryPolicy
+
+
+@pytest.fixture
+def model_config(tmp_path):
+    path = tmp_path / "model_config.json"
+    path.write_text(json.dumps({"models": {
+        "gpt-4": {
+            "priority": 1,
+            "enabled": True,
+            "rate_limits": {"requests_per_minute": 3, "requests_per_hour": 100},
+            "capabilities": ["code_review", "debugging"]
+        },
+        "codellama": {
+            "priority": 2,
+            "enabled": True,
+            "rate_limits": {"requests_per_minute": 10, "requests_per_hour": 100},
+            "capabilities": ["code_review"]
+        }
+    }}))
+    return str(path)
+
+
+class TestModelManager:
+    def test_shared_manager_per_config(self, model_config):
+        first = ModelManager.shared(model_config)
+
+        assert ModelManager.shared(model_config) is first
+        assert ModelManager.shared(model_config).rate_limiter is first.rate_limiter
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reservations_never_overdraw_quota(self, model_config):
+        manager = ModelManager(model_config)
+
+        reservations = [
+            asyncio.create_task(manager.reserve_model(["debugging"]))
+            for _ in range(6)
+        ]
+        done, pending = await asyncio.wait(reservations, timeout=0.1)
+        for task in pending:
+            task.cancel()
+
+        assert len(done) == 3
+        assert all(task.result() == "gpt-4" for task in done)
+        assert manager.rate_limiter.get_remaining("gpt-4")["minute"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_model_falls_through_to_next_capable(self, model_config):
+        manager = ModelManager(model_config)
+
+        models = [await asyncio.wait_for(manager.reserve_model(["code_review"]), timeout=0.1) for _ in range(5)]
+
+        assert models == ["gpt-4", "gpt-4", "gpt-4", "codellama", "codellama"]
+        assert await manager.get_available_model(["code_review"]) == "codellama"
+        assert await manager.get_available_model(["testing"]) is None
+
+    @pytest.mark.asyncio
+    async def test_identical_in_flight_requests_share_one_call(self, model_config):
+        manager = ModelManager(model_config)
+        request = {"messages": [{"role": "user", "content": "def f(): pass"}]}
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            await asyncio.sleep(0.05)
+            return {"bugs": []}
+
+        results = await asyncio.gather(*[
+            manager.execute_with_model(operation, ["debugging"], request=request)
+            for _ in range(5)
+        ])
+
+        assert results == [{"bugs": []}] * 5
+        assert calls == ["gpt-4"]
+        assert manager.rate_limiter.get_remaining("gpt-4")["minute"] == 2
+        assert manager.get_cache_stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_coalesced_waiters_all_receive_the_error(self, model_config):
+        manager = ModelManager(model_config)
+        request = {"messages": [{"role": "user", "content": "broken"}]}
+
+        async def operation(model):
+            await asyncio.sleep(0.05)
+            raise ValueError("bad request")
+
+        results = await asyncio.gather(*[
+            manager.execute_with_model(operation, ["debugging"], request=request)
+            for _ in range(3)
+        ], return_exceptions=True)
+
+        assert all(isinstance(result, Exception) and "bad request" in str(result) for result in results)
+        assert len(manager.in_flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_cancelled(self, model_config):
+        manager = ModelManager(model_config)
+        manager.hedge_min_samples = 1
+        manager.hedge_budget = HedgeBudget(ratio=1, max_burst=1)
+        manager.latencies["gpt-4"].record(0.02)
+        cancelled = []
+
+        async def operation(model):
+            try:
+                await asyncio.sleep(1 if model == "gpt-4" else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+            return model
+
+        result = await asyncio.wait_for(
+            manager.execute_with_model(operation, ["code_review"], hedge=True), timeout=0.5
+        )
+        await asyncio.sleep(0)
+
+        assert result == "codellama"
+        assert cancelled == ["gpt-4"]
+        assert manager.breakers["gpt-4"].state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_hedges_are_capped_by_budget(self, model_config):
+        manager = ModelManager(model_config)
+        manager.hedge_min_samples = 1
+        manager.hedge_budget = HedgeBudget(ratio=0.5, max_burst=1)
+        for _ in range(40):
+            manager.latencies["gpt-4"].record(0.005)
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            await asyncio.sleep(0.03 if model == "gpt-4" else 0.01)
+            return model
+
+        for _ in range(3):
+            await manager.execute_with_model(operation, ["code_review"], hedge=True)
+
+        assert calls.count("codellama") == 1
+        assert manager.hedge_budget.hedges == 1
+
+    @pytest.mark.asyncio
+    async def test_traffic_shifts_away_from_degraded_model(self, model_config):
+        manager = ModelManager(model_config)
+        manager.retry_policy = RetryPolicy(base_delay_seconds=0)
+
+        async def operation(model):
+            if model == "gpt-4":
+                raise TimeoutError("upstream timeout")
+            return model
+
+        assert await manager.get_available_model(["code_review"]) == "gpt-4"
+        result = await manager.execute_with_model(operation, ["code_review"])
+        status = manager.get_model_status()
+
+        assert result == "codellama"
+        assert status["gpt-4"]["error_rate"] > 0
+        assert status["gpt-4"]["score"] > status["codellama"]["score"]
+        assert await manager.get_available_model(["code_review"]) == "codellama"
+
+    @pytest.mark.asyncio
+    async def test_large_prompt_is_reserved_against_token_budget(self, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({"models": {
+            "gpt-4": {
+                "priority": 1,
+                "rate_limits": {"requests_per_minute": 50, "tokens_per_minute": 1000},
+                "capabilities": ["code_review"]
+            },
+            "codellama": {"priority": 2, "capabilities": ["code_review"]}
+        }, "token_estimation": {"default_completion_tokens": 100}}))
+        manager = ModelManager(str(path))
+        request = {"messages": [{"role": "user", "content": "total += num\n" * 150}]}
+
+        async def operation(model):
+            manager.report_usage({"total_tokens": 500})
+            return model
+
+        assert await manager.execute_with_model(operation, ["code_review"], request={"messages": []}) == "gpt-4"
+        assert manager.rate_limiter.get_remaining("gpt-4")["tokens_minute"] == 500
+        assert await manager.execute_with_model(operation, ["code_review"], request=request) == "codellama"
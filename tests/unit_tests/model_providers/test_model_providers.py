@@ -0,0 +1,157 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import json
+from services.model_manager import ModelManager
+from services.model_providers import HTTPProvider, ProviderError, create_provider
+from services.stub_model_server import StubModelServer
+from utils.circuit_breaker import classify_error, RATE_LIMIT, TRANSIENT
+
+MESSAGES = [{"role": "user", "content": "def f(): pass"}]
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubModelServer(latency_seconds=0.02, seed=1)
+    base_url = await server.start()
+    server.base_url = base_url
+    yield server
+    await server.stop()
+
+
+class TestModelProviders:
+    @pytest.mark.asyncio
+    async def test_http_provider_reuses_one_session(self, stub):
+        provider = HTTPProvider("stub", {"base_url": stub.base_url})
+
+        first = await provider.chat("gpt-4", MESSAGES)
+        session = provider._session
+        second = await provider.chat("gpt-4", MESSAGES)
+        await provider.close()
+
+        assert first.content == second.content
+        assert first.usage["total_tokens"] > 0
+        assert provider._session is None and session.closed
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped_per_provider(self, stub):
+        provider = HTTPProvider("stub", {"base_url": stub.base_url, "max_concurrency": 2})
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, provider.in_flight)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        await asyncio.gather(*[provider.chat("gpt-4", MESSAGES) for _ in range(6)])
+        watcher.cancel()
+        await provider.close()
+
+        assert peak == 2
+        assert stub.get_stats()["requests"] == 6
+
+    @pytest.mark.asyncio
+    async def test_injected_errors_are_classified_by_status(self, stub):
+        provider = HTTPProvider("stub", {"base_url": stub.base_url})
+
+        stub.error_rate = 1.0
+        with pytest.raises(ProviderError) as server_error:
+            await provider.chat("gpt-4", MESSAGES)
+        stub.error_rate, stub.rate_limit_rate = 0.0, 1.0
+        with pytest.raises(ProviderError) as rate_limited:
+            await provider.chat("gpt-4", MESSAGES)
+        await provider.close()
+
+        assert classify_error(server_error.value) == TRANSIENT
+        assert classify_error(rate_limited.value) == RATE_LIMIT
+        assert rate_limited.value.retry_after == 1.0
+
+    def test_shared_manager_and_providers_survive_a_new_event_loop(self, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({"models": {"gpt-4": {"priority": 1, "capabilities": ["code_review"]}}}))
+        manager = ModelManager(str(path))
+        provider = HTTPProvider("stub", {"base_url": "http://127.0.0.1:1"})
+
+        async def use_both():
+            async with provider._slots():
+                return await manager.try_reserve_model(["code_review"]), manager._selection_lock(), provider._slots()
+
+        # As with two asyncio.run calls in one process; on Python 3.9 a loop-bound lock would fail here
+        first = asyncio.run(use_both())
+        second = asyncio.run(use_both())
+
+        assert first[0] == second[0] == "gpt-4"
+        assert first[1] is not second[1] and first[2] is not second[2]
+
+    def test_unknown_provider_type_is_rejected(self):
+        with pytest.raises(ValueError):
+            create_provider("mystery", {"type": "carrier-pigeon"})
+
+    @pytest.mark.asyncio
+    async def test_model_manager_chats_through_provider_offline(self, stub, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({
+            "models": {"gpt-4": {
+                "provider": "openai",
+                "priority": 1,
+                "rate_limits": {"tokens_per_minute": 10000},
+                "capabilities": ["code_review"]
+            }},
+            "providers": {"stub": {"type": "http", "base_url": stub.base_url}},
+            "provider_override": "stub"
+        }))
+        manager = ModelManager(str(path))
+
+        async def operation(model):
+            return (await manager.chat(model, MESSAGES)).content
+
+        result = await manager.execute_with_model(operation, ["code_review"], request={"messages": MESSAGES})
+        await manager.close()
+
+        assert result == stub.reply
+        # The estimate for the default completion size was refunded down to the reported usage
+        assert manager.rate_limiter.get_remaining("gpt-4")["tokens_minute"] > 9900
+
+    @pytest.mark.asyncio
+    async def test_http_provider_streams_chunks_and_usage(self, stub):
+        stub.chunk_delay_seconds = 0.01
+        provider = HTTPProvider("stub", {"base_url": stub.base_url, "max_concurrency": 1})
+
+        chunks = []
+        async for chunk in provider.stream_chat("gpt-4", MESSAGES):
+            chunks.append(chunk)
+            assert provider.in_flight == 1
+        await provider.close()
+
+        assert len(chunks) > 5
+        assert "".join(chunk.content for chunk in chunks) == stub.reply
+        assert chunks[-1].usage["total_tokens"] > 0
+        assert provider.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_model_manager_streams_and_caches(self, stub, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({
+            "models": {"gpt-4": {"priority": 1, "rate_limits": {"tokens_per_minute": 10000}, "capabilities": ["code_review"]}},
+            "providers": {"stub": {"type": "http", "base_url": stub.base_url}},
+            "provider_override": "stub"
+        }))
+        manager = ModelManager(str(path))
+        request = {"messages": MESSAGES}
+
+        def stream(model):
+            return manager.stream_chat(model, MESSAGES)
+
+        streamed = [chunk async for chunk in manager.stream_with_model(stream, ["code_review"], request)]
+        replayed = [chunk async for chunk in await manager.execute_with_model(stream, ["code_review"], request, stream=True)]
+        await manager.close()
+
+        assert len(streamed) > 5 and "".join(streamed) == stub.reply
+        assert replayed == [stub.reply]
+        assert stub.get_stats()["requests"] == 1
+        assert manager.breakers["gpt-4"].state == "closed"
+        assert manager.rate_limiter.get_remaining("gpt-4")["tokens_minute"] > 9900
+        # Streamed and non-streamed results for the same request don't share a cache entry
+        assert await manager.get_cached_response(request, ["code_review"]) is None
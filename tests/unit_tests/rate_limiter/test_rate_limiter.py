@@ -0,0 +1,107 @@
+import pytest
+from unittest.mock import patch
+from utils.rate_limiter import RateLimiter, TokenBucket, ModelRotator
+
+MODELS = {
+    "gpt-4": {"priority": 1, "rate_limits": {"requests_per_minute": 2, "requests_per_hour": 100}},
+    "gpt-3.5-turbo": {"priority": 2, "rate_limits": {"requests_per_minute": 4, "requests_per_hour": 100}}
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("utils.rate_limiter.time.monotonic", fake):
+        yield fake
+
+
+class TestRateLimiter:
+    def test_limits_are_per_model(self, clock):
+        limiter = RateLimiter(MODELS)
+
+        gpt4 = [limiter.try_acquire("gpt-4") for _ in range(3)]
+        turbo = [limiter.try_acquire("gpt-3.5-turbo") for _ in range(5)]
+
+        assert gpt4 == [True, True, False]
+        assert turbo == [True, True, True, True, False]
+
+    def test_unconfigured_model_uses_defaults(self, clock):
+        limiter = RateLimiter(MODELS, requests_per_minute=1)
+
+        assert limiter.try_acquire("codellama")
+        assert not limiter.try_acquire("codellama")
+
+    def test_bucket_refills_gradually(self, clock):
+        limiter = RateLimiter(MODELS)
+        limiter.try_acquire("gpt-4")
+        limiter.try_acquire("gpt-4")
+
+        assert limiter._calculate_wait_time("gpt-4") == pytest.approx(30)
+        clock.now += 30
+        assert limiter.try_acquire("gpt-4")
+        assert not limiter.try_acquire("gpt-4")
+
+    def test_no_double_burst_at_window_edge(self, clock):
+        bucket = TokenBucket(capacity=60, period=60)
+        bucket.consume(60)
+        clock.now += 1
+
+        assert bucket.time_until_available(60) == pytest.approx(59)
+        assert int(bucket.available()) == 1
+
+    def test_token_budget_limits_large_requests(self, clock):
+        limiter = RateLimiter({"gpt-4": {"rate_limits": {"requests_per_minute": 50, "tokens_per_minute": 6000}}})
+
+        assert limiter.try_acquire("gpt-4", tokens=5000)
+        assert not limiter.try_acquire("gpt-4", tokens=2000)
+        assert limiter.try_acquire("gpt-4", tokens=500)
+        assert limiter.time_until_available("gpt-4", tokens=2000) == pytest.approx(15)
+
+    def test_reconcile_refunds_and_charges_actual_usage(self, clock):
+        limiter = RateLimiter({"gpt-4": {"rate_limits": {"tokens_per_minute": 6000}}})
+        limiter.increment_counter("gpt-4", tokens=4000)
+
+        limiter.reconcile("gpt-4", estimated_tokens=4000, actual_tokens=1000)
+        assert limiter.get_remaining("gpt-4")["tokens_minute"] == 5000
+
+        limiter.reconcile("gpt-4", estimated_tokens=0, actual_tokens=5500)
+        assert limiter.time_until_available("gpt-4") == pytest.approx(5)
+
+
+class TestModelRotator:
+    @pytest.fixture
+    def models(self):
+        return {
+            "gpt-4": {"priority": 1, "enabled": True, "capabilities": ["code_review", "debugging"]},
+            "gpt-3.5-turbo": {"priority": 2, "enabled": True, "capabilities": ["code_review", "debugging"]},
+            "codellama": {"priority": 3, "enabled": True, "capabilities": ["code_review"]}
+        }
+
+    def test_best_model_per_capability_set(self, models):
+        rotator = ModelRotator(models)
+
+        assert rotator.get_best_model(["code_review"]) == "gpt-4"
+        assert rotator.get_candidates(["debugging"]) == ["gpt-4", "gpt-3.5-turbo"]
+        assert rotator.get_best_model(["testing"]) is None
+
+    def test_disable_and_enable_update_index(self, models):
+        rotator = ModelRotator(models)
+        rotator.get_best_model(["code_review"])
+
+        rotator.disable_model("gpt-4")
+        rotator.disable_model("gpt-3.5-turbo")
+        assert rotator.get_best_model(["code_review"]) == "codellama"
+        assert rotator.get_best_model(["debugging"]) is None
+
+        rotator.enable_model("gpt-4")
+        assert rotator.get_best_model(["code_review"]) == "gpt-4"
+        assert rotator.get_best_model(["debugging"]) == "gpt-4"
+        assert rotator.get_candidates(["code_review"]) == ["gpt-4", "codellama"]
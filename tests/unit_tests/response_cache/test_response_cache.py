@@ -0,0 +1,90 @@
+import pytest
+import json
+from services.model_manager import ModelManager
+from utils.response_cache import ResponseCache, cache_key
+
+REQUEST = {"messages": [{"role": "user", "content": "def f(): pass"}]}
+
+
+@pytest.fixture
+def model_config(tmp_path):
+    path = tmp_path / "model_config.json"
+    path.write_text(json.dumps({
+        "models": {"gpt-4": {"priority": 1, "capabilities": ["code_review"]}},
+        "response_cache": {"disk_path": str(tmp_path / "cache")}
+    }))
+    return str(path)
+
+
+class TestResponseCache:
+    def test_key_depends_on_model_and_request(self):
+        assert cache_key("gpt-4", REQUEST) == cache_key("gpt-4", json.loads(json.dumps(REQUEST)))
+        assert cache_key("gpt-4", REQUEST) != cache_key("codellama", REQUEST)
+        assert cache_key("gpt-4", REQUEST) != cache_key("gpt-4", {**REQUEST, "temperature": 0.2})
+
+    @pytest.mark.asyncio
+    async def test_lru_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=2)
+        await cache.put("a", 1)
+        await cache.put("b", 2)
+        await cache.get("a")
+        await cache.put("c", 3)
+
+        assert await cache.get("a") == 1
+        assert await cache.get("b") is None
+        assert cache.get_stats()["hit_ratio"] == 0.667
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_miss(self):
+        cache = ResponseCache(ttl_seconds=0)
+        await cache.put("a", 1)
+
+        assert await cache.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        await ResponseCache(disk_path=str(tmp_path)).put("a", {"bugs": []})
+
+        restarted = ResponseCache(disk_path=str(tmp_path))
+
+        assert await restarted.get("a") == {"bugs": []}
+        assert restarted.get_stats()["disk_hits"] == 1
+
+
+class TestModelManagerCache:
+    @pytest.mark.asyncio
+    async def test_cached_request_skips_model_and_quota(self, model_config):
+        manager = ModelManager(model_config)
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            return {"bugs": ["off by one"]}
+
+        first = await manager.execute_with_model(operation, ["code_review"], request=REQUEST)
+        second = await manager.execute_with_model(operation, ["code_review"], request=REQUEST)
+
+        assert first == second == {"bugs": ["off by one"]}
+        assert calls == ["gpt-4"]
+        assert manager.rate_limiter.get_remaining("gpt-4")["minute"] == 49
+        assert manager.get_cache_stats()["hit_ratio"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_lookup_across_models_counts_once(self, tmp_path):
+        path = tmp_path / "model_config.json"
+        path.write_text(json.dumps({
+            "models": {name: {"priority": 1, "capabilities": ["code_review"]} for name in ["gpt-4", "gpt-3.5", "codellama"]},
+            "response_cache": {"disk_path": str(tmp_path / "cache")}
+        }))
+        manager = ModelManager(str(path))
+
+        async def operation(model):
+            return {"bugs": []}
+
+        await manager.execute_with_model(operation, ["code_review"], request=REQUEST)
+        await manager.execute_with_model(operation, ["code_review"], request=REQUEST)
+
+        # One miss and one hit, not a miss per candidate model
+        stats = manager.get_cache_stats()
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
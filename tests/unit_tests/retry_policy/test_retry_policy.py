@@ -0,0 +1,121 @@
+import pytest
+import asyncio
+import json
+import time
+from services.model_manager import ModelManager
+from services.model_providers import ProviderError
+from utils.circuit_breaker import RATE_LIMIT, TRANSIENT, FATAL
+from utils.retry_policy import RetryPolicy, retry_after_from_headers
+
+
+@pytest.fixture
+def model_config(tmp_path):
+    path = tmp_path / "model_config.json"
+    path.write_text(json.dumps({
+        "models": {"gpt-4": {"priority": 1, "capabilities": ["code_review"]}},
+        "retry_policy": {"base_delay_seconds": 0.01, "max_delay_seconds": 0.05}
+    }))
+    return str(path)
+
+
+class TestRetryAfterHeaders:
+    def test_parses_seconds_dates_and_reset_durations(self):
+        assert retry_after_from_headers({"Retry-After": "2"}) == 2.0
+        assert retry_after_from_headers({"retry-after-ms": "250"}) == 0.25
+        assert retry_after_from_headers({"x-ratelimit-reset-requests": "1m30s", "x-ratelimit-reset-tokens": "20ms"}) == 90.0
+        assert retry_after_from_headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+        assert retry_after_from_headers({"Content-Type": "application/json"}) is None
+
+
+class TestRetryPolicy:
+    def test_decorrelated_jitter_stays_within_bounds(self):
+        policy = RetryPolicy(base_delay_seconds=1, max_delay_seconds=10, max_attempts=10)
+        state = policy.start()
+
+        delays = [policy.next_delay(state, TimeoutError(), TRANSIENT) for _ in range(8)]
+
+        assert all(1 <= delay <= 10 for delay in delays)
+        assert all(delay <= max(1, previous * 3) for previous, delay in zip(delays, delays[1:]))
+
+    def test_retry_after_overrides_backoff_and_fatal_is_never_retried(self):
+        policy = RetryPolicy(base_delay_seconds=5)
+        state = policy.start()
+
+        assert policy.next_delay(state, ProviderError("busy", 503, {"Retry-After": "0.2"}), TRANSIENT) == 0.2
+        assert policy.next_delay(state, ProviderError("bad", 400), FATAL) is None
+        assert policy.next_delay(state, ProviderError("slow down", 429), RATE_LIMIT) == 0
+
+    def test_attempts_and_budget_are_capped(self):
+        policy = RetryPolicy(base_delay_seconds=1, max_attempts=2)
+        assert policy.next_delay(policy.start(), TimeoutError(), TRANSIENT) is not None
+        state = policy.start()
+        policy.next_delay(state, TimeoutError(), TRANSIENT)
+        assert policy.next_delay(state, TimeoutError(), TRANSIENT) is None
+
+        state = RetryPolicy(budget_seconds=10).start()
+        state.started_at = time.monotonic() - 10
+        assert RetryPolicy(budget_seconds=10).next_delay(state, TimeoutError(), TRANSIENT) is None
+
+
+class TestExecuteWithModelRetries:
+    @pytest.mark.asyncio
+    async def test_fatal_error_fails_without_retrying(self, model_config):
+        manager = ModelManager(model_config)
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            raise ProviderError("invalid request", 400)
+
+        with pytest.raises(ProviderError):
+            await asyncio.wait_for(manager.execute_with_model(operation, ["code_review"]), timeout=0.5)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_retry_quickly_then_give_up(self, model_config):
+        manager = ModelManager(model_config)
+        calls = []
+
+        async def operation(model):
+            calls.append(model)
+            raise ProviderError("bad gateway", 502)
+
+        with pytest.raises(Exception, match="Giving up after 3 failed attempts"):
+            await asyncio.wait_for(manager.execute_with_model(operation, ["code_review"]), timeout=0.5)
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_retry_after_keeps_model_out(self, model_config):
+        manager = ModelManager(model_config)
+
+        async def operation(model):
+            raise ProviderError("slow down", 429, {"Retry-After": "30"})
+
+        runner = asyncio.create_task(manager.execute_with_model(operation, ["code_review"]))
+        await asyncio.sleep(0.05)
+        runner.cancel()
+
+        assert manager.breakers["gpt-4"].time_until_available() > 25
+
+    @pytest.mark.asyncio
+    async def test_streams_retry_only_before_first_chunk(self, model_config):
+        manager = ModelManager(model_config)
+        attempts = []
+
+        async def flaky_start(model):
+            attempts.append(model)
+            if len(attempts) == 1:
+                raise ProviderError("bad gateway", 502)
+            yield "partial "
+            if len(attempts) == 2:
+                raise ProviderError("connection reset", 502)
+            yield "answer"
+
+        received = []
+        with pytest.raises(ProviderError, match="connection reset"):
+            async for chunk in manager.stream_with_model(flaky_start, ["code_review"]):
+                received.append(chunk)
+
+        # The first failure was retried; the second came after a chunk was already handed out
+        assert len(attempts) == 2
+        assert received == ["partial "]
@@ -0,0 +1,198 @@
+import pytest
+import textwrap
+from agents.implementations.code_analyzer_agent import CodeAnalyzerAgent
+from utils.static_analyzer import StaticAnalyzer, analyze_source, focus_code
+
+RISKY = textwrap.dedent('''
+    import os
+    import time
+
+    API_KEY = "sk-live-123456"
+
+    def build(items, seen=[]):
+        out = ""
+        for i in range(len(items)):
+            out += "x"
+        try:
+            os.system("rm " + items[0])
+        except:
+            pass
+        return out
+
+    async def poll():
+        time.sleep(1)
+''')
+
+CLEAN = textwrap.dedent('''
+    def add(a, b):
+        """Add two numbers"""
+        return a + b
+''')
+
+
+def rules(report):
+    return {finding["rule"] for finding in report["findings"]}
+
+
+class TestAnalyzeSource:
+    def test_python_findings_cover_every_category(self):
+        report = analyze_source(RISKY, "python")
+
+        assert report["parsed"]
+        assert {"hardcoded-secret", "shell-command", "mutable-default", "bare-except", "range-len-loop",
+                "string-concat-in-loop", "blocking-call-in-async"} <= rules(report)
+        assert {finding["category"] for finding in report["findings"]} == {"security", "bugs", "performance"}
+        assert [function["name"] for function in report["functions"]] == ["build", "poll"]
+
+    def test_complexity_and_nesting(self):
+        branches = "\n".join(f"    elif x == {n}:\n        return {n}" for n in range(1, 12))
+        code = f"def pick(x):\n    if x == 0:\n        return 0\n{branches}\n    for y in x:\n        while y:\n            y -= 1\n"
+
+        report = analyze_source(code, "python")
+        function = report["functions"][0]
+
+        # 12 if/elif branches, a for and a while on top of the single entry path
+        assert function["complexity"] == 15
+        # An elif chain is one level deep; the while inside the for is two
+        assert function["nesting"] == 2
+        assert "high-complexity" in rules(report)
+
+    def test_unknown_and_other_languages(self):
+        assert analyze_source(CLEAN, "unknown")["language"] == "python"
+
+        javascript = "el.innerHTML = input;\nconst q = 'SELECT * FROM t WHERE id=' + id;\nif (a && b) { eval(q); }"
+        report = analyze_source(javascript, "unknown")
+        assert not report["parsed"] and report["error"] is None
+        assert {"html-injection", "sql-injection", "eval"} <= rules(report)
+        assert report["metrics"]["complexity"] == 3
+
+        broken = analyze_source("def f(:\n    pass", "python")
+        assert rules(broken) == {"syntax-error"}
+
+    def test_focus_code_keeps_flagged_functions(self):
+        filler = "\n".join(f"def helper_{n}(x):\n    return x + {n}\n" for n in range(30))
+        code = filler + "\ndef risky(cmd):\n    return eval(cmd)\n"
+
+        focused = focus_code(code, analyze_source(code, "python"))
+
+        assert "def risky" in focused and "return eval(cmd)" in focused
+        assert "helper_5" not in focused and "omitted" in focused
+        assert len(focused) < len(code) / 4
+
+
+class TestStaticAnalyzer:
+    @pytest.mark.asyncio
+    async def test_large_inputs_run_in_worker_processes(self):
+        analyzer = StaticAnalyzer(max_workers=1, inline_max_chars=0)
+        try:
+            report = await analyzer.analyze(RISKY, "python")
+        finally:
+            analyzer.close()
+
+        assert analyzer._executor is None
+        assert report == analyze_source(RISKY, "python")
+
+    @pytest.mark.asyncio
+    async def test_mcp_tools_collectors_share_one_report(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        from src.core.interfaces.mcp.advanced_tools import AdvancedMCPTools
+        tools = AdvancedMCPTools()
+        calls = []
+        original = tools.analyzer.analyze
+
+        async def counting(code, language):
+            calls.append(language)
+            return await original(code, language)
+
+        monkeypatch.setattr(tools.analyzer, "analyze", counting)
+        result = await tools.analyze_code(RISKY, "python")
+
+        assert calls == ["python"]
+        assert tools.analyzer is StaticAnalyzer.shared()
+        assert result["metrics"]["functions"] == 2
+        assert result["security"]["risk"] == "high"
+        assert {finding["rule"] for finding in result["patterns"]} == {"mutable-default", "bare-except"}
+        assert "string-concat-in-loop" in {finding["rule"] for finding in result["performance"]}
+
+
+class TestCodeAnalyzerPreAnalysis:
+    def make_agent(self):
+        agent = CodeAnalyzerAgent("analyzer_test", {"capabilities": ["code_review"]})
+        calls = []
+
+        async def execute_with_model(operation, request=None, hedge=None):
+            calls.append(request)
+            return {category: ["from model"] for category in CodeAnalyzerAgent.CATEGORIES}
+
+        agent.execute_with_model = execute_with_model
+        return agent, calls
+
+    @pytest.mark.asyncio
+    async def test_trivial_code_skips_the_model(self):
+        agent, calls = self.make_agent()
+
+        result = await agent.process_task({"id": "t1", "code": "x = 1\n"})
+
+        assert calls == []
+        assert result["model_skipped"] and result["status"] == "completed"
+        assert all(findings == [] for findings in result["analysis"].values())
+
+    @pytest.mark.asyncio
+    async def test_clean_code_gets_a_focused_prompt(self):
+        agent, calls = self.make_agent()
+
+        result = await agent.process_task({"id": "t1", "code": CLEAN})
+
+        prompt = calls[0]["messages"][1]["content"]
+        assert "Static analysis already reported:\n        - nothing" in prompt and "Please provide" not in prompt
+        assert "model_skipped" not in result
+
+        agent.skip_model_when_clean = True
+        assert (await agent.process_task({"id": "t2", "code": CLEAN}))["model_skipped"]
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_findings_focus_the_prompt_and_join_the_result(self):
+        agent, calls = self.make_agent()
+
+        result = await agent.process_task({"id": "t2", "code": RISKY, "context": {"language": "python"}})
+
+        prompt = calls[0]["messages"][1]["content"]
+        assert "Static analysis already reported" in prompt and "Please provide" not in prompt
+        assert result["analysis"]["security"][-1] == "from model"
+        assert any("shell-command" in line for line in result["analysis"]["security"])
+
+    @pytest.mark.asyncio
+    async def test_batches_send_only_uncleared_snippets(self):
+        agent, calls = self.make_agent()
+
+        async def execute_with_model(operation, request=None, hedge=None):
+            calls.append(request)
+            return [{category: [] for category in CodeAnalyzerAgent.CATEGORIES}]
+
+        agent.execute_with_model = execute_with_model
+        result = await agent.process_task({"id": "b1", "batch": [
+            {"id": "a", "code": "x = 1"},
+            {"id": "b", "code": RISKY},
+            {"id": "c", "code": ""}
+        ]})
+
+        assert len(calls) == 1 and "Snippet 2" not in calls[0]["messages"][1]["content"]
+        assert [item["task_id"] for item in result["results"]] == ["a", "b", "c"]
+        assert result["results"][1]["analysis"]["security"]
+
+    @pytest.mark.asyncio
+    async def test_batched_results_match_single_task_results(self):
+        agent, _ = self.make_agent()
+
+        async def execute_with_model(operation, request=None, hedge=None):
+            if "Snippet 1" in request["messages"][1]["content"]:
+                return [{category: ["from model"] for category in CodeAnalyzerAgent.CATEGORIES}]
+            return {category: ["from model"] for category in CodeAnalyzerAgent.CATEGORIES}
+
+        agent.execute_with_model = execute_with_model
+        items = [{"id": "a", "code": "x = 1"}, {"id": "b", "code": RISKY, "context": {"language": "python"}}]
+        batched = await agent.process_task({"id": "b1", "batch": [dict(item) for item in items]})
+        single = [await agent.process_task(dict(item)) for item in items]
+
+        assert batched["results"] == single
@@ -0,0 +1,138 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Tuple, Type
+
+try:
+    import openai
+except ImportError:  # pragma: no cover - openai is optional for non-OpenAI providers
+    openai = None
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+
+def _transient_types() -> Tuple[Type[BaseException], ...]:
+    types = [TimeoutError, asyncio.TimeoutError, ConnectionError]
+    if openai is not None:
+        types += [openai.APITimeoutError, openai.APIConnectionError]
+    if aiohttp is not None:
+        types += [aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError]
+    return tuple(types)
+
+
+TRANSIENT_ERRORS = _transient_types()
+
+
+def classify_error(error: Exception) -> str:
+    """Classify a model call failure as "rate_limit", "transient" or "fatal"
+
+    Uses the exception type and the HTTP status carried by provider client errors
+    (`status_code` on openai/httpx errors, `status` on aiohttp errors), never the message.
+    """
+    if openai is not None and isinstance(error, openai.RateLimitError):
+        return RATE_LIMIT
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        if status == 429:
+            return RATE_LIMIT
+        if status in (408, 409) or status >= 500:
+            return TRANSIENT
+        return FATAL
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return FATAL
+
+
+class CircuitBreaker:
+    """Per-model circuit breaker with exponential open periods and half-open probing
+
+    closed: requests flow; `failure_threshold` consecutive failures (or one rate-limit
+    error) open the circuit.
+    open: no requests until the open period ends; each consecutive opening doubles the
+    period, from `base_open_seconds` up to `max_open_seconds`.
+    half_open: exactly one probe request is let through; success closes the circuit and
+    resets the backoff, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, base_open_seconds: float = 5.0,
+                 max_open_seconds: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = base_open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.consecutive_opens = 0
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.logger = logging.getLogger("model_manager.circuit_breaker")
+
+    def time_until_available(self) -> float:
+        """Seconds until the breaker will let a request through (0 if it will now)"""
+        if self.state == CLOSED:
+            return 0.0
+        if self.state == OPEN:
+            return max(0.0, self.opened_until - time.monotonic())
+        # Half-open: wait for the outstanding probe to report back
+        return 1.0 if self.probe_in_flight else 0.0
+
+    def is_available(self) -> bool:
+        return self.time_until_available() == 0
+
+    def acquire(self) -> None:
+        """Record that a request is being sent; in half-open state it becomes the probe"""
+        if self.state == OPEN and time.monotonic() >= self.opened_until:
+            self.state = HALF_OPEN
+            self.logger.info(f"Circuit for {self.name} half-open, sending probe")
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = True
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            self.logger.info(f"Circuit for {self.name} closed after successful probe")
+        self.state = CLOSED
+        self.failures = 0
+        self.consecutive_opens = 0
+        self.probe_in_flight = False
+
+    def record_failure(self, trip: bool = False, open_seconds: Optional[float] = None) -> None:
+        """Count a failure; `trip` opens the circuit immediately (e.g. on a rate limit)
+
+        `open_seconds` keeps the circuit open at least that long, e.g. for a Retry-After.
+        """
+        self.failures += 1
+        if trip or self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open(open_seconds)
+
+    def release(self) -> None:
+        """Finish a request that says nothing about the model's health"""
+        self.probe_in_flight = False
+
+    def _open(self, min_seconds: Optional[float] = None) -> None:
+        self.consecutive_opens += 1
+        period = min(self.max_open_seconds, self.base_open_seconds * 2 ** (self.consecutive_opens - 1))
+        if min_seconds is not None:
+            period = max(period, min(min_seconds, self.max_open_seconds))
+        self.state = OPEN
+        self.opened_until = time.monotonic() + period
+        self.failures = 0
+        self.probe_in_flight = False
+        self.logger.warning(f"Circuit for {self.name} opened for {period:.1f}s")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "retry_in_seconds": round(self.time_until_available(), 2),
+            "consecutive_opens": self.consecutive_opens
+        }
@@ -0,0 +1,56 @@
+from collections import deque
+from typing import Optional
+
+
+class LatencyWindow:
+    """Sliding window of recent call latencies for one model"""
+
+    def __init__(self, size: int = 100):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency below which `percent`% of recent calls finished, or None with no samples"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Caps hedged requests to a fraction of primary requests
+
+    Every primary request earns `ratio` of a hedge, up to `max_burst` saved up; sending a
+    hedge spends one. Over time at most `ratio` of requests are duplicated, however slow
+    the providers get.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_burst: float = 5):
+        self.ratio = ratio
+        self.max_burst = max_burst
+        self.credit = 0.0
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+        self.credit = min(self.max_burst, self.credit + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Spend a hedge if the budget allows it"""
+        if self.credit < 1:
+            return False
+        self.credit -= 1
+        self.hedges += 1
+        return True
+
+    def refund(self) -> None:
+        """Return a spent hedge that could not be sent"""
+        self.credit += 1
+        self.hedges -= 1
@@ -0,0 +1,71 @@
+import time
+from typing import Dict, Any, Optional
+from utils.circuit_breaker import RATE_LIMIT
+
+DEFAULT_WEIGHTS = {
+    "priority": 1.0,
+    "latency": 0.1,
+    "error_rate": 5.0,
+    "rate_limit_rate": 5.0,
+    "quota": 1.0
+}
+
+
+class ModelStats:
+    """Rolling health statistics for one model
+
+    Latency, error rate and rate-limit hit rate are exponentially weighted moving
+    averages over calls (weight `alpha` for the newest). The two rates also decay toward
+    zero with `decay_half_life_seconds` of wall time, so a model that stopped getting
+    traffic after a bad spell is eventually tried again rather than written off.
+    """
+
+    def __init__(self, alpha: float = 0.2, decay_half_life_seconds: float = 60.0):
+        self.alpha = alpha
+        self.decay_half_life_seconds = decay_half_life_seconds
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.calls = 0
+        self.updated_at = time.monotonic()
+
+    def record_success(self, latency: float) -> None:
+        self._update(latency, error=0.0, rate_limited=0.0)
+
+    def record_failure(self, error_class: str, latency: Optional[float] = None) -> None:
+        self._update(latency, error=1.0, rate_limited=1.0 if error_class == RATE_LIMIT else 0.0)
+
+    def score(self, priority: float, quota_fraction: float, weights: Dict[str, float]) -> float:
+        """Cost of sending the next request to this model; lower is better"""
+        self._decay()
+        return (
+            weights["priority"] * priority +
+            weights["latency"] * (self.latency or 0.0) +
+            weights["error_rate"] * self.error_rate +
+            weights["rate_limit_rate"] * self.rate_limit_rate -
+            weights["quota"] * quota_fraction
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        self._decay()
+        return {
+            "latency_ewma": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "rate_limit_rate": round(self.rate_limit_rate, 3),
+            "calls": self.calls
+        }
+
+    def _update(self, latency: Optional[float], error: float, rate_limited: float) -> None:
+        self._decay()
+        self.calls += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        self.error_rate += self.alpha * (error - self.error_rate)
+        self.rate_limit_rate += self.alpha * (rate_limited - self.rate_limit_rate)
+
+    def _decay(self) -> None:
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self.updated_at) / self.decay_half_life_seconds)
+        self.error_rate *= factor
+        self.rate_limit_rate *= factor
+        self.updated_at = now
@@ -1,17 +1,66 @@
 import time
+import bisect
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 import logging
 
+class TokenBucket:
+    """Token bucket refilled continuously at `capacity` tokens per `period` seconds
+
+    Unlike fixed windows, the bucket never resets all at once, so a client cannot burst
+    to twice the limit across a window edge. Every operation is O(1).
+    """
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.refill_rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def time_until_available(self, amount: float = 1) -> float:
+        """Seconds until `amount` tokens can be taken (0 if they can be taken now)"""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float = 1) -> None:
+        """Take tokens; the balance may go negative if a caller over-consumes"""
+        self._refill()
+        self.tokens -= amount
+
+
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 50, requests_per_hour: int = 500):
+    def __init__(self, models: Optional[Dict[str, Dict]] = None,
+                 requests_per_minute: int = 50, requests_per_hour: int = 500):
+        """
+        Per-model rate limiting, with limits taken from each model's "rate_limits" config:
+        models = {
+            "gpt-4": {"rate_limits": {
+                "requests_per_minute": 50, "requests_per_hour": 500,
+                "tokens_per_minute": 40000, "tokens_per_hour": 1000000
+            }},
+            ...
+        }
+        Models without configured request limits use `requests_per_minute`/`requests_per_hour`;
+        token budgets are only enforced where configured. Token charges are estimates made
+        when a request is reserved and are corrected by `reconcile` once the provider
+        reports actual usage.
+        """
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        self.minute_requests: Dict[str, int] = {}
-        self.hour_requests: Dict[str, int] = {}
-        self.last_reset_minute = datetime.now()
-        self.last_reset_hour = datetime.now()
+        self.models = models or {}
+        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self.token_buckets: Dict[str, Dict[str, TokenBucket]] = {}
         self.logger = logging.getLogger("rate_limiter")
         self._setup_logger()
 
@@ -22,63 +71,107 @@ class RateLimiter:
         self.logger.addHandler(handler)
         self.logger.setLevel(logging.INFO)
 
+    def _get_buckets(self, model: str) -> Dict[str, TokenBucket]:
+        """Get (creating on first use) the minute and hour buckets for a model"""
+        buckets = self.buckets.get(model)
+        if buckets is None:
+            limits = self.models.get(model, {}).get("rate_limits", {})
+            buckets = {
+                "minute": TokenBucket(limits.get("requests_per_minute", self.requests_per_minute), 60),
+                "hour": TokenBucket(limits.get("requests_per_hour", self.requests_per_hour), 3600)
+            }
+            self.buckets[model] = buckets
+            token_buckets = {}
+            if "tokens_per_minute" in limits:
+                token_buckets["tokens_minute"] = TokenBucket(limits["tokens_per_minute"], 60)
+            if "tokens_per_hour" in limits:
+                token_buckets["tokens_hour"] = TokenBucket(limits["tokens_per_hour"], 3600)
+            self.token_buckets[model] = token_buckets
+        return buckets
+
+    def _get_token_buckets(self, model: str) -> Dict[str, TokenBucket]:
+        """Get the token budget buckets for a model (empty if it has no token limits)"""
+        self._get_buckets(model)
+        return self.token_buckets[model]
+
     async def wait_if_needed(self, model: str) -> None:
         """Wait if rate limit is reached"""
         while self._is_rate_limited(model):
             wait_time = self._calculate_wait_time(model)
-            self.logger.warning(f"Rate limit reached for {model}. Waiting {wait_time} seconds...")
+            self.logger.warning(f"Rate limit reached for {model}. Waiting {wait_time:.2f} seconds...")
             await asyncio.sleep(wait_time)
 
-    def _is_rate_limited(self, model: str) -> bool:
-        self._reset_counters_if_needed()
-        minute_requests = self.minute_requests.get(model, 0)
-        hour_requests = self.hour_requests.get(model, 0)
-        return (minute_requests >= self.requests_per_minute or 
-                hour_requests >= self.requests_per_hour)
-
-    def _calculate_wait_time(self, model: str) -> int:
-        """Calculate how long to wait before next request"""
-        if self.minute_requests.get(model, 0) >= self.requests_per_minute:
-            return 60 - (datetime.now() - self.last_reset_minute).seconds
-        if self.hour_requests.get(model, 0) >= self.requests_per_hour:
-            return 3600 - (datetime.now() - self.last_reset_hour).seconds
-        return 1
-
-    def _reset_counters_if_needed(self):
-        """Reset counters if time period has elapsed"""
-        now = datetime.now()
-        
-        # Reset minute counters
-        if (now - self.last_reset_minute) >= timedelta(minutes=1):
-            self.minute_requests = {}
-            self.last_reset_minute = now
-            self.logger.info("Reset minute counters")
-            
-        # Reset hour counters
-        if (now - self.last_reset_hour) >= timedelta(hours=1):
-            self.hour_requests = {}
-            self.last_reset_hour = now
-            self.logger.info("Reset hour counters")
-
-    def increment_counter(self, model: str):
-        """Increment request counters for the model"""
-        self._reset_counters_if_needed()
-        self.minute_requests[model] = self.minute_requests.get(model, 0) + 1
-        self.hour_requests[model] = self.hour_requests.get(model, 0) + 1
-        self.logger.debug(f"Incremented counters for {model}: minute={self.minute_requests[model]}, hour={self.hour_requests[model]}")
+    def _is_rate_limited(self, model: str, tokens: int = 0) -> bool:
+        return self._calculate_wait_time(model, tokens) > 0
+
+    def _calculate_wait_time(self, model: str, tokens: int = 0) -> float:
+        """Calculate how long to wait before a request of `tokens` estimated tokens"""
+        wait_time = max(bucket.time_until_available() for bucket in self._get_buckets(model).values())
+        for bucket in self._get_token_buckets(model).values():
+            # A request bigger than the whole budget only waits for a full bucket
+            wait_time = max(wait_time, bucket.time_until_available(min(tokens, bucket.capacity)))
+        return wait_time
+
+    def time_until_available(self, model: str, tokens: int = 0) -> float:
+        """Seconds until the model can take a request of `tokens` tokens (0 if it can now)"""
+        return self._calculate_wait_time(model, tokens)
+
+    def try_acquire(self, model: str, tokens: int = 0) -> bool:
+        """Take a request slot and token budget for the model if available right now"""
+        if self._is_rate_limited(model, tokens):
+            return False
+        self.increment_counter(model, tokens)
+        return True
+
+    def increment_counter(self, model: str, tokens: int = 0):
+        """Record a request, and its estimated tokens, against the model's limits"""
+        for bucket in self._get_buckets(model).values():
+            bucket.consume()
+        for bucket in self._get_token_buckets(model).values():
+            bucket.consume(tokens)
+        self.logger.debug(f"Recorded request for {model}: {self.get_remaining(model)}")
+
+    def reconcile(self, model: str, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct a reservation's token charge with the usage the provider reported"""
+        for bucket in self._get_token_buckets(model).values():
+            # Negative when the estimate was high, which refunds the difference
+            bucket.consume(actual_tokens - estimated_tokens)
+        if actual_tokens > estimated_tokens * 1.5:
+            self.logger.info(f"Token estimate for {model} was low: {estimated_tokens} estimated, {actual_tokens} used")
+
+    def get_remaining(self, model: str) -> Dict[str, int]:
+        """Requests (and tokens, where budgeted) currently available to the model in each window"""
+        buckets = {**self._get_buckets(model), **self._get_token_buckets(model)}
+        return {
+            window: max(0, int(bucket.available()))
+            for window, bucket in buckets.items()
+        }
+
+    def get_remaining_fraction(self, model: str) -> float:
+        """Share of the model's tightest window still available, from 0 to 1"""
+        buckets = {**self._get_buckets(model), **self._get_token_buckets(model)}
+        return min(
+            max(0.0, bucket.available()) / bucket.capacity if bucket.capacity else 0.0
+            for bucket in buckets.values()
+        )
 
 class ModelRotator:
     def __init__(self, models: Dict[str, Dict]):
         """
         Initialize with model configurations
         models = {
-            "gpt-4": {"priority": 1, "enabled": True},
-            "gpt-3.5-turbo": {"priority": 2, "enabled": True},
+            "gpt-4": {"priority": 1, "enabled": True, "capabilities": ["code_review"]},
+            "gpt-3.5-turbo": {"priority": 2, "enabled": True, "capabilities": ["code_review"]},
             ...
         }
+
+        Keeps, per requested capability set, the enabled models that provide it sorted by
+        priority. Lists are built on first use; disabling a model removes it from every
+        list and enabling inserts it back in place, so lookups never sort.
+        Selection is read-only: there is no shared "current model" cursor.
         """
         self.models = models
-        self.current_model = self._get_highest_priority_model()
+        self._candidates: Dict[FrozenSet[str], List[Tuple[int, str]]] = {}
         self.logger = logging.getLogger("model_rotator")
         self._setup_logger()
 
@@ -89,48 +182,53 @@ class ModelRotator:
         self.logger.addHandler(handler)
         self.logger.setLevel(logging.INFO)
 
-    def _get_highest_priority_model(self) -> Optional[str]:
-        """Get the highest priority enabled model"""
-        available_models = [(name, config) for name, config in self.models.items() 
-                          if config.get("enabled", True)]
-        if not available_models:
-            return None
-        return min(available_models, key=lambda x: x[1]["priority"])[0]
+    def _provides(self, model: str, required: FrozenSet[str]) -> bool:
+        return required.issubset(self.models[model].get("capabilities", []))
+
+    def _get_sorted(self, required_capabilities: Optional[Iterable[str]]) -> List[Tuple[int, str]]:
+        """Get (building on first use) the priority-sorted candidates for a capability set"""
+        required = frozenset(required_capabilities or [])
+        candidates = self._candidates.get(required)
+        if candidates is None:
+            candidates = sorted(
+                (config["priority"], name) for name, config in self.models.items()
+                if config.get("enabled", True) and self._provides(name, required)
+            )
+            self._candidates[required] = candidates
+        return candidates
+
+    def get_best_model(self, required_capabilities: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Highest priority enabled model with the required capabilities, in O(1)"""
+        candidates = self._get_sorted(required_capabilities)
+        return candidates[0][1] if candidates else None
+
+    def get_candidates(self, required_capabilities: Optional[Iterable[str]] = None) -> List[str]:
+        """All enabled models with the required capabilities, highest priority first"""
+        return [name for _, name in self._get_sorted(required_capabilities)]
 
     def get_current_model(self) -> Optional[str]:
-        """Get the current model to use"""
-        return self.current_model
-
-    def rotate_model(self) -> Optional[str]:
-        """Rotate to the next available model"""
-        current_priority = self.models[self.current_model]["priority"]
-        next_models = [(name, config) for name, config in self.models.items()
-                      if config["priority"] > current_priority and config.get("enabled", True)]
-        
-        if not next_models:
-            self.logger.warning("No more models available for rotation")
-            return None
-            
-        self.current_model = min(next_models, key=lambda x: x[1]["priority"])[0]
-        self.logger.info(f"Rotated to model: {self.current_model}")
-        return self.current_model
+        """Get the highest priority enabled model"""
+        return self.get_best_model()
 
     def disable_model(self, model: str):
         """Disable a model (e.g., when it hits rate limits)"""
         if model in self.models:
             self.models[model]["enabled"] = False
             self.logger.warning(f"Disabled model: {model}")
-            if model == self.current_model:
-                self.current_model = self._get_highest_priority_model()
-                self.logger.info(f"Switched to model: {self.current_model}")
+            entry = (self.models[model]["priority"], model)
+            for candidates in self._candidates.values():
+                index = bisect.bisect_left(candidates, entry)
+                if index < len(candidates) and candidates[index] == entry:
+                    del candidates[index]
 
     def enable_model(self, model: str):
         """Re-enable a model"""
         if model in self.models:
             self.models[model]["enabled"] = True
             self.logger.info(f"Enabled model: {model}")
-            # If this model has higher priority than current, switch to it
-            if (self.current_model and 
-                self.models[model]["priority"] < self.models[self.current_model]["priority"]):
-                self.current_model = model
-                self.logger.info(f"Switched to higher priority model: {model}")
+            entry = (self.models[model]["priority"], model)
+            for required, candidates in self._candidates.items():
+                if self._provides(model, required):
+                    index = bisect.bisect_left(candidates, entry)
+                    if index == len(candidates) or candidates[index] != entry:
+                        candidates.insert(index, entry)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def cache_key(model: str, request: Dict[str, Any]) -> str:
+    """Content address for a model request: a hash of the model, messages and parameters"""
+    payload = json.dumps({"model": model, "request": request}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of model responses keyed by `cache_key`
+
+    The memory tier is an LRU bounded by `max_entries` with a TTL. The optional disk tier
+    keeps one JSON file per key under `disk_path`, so responses survive restarts; it is
+    bounded by `max_disk_entries` and read and written in an executor so the event loop
+    never blocks on file IO. Disk hits are promoted back into memory.
+
+    Configured through a "response_cache" section in model_config.json:
+
+        "response_cache": {
+            "enabled": true,
+            "max_entries": 1000,
+            "ttl_seconds": 3600,
+            "disk_path": "data/response_cache",
+            "max_disk_entries": 10000
+        }
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 10000, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self.logger = logging.getLogger("model_manager.response_cache")
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        # Stored with wall-clock times so disk entries keep their age across restarts
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._disk_entries = 0
+        if self.enabled and self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self._disk_entries = self._prune_disk(self.max_disk_entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached response, or None on a miss"""
+        return await self.get_any([key])
+
+    async def get_any(self, keys: List[str]) -> Optional[Any]:
+        """Get the response cached under the first of `keys` that has one, or None
+
+        Counts as a single lookup in the stats however many keys are tried, and reads the
+        disk tier for all of them in one executor call.
+        """
+        if not self.enabled:
+            return None
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            stored_at, response = entry
+            if time.time() - stored_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return response
+            del self._entries[key]
+
+        if self.disk_path:
+            found = await asyncio.get_running_loop().run_in_executor(None, self._read_disk_any, keys)
+            if found is not None:
+                key, entry = found
+                self._remember(key, *entry)
+                self.stats["disk_hits"] += 1
+                return entry[1]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, response: Any) -> None:
+        """Cache a response in memory and, if configured, on disk"""
+        if not self.enabled:
+            return
+        stored_at = time.time()
+        self._remember(key, stored_at, response)
+        if self.disk_path:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, stored_at, response)
+            except Exception as e:
+                self.logger.warning(f"Could not persist cached response {key[:12]}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and ratios"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "miss_ratio": round(self.stats["misses"] / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "disk_entries": self._disk_entries
+        }
+
+    def _remember(self, key: str, stored_at: float, response: Any) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (stored_at, response)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _file_for(self, key: str) -> str:
+        return os.path.join(self.disk_path, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Any]]:
+        path = self._file_for(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self.logger.warning(f"Discarding unreadable cache file {path}")
+            self._remove_file(path)
+            return None
+        if time.time() - entry["stored_at"] > self.ttl_seconds:
+            self._remove_file(path)
+            return None
+        return entry["stored_at"], entry["response"]
+
+    def _read_disk_any(self, keys: List[str]) -> Optional[Tuple[str, Tuple[float, Any]]]:
+        for key in keys:
+            entry = self._read_disk(key)
+            if entry is not None:
+                return key, entry
+        return None
+
+    def _write_disk(self, key: str, stored_at: float, response: Any) -> None:
+        path = self._file_for(key)
+        existed = os.path.exists(path)
+        # Write then rename so a crash never leaves a half-written entry behind
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": stored_at, "response": response}, f)
+        os.replace(temp_path, path)
+        if not existed:
+            self._disk_entries += 1
+        if self._disk_entries > self.max_disk_entries:
+            # Prune with some headroom so a full cache doesn't rescan the directory on every write
+            self._disk_entries = self._prune_disk(int(self.max_disk_entries * 0.9))
+
+    def _prune_disk(self, limit: int) -> int:
+        """Remove expired entries and the oldest ones beyond `limit`; returns the count left"""
+        cutoff = time.time() - self.ttl_seconds
+        files = []
+        for name in os.listdir(self.disk_path):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.disk_path, name)
+            try:
+                modified = os.path.getmtime(path)
+            except OSError:
+                continue
+            if modified < cutoff:
+                self._remove_file(path)
+            else:
+                files.append((modified, path))
+        files.sort()
+        excess = len(files) - limit
+        for _, path in files[:max(0, excess)]:
+            self._remove_file(path)
+        return min(len(files), limit)
+
+    def _remove_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
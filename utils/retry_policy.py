@@ -0,0 +1,120 @@
+import re
+import time
+import random
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+from utils.circuit_breaker import RATE_LIMIT, TRANSIENT
+
+# Reset hints in the order they are trusted; OpenAI-style resets are durations like "6m0s"
+_RESET_HEADERS = ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def retry_after_from_headers(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or rate-limit-reset headers"""
+    if not headers:
+        return None
+    headers = {name.lower(): value for name, value in headers.items()}
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                # Retry-After may also be an HTTP date
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [_parse_duration(headers[name]) for name in _RESET_HEADERS if name in headers]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Wait the provider asked for with a failed request, if it said"""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return float(hint)
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        # openai errors keep the HTTP response
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return retry_after_from_headers(headers)
+    except AttributeError:
+        return None
+
+
+class RetryState:
+    """Retry bookkeeping for one task's model call"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.started_at = time.monotonic()
+        self.last_delay = 0.0
+
+
+class RetryPolicy:
+    """Decides whether and when to retry a failed model call
+
+    Transient errors back off with decorrelated jitter: each delay is drawn between
+    `base_delay_seconds` and three times the previous one, capped at `max_delay_seconds`,
+    or is exactly what the provider asked for via Retry-After. Rate-limit errors are
+    retried straight away, because the breaker has already taken that model out for the
+    advertised period and the next reservation either picks another model or waits for it.
+    Fatal errors are never retried. Transient failures are limited to `max_attempts`, and
+    every task gives up once `budget_seconds` have passed since its first attempt.
+
+    Configured through a "retry_policy" section in model_config.json.
+    """
+
+    def __init__(self, base_delay_seconds: float = 0.5, max_delay_seconds: float = 30.0, max_attempts: int = 3,
+                 budget_seconds: float = 120.0):
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_attempts = max_attempts
+        self.budget_seconds = budget_seconds
+        self.random = random.Random()
+
+    def start(self) -> RetryState:
+        return RetryState()
+
+    def next_delay(self, state: RetryState, error: Exception, error_class: str) -> Optional[float]:
+        """Seconds to wait before retrying, or None to give up"""
+        if error_class == RATE_LIMIT:
+            delay = 0.0
+        elif error_class == TRANSIENT:
+            state.attempts += 1
+            if state.attempts >= self.max_attempts:
+                return None
+            hint = retry_after_seconds(error)
+            if hint is not None:
+                delay = min(hint, self.max_delay_seconds)
+            else:
+                upper = max(self.base_delay_seconds, state.last_delay * 3)
+                delay = min(self.max_delay_seconds, self.random.uniform(self.base_delay_seconds, upper))
+            state.last_delay = delay
+        else:
+            return None
+
+        if time.monotonic() - state.started_at + delay > self.budget_seconds:
+            return None
+        return delay
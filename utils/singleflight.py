@@ -0,0 +1,38 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution
+
+    The first caller for a key starts the call as its own task; callers that arrive while
+    it is in flight await the same task and receive its result or its exception. Because
+    the call runs as a separate task, a caller being cancelled does not cancel it for the
+    others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `call` for `key`, or join the execution already in flight for it"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Every waiter may have been cancelled; mark the outcome as retrieved either way
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,447 @@
+import re
+import ast
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+# Thresholds above which a Python function is reported
+MAX_FUNCTION_LINES = 50
+MAX_ARGUMENTS = 6
+MAX_COMPLEXITY = 10
+MAX_NESTING = 4
+MAX_LOOP_DEPTH = 2
+
+_BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert) + (
+    (ast.match_case,) if hasattr(ast, "match_case") else ()
+)
+_BLOCK_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try) + (
+    (ast.Match,) if hasattr(ast, "Match") else ()
+)
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+_SECRET_NAME = re.compile(r"(password|passwd|secret|api_?key|access_?key|auth_?token|private_?key)", re.IGNORECASE)
+
+# Python calls that are dangerous on untrusted input: name -> (rule, category, severity, message)
+_PYTHON_CALLS = {
+    "eval": ("eval", "security", "high", "eval() executes arbitrary code"),
+    "exec": ("exec", "security", "high", "exec() executes arbitrary code"),
+    "os.system": ("shell-command", "security", "high", "os.system() runs a shell command; prefer subprocess with a list"),
+    "os.popen": ("shell-command", "security", "high", "os.popen() runs a shell command; prefer subprocess with a list"),
+    "pickle.load": ("unsafe-deserialization", "security", "medium", "pickle can execute code while loading untrusted data"),
+    "pickle.loads": ("unsafe-deserialization", "security", "medium", "pickle can execute code while loading untrusted data"),
+    "marshal.loads": ("unsafe-deserialization", "security", "medium", "marshal is unsafe for untrusted data"),
+    "hashlib.md5": ("weak-hash", "security", "low", "MD5 is broken for security purposes"),
+    "hashlib.sha1": ("weak-hash", "security", "low", "SHA-1 is broken for security purposes"),
+    "tempfile.mktemp": ("insecure-tempfile", "security", "medium", "tempfile.mktemp() is racy; use mkstemp() or NamedTemporaryFile"),
+}
+_BLOCKING_IN_ASYNC = {"time.sleep", "requests.get", "requests.post", "requests.put", "requests.delete", "requests.request",
+                      "urllib.request.urlopen", "subprocess.run", "subprocess.call", "subprocess.check_output"}
+_REGEX_CALLS = {"re.compile", "re.match", "re.search", "re.fullmatch", "re.findall", "re.finditer", "re.sub", "re.split"}
+
+# Line-based checks for languages without a parser here: (pattern, rule, category, severity, message)
+_GENERIC_RULES = [
+    (re.compile(r"\beval\s*\("), "eval", "security", "high", "eval() executes arbitrary code"),
+    (re.compile(r"\bnew\s+Function\s*\("), "eval", "security", "high", "new Function() executes arbitrary code"),
+    (re.compile(r"\.innerHTML\s*=|\bdangerouslySetInnerHTML\b"), "html-injection", "security", "medium",
+     "assigning raw HTML allows script injection"),
+    (re.compile(r"\bdocument\.write\s*\("), "html-injection", "security", "medium", "document.write() allows script injection"),
+    (re.compile(r"\b(child_process|exec|execSync)\s*\(|\bos\.system\s*\(|\bRuntime\.getRuntime\(\)\.exec\b"),
+     "shell-command", "security", "high", "runs a shell command"),
+    (re.compile(r"(password|passwd|secret|api_?key|access_?key|auth_?token|private_?key)\w*[\"']?\s*[:=]\s*[\"'][^\"']{4,}[\"']",
+                re.IGNORECASE),
+     "hardcoded-secret", "security", "high", "credential hard-coded in source"),
+    (re.compile(r"[\"']\s*(select|insert|update|delete)\b[^\"']*[\"']\s*\+", re.IGNORECASE),
+     "sql-injection", "security", "high", "SQL built by string concatenation; use parameters"),
+    (re.compile(r"\bcatch\s*\(\s*\w*\s*\)\s*\{\s*\}"), "swallowed-exception", "bugs", "medium", "empty catch block hides errors"),
+]
+_GENERIC_BRANCHES = re.compile(r"\b(if|for|while|case|catch|elif|except)\b|&&|\|\||\?(?!\.)")
+_GENERIC_FUNCTIONS = re.compile(r"\bfunction\b|=>|\bdef\b|\bfunc\b|\bfn\b")
+_COMMENT_PREFIXES = ("#", "//", "/*", "*", "--")
+
+
+def _finding(rule: str, category: str, severity: str, line: Optional[int], message: str) -> Dict[str, Any]:
+    return {"rule": rule, "category": category, "severity": severity, "line": line, "message": message}
+
+
+def _call_name(node: ast.AST) -> str:
+    """Dotted name of a call target, e.g. "os.path.join"; empty if it isn't a plain name"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return ""
+
+
+def _is_string(node: ast.AST) -> bool:
+    return isinstance(node, ast.JoinedStr) or (isinstance(node, ast.Constant) and isinstance(node.value, str))
+
+
+def _is_built_string(node: ast.AST) -> bool:
+    """Whether an expression builds a string by formatting or concatenation"""
+    if isinstance(node, ast.JoinedStr):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return _is_string(node.left) or _is_built_string(node.left)
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format"
+
+
+def _line_metrics(lines: List[str]) -> Dict[str, int]:
+    blank = sum(1 for line in lines if not line.strip())
+    comments = sum(1 for line in lines if line.strip().startswith(_COMMENT_PREFIXES))
+    return {
+        "lines": len(lines),
+        "code_lines": len(lines) - blank - comments,
+        "comment_lines": comments,
+        "blank_lines": blank
+    }
+
+
+class _PythonChecker(ast.NodeVisitor):
+    """Walks a module once, collecting per-function metrics and findings"""
+
+    def __init__(self):
+        self.findings: List[Dict[str, Any]] = []
+        self.functions: List[Dict[str, Any]] = []
+        self.classes = 0
+        self.imports = 0
+        self.loop_depth = 0
+        self.async_depth = 0
+
+    def add(self, node: ast.AST, rule: str, category: str, severity: str, message: str) -> None:
+        self.findings.append(_finding(rule, category, severity, getattr(node, "lineno", None), message))
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._visit_function(node, is_async=False)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self._visit_function(node, is_async=True)
+
+    def _visit_function(self, node: ast.AST, is_async: bool) -> None:
+        complexity = 1 + _branches(node)
+        nesting = _nesting(node.body)
+        length = node.end_lineno - node.lineno + 1
+        arguments = [
+            arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+            if arg.arg not in ("self", "cls")
+        ]
+        self.functions.append({
+            "name": node.name,
+            "line": node.lineno,
+            "end_line": node.end_lineno,
+            "length": length,
+            "complexity": complexity,
+            "nesting": nesting
+        })
+        if complexity > MAX_COMPLEXITY:
+            self.add(node, "high-complexity", "quality", "medium",
+                     f"{node.name}() has cyclomatic complexity {complexity}; consider splitting it")
+        if nesting > MAX_NESTING:
+            self.add(node, "deep-nesting", "quality", "low", f"{node.name}() nests blocks {nesting} deep")
+        if length > MAX_FUNCTION_LINES:
+            self.add(node, "long-function", "quality", "low", f"{node.name}() is {length} lines long")
+        if len(arguments) > MAX_ARGUMENTS:
+            self.add(node, "too-many-arguments", "quality", "low", f"{node.name}() takes {len(arguments)} arguments")
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            if isinstance(default, (ast.List, ast.Dict, ast.Set)) or _call_name(getattr(default, "func", None)) in ("list", "dict", "set"):
+                self.add(default, "mutable-default", "bugs", "medium",
+                         f"{node.name}() has a mutable default argument shared between calls")
+
+        # Loops don't carry into a nested function's body
+        outer_loop_depth, self.loop_depth = self.loop_depth, 0
+        self.async_depth += 1 if is_async else 0
+        self.generic_visit(node)
+        self.async_depth -= 1 if is_async else 0
+        self.loop_depth = outer_loop_depth
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        outer_loop_depth, self.loop_depth = self.loop_depth, 0
+        self.generic_visit(node)
+        self.loop_depth = outer_loop_depth
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes += 1
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        self.imports += 1
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self.imports += 1
+        if any(alias.name == "*" for alias in node.names):
+            self.add(node, "wildcard-import", "quality", "low", f"from {node.module} import * hides where names come from")
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is None:
+            self.add(node, "bare-except", "bugs", "medium", "bare except also catches KeyboardInterrupt and SystemExit")
+        self.generic_visit(node)
+
+    def _visit_loop(self, node: ast.AST) -> None:
+        self.loop_depth += 1
+        if self.loop_depth > MAX_LOOP_DEPTH:
+            self.add(node, "nested-loops", "performance", "medium",
+                     f"loops nested {self.loop_depth} deep; consider an index or a different algorithm")
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    def visit_For(self, node: ast.For) -> None:
+        iterator = node.iter
+        if (isinstance(iterator, ast.Call) and _call_name(iterator.func) == "range" and len(iterator.args) == 1 and
+                isinstance(iterator.args[0], ast.Call) and _call_name(iterator.args[0].func) == "len"):
+            self.add(node, "range-len-loop", "performance", "low", "iterate directly or use enumerate() instead of range(len(...))")
+        self._visit_loop(node)
+
+    visit_AsyncFor = visit_For
+
+    def visit_While(self, node: ast.While) -> None:
+        self._visit_loop(node)
+
+    def visit_comprehension(self, node: ast.comprehension) -> None:
+        self._visit_loop(node)
+
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        if self.loop_depth and isinstance(node.op, ast.Add) and _is_string(node.value):
+            self.add(node, "string-concat-in-loop", "performance", "medium",
+                     "string built with += in a loop is quadratic; collect parts and join them")
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str) and len(node.value.value) >= 4:
+            for target in node.targets:
+                name = target.id if isinstance(target, ast.Name) else getattr(target, "attr", "")
+                if _SECRET_NAME.search(name):
+                    self.add(node, "hardcoded-secret", "security", "high", f"credential hard-coded in {name}")
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> None:
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(comparator, ast.Constant) and comparator.value is None:
+                self.add(node, "none-comparison", "quality", "low", "compare to None with 'is' / 'is not'")
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if self.loop_depth and isinstance(comparator, ast.List) and len(comparator.elts) > 3:
+                    self.add(node, "list-membership-in-loop", "performance", "low",
+                             "membership test against a list literal in a loop; use a set")
+                if isinstance(comparator, ast.Call) and isinstance(comparator.func, ast.Attribute) and comparator.func.attr == "keys":
+                    self.add(node, "keys-membership", "performance", "low", "test membership on the dict itself, not .keys()")
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = _call_name(node.func)
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+        if name in _PYTHON_CALLS:
+            self.add(node, *_PYTHON_CALLS[name])
+        elif name.startswith("subprocess.") and isinstance(keywords.get("shell"), ast.Constant) and keywords["shell"].value:
+            self.add(node, "shell-command", "security", "high", f"{name}(shell=True) is open to shell injection")
+        elif name == "yaml.load" and "Loader" not in keywords:
+            self.add(node, "unsafe-deserialization", "security", "medium", "yaml.load() without a Loader; use yaml.safe_load()")
+        elif name.startswith("requests.") and isinstance(keywords.get("verify"), ast.Constant) and keywords["verify"].value is False:
+            self.add(node, "tls-verification-disabled", "security", "medium", f"{name}(verify=False) disables certificate checks")
+
+        if isinstance(node.func, ast.Attribute) and node.func.attr in ("execute", "executemany") and node.args:
+            if _is_built_string(node.args[0]):
+                self.add(node, "sql-injection", "security", "high", "SQL built with string formatting; pass parameters instead")
+
+        if self.async_depth and name in _BLOCKING_IN_ASYNC:
+            self.add(node, "blocking-call-in-async", "performance", "high",
+                     f"{name}() blocks the event loop inside an async function")
+        if self.loop_depth and name in _REGEX_CALLS and node.args and _is_string(node.args[0]):
+            self.add(node, "regex-in-loop", "performance", "low", "compile the regular expression once, outside the loop")
+        self.generic_visit(node)
+
+
+def _branches(node: ast.AST) -> int:
+    """Decision points in a function, not counting nested functions"""
+    count = 0
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, _FUNCTION_NODES) or isinstance(child, ast.ClassDef):
+            continue
+        if isinstance(child, _BRANCH_NODES):
+            count += 1
+        elif isinstance(child, ast.BoolOp):
+            count += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            count += 1 + len(child.ifs)
+        count += _branches(child)
+    return count
+
+
+def _nesting(body: List[ast.stmt]) -> int:
+    """Deepest block nesting in a statement list, not counting nested functions"""
+    deepest = 0
+    for statement in body:
+        if isinstance(statement, _FUNCTION_NODES + (ast.ClassDef,)):
+            continue
+        if isinstance(statement, ast.If) and len(statement.orelse) == 1 and isinstance(statement.orelse[0], ast.If):
+            # An elif chain sits at one level
+            deepest = max(deepest, 1 + _nesting(statement.body), _nesting(statement.orelse))
+        elif isinstance(statement, _BLOCK_NODES):
+            children = []
+            for field in ("body", "orelse", "finalbody"):
+                children.extend(getattr(statement, field, []))
+            for handler in getattr(statement, "handlers", []):
+                children.extend(handler.body)
+            for case in getattr(statement, "cases", []):
+                children.extend(case.body)
+            deepest = max(deepest, 1 + _nesting(children))
+    return deepest
+
+
+def _analyze_python(code: str, report: Dict[str, Any]) -> None:
+    tree = ast.parse(code)
+    checker = _PythonChecker()
+    checker.visit(tree)
+    report["functions"] = checker.functions
+    report["findings"].extend(checker.findings)
+    complexities = [function["complexity"] for function in checker.functions]
+    report["metrics"].update({
+        "functions": len(checker.functions),
+        "classes": checker.classes,
+        "imports": checker.imports,
+        # Module-level code counts as one more unit alongside the functions
+        "complexity": 1 + _branches(tree) + sum(complexities),
+        "max_complexity": max(complexities, default=1),
+        "max_nesting": max([_nesting(tree.body)] + [function["nesting"] for function in checker.functions])
+    })
+
+
+def _analyze_generic(lines: List[str], report: Dict[str, Any]) -> None:
+    complexity = 1
+    functions = 0
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(_COMMENT_PREFIXES):
+            continue
+        complexity += len(_GENERIC_BRANCHES.findall(stripped))
+        functions += len(_GENERIC_FUNCTIONS.findall(stripped))
+        for pattern, rule, category, severity, message in _GENERIC_RULES:
+            if pattern.search(line):
+                report["findings"].append(_finding(rule, category, severity, number, message))
+    report["metrics"].update({"functions": functions, "complexity": complexity, "max_complexity": complexity})
+
+
+def analyze_source(code: str, language: str = "python") -> Dict[str, Any]:
+    """Statically analyze source code without running it
+
+    Python is parsed with `ast` for per-function complexity, nesting and length, plus
+    bug-prone patterns, dangerous calls and performance smells. Other languages (and
+    Python that doesn't parse) get line metrics and a set of line-based checks. Code of
+    "unknown" language is treated as Python if it parses.
+
+    Returns {"language", "parsed", "error", "metrics", "functions", "findings"}; each
+    finding is {"rule", "category", "severity", "line", "message"}, with categories
+    matching CodeAnalyzerAgent.CATEGORIES. A module-level function so it can run in a
+    worker process.
+    """
+    language = (language or "unknown").lower()
+    lines = code.splitlines()
+    report = {
+        "language": language,
+        "parsed": False,
+        "error": None,
+        "metrics": _line_metrics(lines),
+        "functions": [],
+        "findings": []
+    }
+    if language in ("python", "py", "unknown"):
+        try:
+            _analyze_python(code, report)
+            report["parsed"] = True
+            report["language"] = "python"
+            return report
+        except SyntaxError as e:
+            # Code of unknown language that isn't Python is simply something else
+            if language != "unknown":
+                report["error"] = f"SyntaxError: {e.msg}"
+                report["findings"].append(_finding("syntax-error", "bugs", "high", e.lineno, f"code does not parse: {e.msg}"))
+        except (RecursionError, ValueError) as e:
+            report["error"] = f"{type(e).__name__}: {e}"
+    _analyze_generic(lines, report)
+    return report
+
+
+class StaticAnalyzer:
+    """Runs `analyze_source` off the event loop, in a pool of worker processes
+
+    Parsing and walking a large file is CPU-bound and holds the GIL, so it runs in
+    separate processes. Snippets shorter than `inline_max_chars` are analyzed in the
+    calling thread, where the work is cheaper than sending them to a worker.
+    """
+
+    _shared: Optional["StaticAnalyzer"] = None
+
+    def __init__(self, max_workers: Optional[int] = 2, inline_max_chars: int = 2000):
+        self.max_workers = max_workers
+        self.inline_max_chars = inline_max_chars
+        self.logger = logging.getLogger("static_analyzer")
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def shared(cls) -> "StaticAnalyzer":
+        """Get the process-wide analyzer, so all agents share one worker pool"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def analyze(self, code: str, language: str = "python") -> Dict[str, Any]:
+        if len(code) <= self.inline_max_chars:
+            return analyze_source(code, language)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, analyze_source, code, language)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @classmethod
+    def close_shared(cls) -> None:
+        """Shut down the process-wide analyzer's worker pool, if it was ever started"""
+        if cls._shared is not None:
+            cls._shared.close()
+
+
+def findings_by_category(report: Dict[str, Any], categories: List[str]) -> Dict[str, List[str]]:
+    """Group a report's findings as readable lines per category"""
+    grouped = {category: [] for category in categories}
+    for finding in report["findings"]:
+        location = f"line {finding['line']}: " if finding["line"] else ""
+        grouped.setdefault(finding["category"], []).append(f"{location}{finding['message']} [{finding['rule']}]")
+    return grouped
+
+
+def focus_code(code: str, report: Dict[str, Any], max_complexity: int = MAX_COMPLEXITY) -> str:
+    """Cut code down to the functions worth a reviewer's attention
+
+    Keeps the top-level functions that have findings or high complexity, with a marker
+    for what was left out. Returns the code unchanged when nothing can be cut.
+    """
+    lines = code.splitlines()
+    flagged = {finding["line"] for finding in report["findings"] if finding["line"]}
+    spans = []
+    for function in report["functions"]:
+        start, end = function["line"], function["end_line"]
+        if any(span[0] <= start and end <= span[1] for span in spans):
+            continue
+        if function["complexity"] > max_complexity or any(start <= line <= end for line in flagged):
+            spans.append((start, end))
+    # Findings outside any function are kept with a line of context either side
+    for line in sorted(flagged):
+        if not any(start <= line <= end for start, end in spans):
+            spans.append((max(1, line - 1), min(len(lines), line + 1)))
+    if not spans:
+        return code
+
+    kept, previous_end = [], 0
+    for start, end in sorted(spans):
+        if start > previous_end + 1:
+            kept.append(f"# ... lines {previous_end + 1}-{start - 1} omitted ...")
+        kept.extend(lines[max(start, previous_end + 1) - 1:end])
+        previous_end = max(previous_end, end)
+    if previous_end < len(lines):
+        kept.append(f"# ... lines {previous_end + 1}-{len(lines)} omitted ...")
+    focused = "\n".join(kept)
+    return focused if len(focused) < len(code) else code
@@ -0,0 +1,37 @@
+import re
+from typing import Dict, Any, List
+
+# Words, numbers and single punctuation marks; BPE tokenizers rarely merge across these
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Chat formats add a few tokens of framing per message and to prime the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens a provider will count for `text`
+
+    A local approximation of BPE tokenizers: each word or punctuation mark is at least
+    one token, and long identifiers are split roughly every four characters. It tends to
+    over- rather than under-count code, which is the safe side for rate limiting.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _PIECES.findall(text))
+
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate the prompt tokens of a chat request"""
+    return REPLY_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + estimate_tokens(str(message.get("content", "")))
+        for message in messages
+    )
+
+
+def estimate_request_tokens(request: Dict[str, Any], default_completion_tokens: int = 500) -> int:
+    """Estimate the total tokens (prompt plus completion) a request will be charged
+
+    The completion side is the request's "max_tokens" when set, otherwise
+    `default_completion_tokens`.
+    """
+    prompt_tokens = estimate_message_tokens(request.get("messages", []))
+    return prompt_tokens + request.get("max_tokens", default_completion_tokens)